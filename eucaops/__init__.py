@@ -41,6 +41,8 @@ from ec2ops import EC2ops
 from s3ops import S3ops
 from stsops import STSops
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import traceback
 import sys
 import StringIO
@@ -49,8 +51,9 @@ from boto.ec2.instance import Reservation
 from boto.exception import EC2ResponseError
 from eutester.euconfig import EuConfig
 from eutester.euproperties import Euproperty_Manager
-from eutester.machine import Machine
+from eutester.machine import Machine, MachineGroup
 from eutester.euvolume import EuVolume
+from eutester.cleanupengine import CleanupEngine
 from eutester import eulogger
 import re
 import os
@@ -60,7 +63,12 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
     def __init__(self, config_file=None, password=None, keypath=None, credpath=None, aws_access_key_id=None,
                  aws_secret_access_key = None,  account="eucalyptus", user="admin", username=None, APIVersion='2011-01-01',
                  region=None, ec2_ip=None, s3_ip=None, s3_path=None, as_ip=None, elb_ip=None, cfn_ip=None,
-                 port=8773, download_creds=True, boto_debug=0, debug_method=None):
+                 port=8773, download_creds=True, boto_debug=0, debug_method=None, lazy_connections=False):
+        """
+        :param lazy_connections: boolean, if set the service connections (ec2, euare, tokens, cw, s3, autoscale,
+                                 elb, cloudformation) and the property_manager are not created here but on first
+                                 access of that attribute. See print_startup_timings() for where setup time went.
+        """
         self.config_file = config_file 
         self.APIVersion = APIVersion
         self.eucapath = "/opt/eucalyptus"
@@ -89,12 +97,18 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
         self.aws_access_key_id = aws_access_key_id
         self.aws_secret_access_key = aws_secret_access_key
         self.property_manager = None
+        self.lazy_connections = lazy_connections
+        self.startup_timings = []
+        self._lazy_setup_methods = {}
+        self._lazy_setup_lock = threading.RLock()
 
 
         if self.config_file is not None:
             ## read in the config file
             self.debug("Reading config file: " + config_file)
+            step_start = time.time()
             self.config = self.read_config(config_file)
+            self.record_startup_time('read_config/connect machines', step_start)
 
             ### Set the eucapath
             try:
@@ -104,7 +118,7 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
                 raise Exception("Could not get REPO info from input file\n" + str(e))
 
             ### No credpath but does have password and an ssh connection to the CLC
-            ### Private cloud with root access 
+            ### Private cloud with root access
             ### Need to get credentials for the user if there arent any passed in
             ### Need to create service manager for user if we have an ssh connection and password
             clc_array = self.get_component_machines("clc")
@@ -113,6 +127,7 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
             if self.download_creds:
                 if self.credpath is None:
                     ### TRY TO GET CREDS ON FIRST CLC if it fails try on second listed clc, if that fails weve hit a terminal condition
+                    step_start = time.time()
                     try:
                         self.debug("Attempting to get credentials and setup sftp")
                         self.sftp = self.clc.ssh.connection.open_sftp()
@@ -127,9 +142,12 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
                         self.swap_clc()
                         self.sftp = self.clc.ssh.connection.open_sftp()
                         self.get_credentials(account,user)
-                        
+                    self.record_startup_time('get_credentials', step_start)
+
+                step_start = time.time()
                 self.service_manager = EuserviceManager(self)
                 self.clc = self.service_manager.get_enabled_clc().machine
+                self.record_startup_time('service_manager', step_start)
 
         if self.credpath and not aws_access_key_id:
             aws_access_key_id = self.get_access_key()
@@ -137,73 +155,173 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
             aws_secret_access_key = self.get_secret_key()
         self.test_resources = {}
         if self.download_creds:
-            try:
-                if self.credpath and not ec2_ip:
-                    ec2_ip = self.get_ec2_ip()
-                self.setup_ec2_connection(endpoint=ec2_ip, path="/services/Eucalyptus", port=port, is_secure=False,
-                                          region=region, aws_access_key_id=aws_access_key_id,
-                                          aws_secret_access_key=aws_secret_access_key, APIVersion=APIVersion,
-                                          boto_debug=boto_debug)
-                self.setup_ec2_resource_trackers()
-                self.setup_iam_connection(endpoint=ec2_ip, path="/services/Euare", port=port, is_secure=False,
-                                          aws_access_key_id=aws_access_key_id, aws_secret_access_key=aws_secret_access_key,
-                                          boto_debug=boto_debug)
-                self.setup_sts_connection(endpoint=ec2_ip, path="/services/Eucalyptus", port=port, is_secure=False,
-                                           region=region, aws_access_key_id=aws_access_key_id,
-                                           aws_secret_access_key=aws_secret_access_key, boto_debug=boto_debug)
-                self.setup_cw_connection(endpoint=ec2_ip, path="/services/CloudWatch", port=port, is_secure=False,
-                                          region=region, aws_access_key_id=aws_access_key_id,
-                                          aws_secret_access_key=aws_secret_access_key, boto_debug=boto_debug)
-                self.setup_cw_resource_trackers()
-            except Exception, e:
-                tb = self.get_traceback()
-                raise Exception(tb + "\nUnable to create EC2 connection because of: " + str(e) )
+            ### Resource trackers are always setup so cleanup works regardless of which connections get used
+            self.setup_ec2_resource_trackers()
+            self.setup_cw_resource_trackers()
+            self.setup_s3_resource_trackers()
 
-            try:
-                if self.credpath and not s3_ip:
-                    s3_ip = self.get_s3_ip()
-                if self.credpath and not s3_path:
-                    s3_path = self.get_s3_path()
-                self.setup_s3_connection(endpoint=s3_ip, path=s3_path, port=port, is_secure=False,
-                                         aws_access_key_id=aws_access_key_id, aws_secret_access_key=aws_secret_access_key,
-                                         boto_debug=boto_debug)
-                self.setup_s3_resource_trackers()
-            except Exception, e:
-                self.debug("Unable to create S3 connection because of: " + str(e) )
+            def setup_ec2(ec2_ip=ec2_ip):
+                try:
+                    if self.credpath and not ec2_ip:
+                        ec2_ip = self.get_ec2_ip()
+                    self.setup_ec2_connection(endpoint=ec2_ip, path="/services/Eucalyptus", port=port,
+                                              is_secure=False, region=region, aws_access_key_id=aws_access_key_id,
+                                              aws_secret_access_key=aws_secret_access_key, APIVersion=APIVersion,
+                                              boto_debug=boto_debug)
+                except Exception, e:
+                    tb = self.get_traceback()
+                    raise Exception(tb + "\nUnable to create EC2 connection because of: " + str(e) )
 
-            try:
-                if self.credpath and not as_ip:
-                    as_ip = self.get_as_ip()
-                self.setup_as_connection(endpoint=as_ip, path="/services/AutoScaling", port=port, is_secure=False,
-                                         region=region, aws_access_key_id=aws_access_key_id,
-                                         aws_secret_access_key=aws_secret_access_key, boto_debug=boto_debug)
-            except Exception, e:
-                self.debug("Unable to create AS connection because of: " + str(e) )
+            def setup_iam(ec2_ip=ec2_ip):
+                try:
+                    if self.credpath and not ec2_ip:
+                        ec2_ip = self.get_ec2_ip()
+                    self.setup_iam_connection(endpoint=ec2_ip, path="/services/Euare", port=port, is_secure=False,
+                                              aws_access_key_id=aws_access_key_id,
+                                              aws_secret_access_key=aws_secret_access_key, boto_debug=boto_debug)
+                except Exception, e:
+                    tb = self.get_traceback()
+                    raise Exception(tb + "\nUnable to create IAM connection because of: " + str(e) )
 
-            try:
-                if self.credpath and not elb_ip:
-                    elb_ip = self.get_elb_ip()
-                self.setup_elb_connection(endpoint=elb_ip, path="/services/LoadBalancing", port=port, is_secure=False,
-                                          region=region, aws_access_key_id=aws_access_key_id,
-                                          aws_secret_access_key=aws_secret_access_key, boto_debug=boto_debug)
-            except Exception, e:
-                self.debug("Unable to create ELB connection because of: " + str(e) )
-            try:
-                if self.credpath and not cfn_ip:
-                    cfn_ip = self.get_cfn_ip()
-                self.setup_cfn_connection(endpoint=cfn_ip, path="/services/CloudFormation", port=port, is_secure=False,
-                                          region=region, aws_access_key_id=aws_access_key_id,
-                                          aws_secret_access_key=aws_secret_access_key, boto_debug=boto_debug)
-            except Exception, e:
-                self.debug("Unable to create CloudFormation connection because of: " + str(e) )
+            def setup_sts(ec2_ip=ec2_ip):
+                try:
+                    if self.credpath and not ec2_ip:
+                        ec2_ip = self.get_ec2_ip()
+                    self.setup_sts_connection(endpoint=ec2_ip, path="/services/Eucalyptus", port=port,
+                                              is_secure=False, region=region, aws_access_key_id=aws_access_key_id,
+                                              aws_secret_access_key=aws_secret_access_key, boto_debug=boto_debug)
+                except Exception, e:
+                    tb = self.get_traceback()
+                    raise Exception(tb + "\nUnable to create STS connection because of: " + str(e) )
+
+            def setup_cw(ec2_ip=ec2_ip):
+                try:
+                    if self.credpath and not ec2_ip:
+                        ec2_ip = self.get_ec2_ip()
+                    self.setup_cw_connection(endpoint=ec2_ip, path="/services/CloudWatch", port=port,
+                                             is_secure=False, region=region, aws_access_key_id=aws_access_key_id,
+                                             aws_secret_access_key=aws_secret_access_key, boto_debug=boto_debug)
+                except Exception, e:
+                    tb = self.get_traceback()
+                    raise Exception(tb + "\nUnable to create CloudWatch connection because of: " + str(e) )
+
+            def setup_s3(s3_ip=s3_ip, s3_path=s3_path):
+                try:
+                    if self.credpath and not s3_ip:
+                        s3_ip = self.get_s3_ip()
+                    if self.credpath and not s3_path:
+                        s3_path = self.get_s3_path()
+                    self.setup_s3_connection(endpoint=s3_ip, path=s3_path, port=port, is_secure=False,
+                                             aws_access_key_id=aws_access_key_id,
+                                             aws_secret_access_key=aws_secret_access_key, boto_debug=boto_debug)
+                except Exception, e:
+                    self.debug("Unable to create S3 connection because of: " + str(e) )
+
+            def setup_as(as_ip=as_ip):
+                try:
+                    if self.credpath and not as_ip:
+                        as_ip = self.get_as_ip()
+                    self.setup_as_connection(endpoint=as_ip, path="/services/AutoScaling", port=port,
+                                             is_secure=False, region=region, aws_access_key_id=aws_access_key_id,
+                                             aws_secret_access_key=aws_secret_access_key, boto_debug=boto_debug)
+                except Exception, e:
+                    self.debug("Unable to create AS connection because of: " + str(e) )
+
+            def setup_elb(elb_ip=elb_ip):
+                try:
+                    if self.credpath and not elb_ip:
+                        elb_ip = self.get_elb_ip()
+                    self.setup_elb_connection(endpoint=elb_ip, path="/services/LoadBalancing", port=port,
+                                              is_secure=False, region=region, aws_access_key_id=aws_access_key_id,
+                                              aws_secret_access_key=aws_secret_access_key, boto_debug=boto_debug)
+                except Exception, e:
+                    self.debug("Unable to create ELB connection because of: " + str(e) )
+
+            def setup_cfn(cfn_ip=cfn_ip):
+                try:
+                    if self.credpath and not cfn_ip:
+                        cfn_ip = self.get_cfn_ip()
+                    self.setup_cfn_connection(endpoint=cfn_ip, path="/services/CloudFormation", port=port,
+                                              is_secure=False, region=region, aws_access_key_id=aws_access_key_id,
+                                              aws_secret_access_key=aws_secret_access_key, boto_debug=boto_debug)
+                except Exception, e:
+                    self.debug("Unable to create CloudFormation connection because of: " + str(e) )
+
+            ### Attribute name each setup method creates, in the order they are setup when not lazy
+            connection_setups = [('ec2', setup_ec2), ('euare', setup_iam), ('tokens', setup_sts), ('cw', setup_cw),
+                                 ('s3', setup_s3), ('autoscale', setup_as), ('elb', setup_elb),
+                                 ('cloudformation', setup_cfn)]
+            for attr_name, setup_method in connection_setups:
+                if self.lazy_connections:
+                    self._lazy_setup_methods[attr_name] = setup_method
+                else:
+                    step_start = time.time()
+                    setup_method()
+                    self.record_startup_time(attr_name, step_start)
 
         if self.clc and self.account_name == 'eucalyptus':
-            try:
-                self.update_property_manager()
-            except:
-                tb = self.get_traceback()
-                self.debug(str(tb) + '\nError creating properties manager')
+            if self.lazy_connections:
+                del self.property_manager
+                def setup_property_manager():
+                    try:
+                        self.update_property_manager()
+                    except:
+                        tb = self.get_traceback()
+                        self.debug(str(tb) + '\nError creating properties manager')
+                        self.property_manager = None
+                self._lazy_setup_methods['property_manager'] = setup_property_manager
+            else:
+                step_start = time.time()
+                try:
+                    self.update_property_manager()
+                except:
+                    tb = self.get_traceback()
+                    self.debug(str(tb) + '\nError creating properties manager')
+                self.record_startup_time('property_manager', step_start)
+        self.record_startup_time('total', self.start_time)
 
+    def __getattr__(self, name):
+        """
+        Only called when 'name' is not found through normal attribute lookup. When lazy_connections is set,
+        this creates the service connection (or property manager) named 'name' on first access.
+        """
+        lazy_setup_methods = self.__dict__.get('_lazy_setup_methods')
+        if not lazy_setup_methods or name not in lazy_setup_methods:
+            raise AttributeError("'" + self.__class__.__name__ + "' object has no attribute '" + str(name) + "'")
+        with self._lazy_setup_lock:
+            # Another thread may have set this up while we were waiting on the lock
+            if name in self.__dict__:
+                return self.__dict__[name]
+            setup_method = lazy_setup_methods.pop(name, None)
+            if setup_method:
+                step_start = time.time()
+                self.debug("Lazy setup of '" + str(name) + "' on first access")
+                try:
+                    setup_method()
+                finally:
+                    self.record_startup_time(str(name) + ' (lazy)', step_start)
+            if name not in self.__dict__:
+                raise AttributeError("Lazy setup of '" + str(name) + "' did not create it, see debug for errors")
+            return self.__dict__[name]
+
+    def record_startup_time(self, step, start):
+        """
+        Record the time elapsed since 'start' for a named step of this tester's setup, see print_startup_timings()
+        """
+        self.startup_timings.append((step, time.time() - start))
+
+    def print_startup_timings(self, printmethod=None):
+        """
+        Print a table of the time spent in each setup step, lazy steps show when they were first accessed.
+        """
+        printmethod = printmethod or self.debug
+        buf = "\n" + "STARTUP STEP".ljust(40) + "ELAPSED(s)\n"
+        for step, elapsed in self.startup_timings:
+            buf += str(step).ljust(40) + ("%.3f" % elapsed) + "\n"
+        if self._lazy_setup_methods:
+            buf += "Not yet setup (lazy): " + ", ".join(sorted(self._lazy_setup_methods.keys())) + "\n"
+        printmethod(buf)
+        return buf
 
     def get_available_vms(self, type=None, zone=None):
         """
@@ -278,12 +396,22 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
     def cleanup_artifacts(self,instances=True, snapshots=True, volumes=True,
                           load_balancers=True, ip_addresses=True,
                           auto_scaling_groups=True, launch_configurations=True,
-                          keypairs=True):
+                          keypairs=True, max_workers=1):
         """
         Description: Attempts to remove artifacts created during and through this eutester's lifespan.
+
+        :param max_workers: if greater than 1, use a CleanupEngine to delete the artifacts in dependency ordered
+                            stages, sending up to max_workers deletions at once per stage
+        :return: the CleanupEngine used when max_workers is greater than 1
         """
         failmsg = ""
         failcount = 0
+        if max_workers > 1:
+            return self.cleanup_artifacts_concurrently(instances=instances, snapshots=snapshots, volumes=volumes,
+                                                       load_balancers=load_balancers, ip_addresses=ip_addresses,
+                                                       auto_scaling_groups=auto_scaling_groups,
+                                                       launch_configurations=launch_configurations,
+                                                       keypairs=keypairs, max_workers=max_workers)
         self.debug("Starting cleanup of artifacts")
         if auto_scaling_groups:
             try:
@@ -359,6 +487,7 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
                     tb = self.get_traceback()
                     failcount += 1
                     failmsg += str(tb) + "\nUnable to delete item: " + str(item) + "\n" + str(e)+"\n"
+        self.invalidate_describe_cache()
         if failmsg:
             failmsg += "\nFound " + str(failcount) + " number of errors while cleaning up. See above"
             raise Exception(failmsg)
@@ -371,6 +500,38 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
                 failmsg += str(tb) + "\nError#:"+ str(failcount)+ ":" + str(e)+"\n"
 
 
+    def cleanup_artifacts_concurrently(self, instances=True, snapshots=True, volumes=True,
+                                       load_balancers=True, ip_addresses=True,
+                                       auto_scaling_groups=True, launch_configurations=True,
+                                       keypairs=True, max_workers=8, timeout=600):
+        """
+        Description: Removes the artifacts in test_resources in dependency ordered stages (ASGs -> instances ->
+        addresses/volumes/images -> snapshots -> groups/keys and the rest), sending each stage's deletions
+        concurrently and waiting on them with batched describes. See eutester.cleanupengine.
+
+        :param max_workers: max deletions sent at once within a stage
+        :param timeout: seconds each stage waits for its resources to go away
+        :return: the CleanupEngine, with per stage timing and leftovers
+        """
+        skip_keys = [key for key, enabled in [('reservations', instances), ('snapshots', snapshots),
+                                              ('volumes', volumes), ('load_balancers', load_balancers),
+                                              ('addresses', ip_addresses),
+                                              ('auto-scaling-groups', auto_scaling_groups),
+                                              ('launch-configurations', launch_configurations),
+                                              ('keypairs', keypairs)] if not enabled]
+        self.debug("Starting concurrent cleanup of artifacts")
+        engine = CleanupEngine(self, max_workers=max_workers, timeout=timeout, skip_keys=skip_keys)
+        engine.run()
+        self.invalidate_describe_cache()
+        leftovers = engine.get_leftovers()
+        if leftovers:
+            failmsg = ""
+            for stage_name, key, item, error in leftovers:
+                failmsg += "Unable to delete item: " + str(item) + " in stage:" + str(stage_name) + "\n" + str(error) + "\n"
+            failmsg += "\nFound " + str(len(leftovers)) + " number of errors while cleaning up. See above"
+            raise Exception(failmsg)
+        return engine
+
     def cleanup_load_balancers(self, lbs=None):
         """
         :param lbs: optional list of load balancers, otherwise it will attempt to delete from test_resources[]
@@ -521,7 +682,7 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
             self.debug("Current resources in the system:\n" + str(current_artifacts))
         return current_artifacts
     
-    def read_config(self, filepath, username="root"):
+    def read_config(self, filepath, username="root", max_workers=32):
         """ Parses the config file at filepath returns a dictionary with the config
             Config file
             ----------
@@ -546,9 +707,12 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
                 SC00 - Storage controller for cluster 00   
                 CC00 - Cluster controller for cluster 00    
                 NC00 - A node controller in cluster 00   
+
+            The ssh connections to the machines are made concurrently, at most 'max_workers' at a time.
         """
         config_hash = {}
         machines = []
+        machine_dicts = []
         f = None
         try:
             #f = open(filepath, 'r')
@@ -571,20 +735,7 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
                 machine_dict["arch"] = machine_details[3]
                 machine_dict["source"] = machine_details[4]
                 machine_dict["components"] = map(str.lower, machine_details[5].strip('[]').split())
-
-                ### ADD the machine to the array of machine
-                cloud_machine = Machine(   machine_dict["hostname"], 
-                                        distro = machine_dict["distro"], 
-                                        distro_ver = machine_dict["distro_ver"], 
-                                        arch = machine_dict["arch"], 
-                                        source = machine_dict["source"], 
-                                        components = machine_dict["components"],
-                                        connect = True,
-                                        password = self.password,
-                                        keypath = self.keypath,
-                                        username = username
-                                        )
-                machines.append(cloud_machine)
+                machine_dicts.append(machine_dict)
                 
             ### LOOK for network mode in config file if not found then set it unknown
             for param in ["network", "managed_ips", "subnet_ip"]:
@@ -595,6 +746,23 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
                     self.debug("Could not find " + param + " type setting to None")
                     config_hash[param] = None
         #f.close()   
+
+        ### CREATE the machines, connecting to all of them at once rather than one after another
+        def create_machine(machine_dict):
+            return Machine(machine_dict["hostname"],
+                           distro = machine_dict["distro"],
+                           distro_ver = machine_dict["distro_ver"],
+                           arch = machine_dict["arch"],
+                           source = machine_dict["source"],
+                           components = machine_dict["components"],
+                           connect = True,
+                           password = self.password,
+                           keypath = self.keypath,
+                           username = username
+                           )
+        if machine_dicts:
+            with ThreadPoolExecutor(max_workers=min(len(machine_dicts), max_workers)) as executor:
+                machines = list(executor.map(create_machine, machine_dicts))
         config_hash["machines"] = machines 
         return config_hash
 
@@ -660,6 +828,49 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
             else:
                 return machines_with_role
 
+    def get_machine_group(self, components=None, max_workers=None):
+        """
+        Returns a MachineGroup used to run commands/methods concurrently on the machines matching 'components'
+
+        :param components: component string or list of component strings (ie: 'nc' or ['cc','sc']). If None all
+                           machines in the config are used.
+        :param max_workers: max number of machines worked on at once, defaults to all matching machines
+        :return: MachineGroup
+        """
+        if components is None or isinstance(components, basestring):
+            machines = self.get_component_machines(components)
+        else:
+            machines = []
+            for component in components:
+                for machine in self.get_component_machines(component):
+                    if machine not in machines:
+                        machines.append(machine)
+        return MachineGroup(machines, max_workers=max_workers, debugmethod=self.debug)
+
+    def run_on_machines(self, cmd, components=None, max_workers=None, timeout=120, code=None, verbose=False,
+                        listformat=True):
+        """
+        Run 'cmd' concurrently on all machines matching 'components', see MachineGroup.cmd() for the returned
+        result format.
+        example:
+            results = tester.run_on_machines('service eucalyptus-nc status', components='nc', timeout=30)
+            down = [host for host in results if results[host]['status'] != 0]
+
+        :param cmd: string, the command to be executed
+        :param components: component string or list of component strings. If None all machines are used.
+        :param max_workers: max number of machines worked on at once, defaults to all matching machines
+        :param timeout: time in seconds for the command to complete on all machines
+        :param code: optional expected exit code, if any machine's cmd status does not match an exception is raised
+        :param verbose: boolean flag to enable debug
+        :param listformat: specifies returned output in list of lines, or single string buffer
+        :return: dict of result dicts keyed by machine hostname
+        """
+        group = self.get_machine_group(components=components, max_workers=max_workers)
+        results = group.sys(cmd, verbose=verbose, timeout=timeout, listformat=listformat, code=code)
+        if verbose:
+            group.print_results(results)
+        return results
+
     def swap_component_hostname(self, hostname):
         if hostname != None:
             if len(hostname) < 5:
@@ -700,8 +911,15 @@ class Eucaops(EC2ops,S3ops,IAMops,STSops,CWops, ASops, ELBops, CFNops):
             self.credpath = admin_cred_dir
             ### IF there are 2 clcs make sure to sync credentials across them
         ### sync the credentials  to all CLCs
-        for clc in clcs:
-            self.send_creds_to_machine(admin_cred_dir, clc)
+        results = MachineGroup(clcs, debugmethod=self.debug).run_method(
+            lambda clc: self.send_creds_to_machine(admin_cred_dir, clc))
+        for hostname, result in results.iteritems():
+            if result['exc_info']:
+                self.debug('Error sending credentials to:' + str(hostname) + '\n' +
+                           "".join(traceback.format_exception(*result['exc_info'])))
+                raise result['exc_info'][0], result['exc_info'][1], result['exc_info'][2]
+            if result['error']:
+                raise result['error']
 
         return admin_cred_dir
    
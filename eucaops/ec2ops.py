@@ -65,6 +65,9 @@ from eutester.windows_instance import WinInstance
 from eutester.euvolume import EuVolume
 from eutester.eusnapshot import EuSnapshot
 from eutester.euzone import EuZone
+from eutester.euwaiter import EuWaiter
+from eutester.describecache import DescribeCache
+from eutester.imageindex import ImageIndex
 
 EC2RegionData = {
     'us-east-1' : 'ec2.us-east-1.amazonaws.com',
@@ -77,6 +80,14 @@ class EC2ops(Eutester):
 
     enable_root_user_data = """#cloud-config
 disable_root: false"""
+    #Opt in read through cache of describe responses, see enable_describe_cache()
+    describe_cache = None
+    describe_cache_ttls = {'images': 300,
+                           'zones': 300,
+                           'keypairs': 120,
+                           'security-groups': 30}
+    #Opt in index of all images used by get_images() and get_emi(), see enable_image_index()
+    image_index = None
 
     @Eutester.printinfo
     def __init__(self,
@@ -188,6 +199,56 @@ disable_root: false"""
         self.test_resources["auto-scaling-groups"]=[]
         self.test_resources["launch-configurations"]=[]
 
+    def enable_describe_cache(self, ttls=None, default_ttl=60):
+        """
+        Cache the responses of the describe requests made by get_images(), get_emi(), get_zones(),
+        get_keypair(), get_security_group() and get_instance_security_groups(). Responses are kept per
+        resource type for that type's ttl, and dropped when this tester changes resources of that type.
+
+        :param ttls: dict of resource type -> seconds, overrides describe_cache_ttls per type
+        :param default_ttl: seconds to keep responses for resource types without a ttl
+        :return: DescribeCache obj
+        """
+        cache_ttls = copy.copy(self.describe_cache_ttls)
+        cache_ttls.update(ttls or {})
+        self.describe_cache = DescribeCache(ttls=cache_ttls, default_ttl=default_ttl)
+        return self.describe_cache
+
+    def disable_describe_cache(self):
+        self.describe_cache = None
+
+    def enable_image_index(self, ttl=300):
+        """
+        Answer get_images() and get_emi() from an in memory index of all images, built from one DescribeImages
+        request and refreshed every 'ttl' seconds or after this tester changes images. See ImageIndex.
+
+        :param ttl: seconds before the index is refreshed
+        :return: ImageIndex obj
+        """
+        self.image_index = ImageIndex(self, ttl=ttl)
+        return self.image_index
+
+    def disable_image_index(self):
+        self.image_index = None
+
+    def invalidate_describe_cache(self, resource_type=None):
+        """
+        Drop cached describe responses for resource_type, or all cached responses if None.
+        Image changes also mark the image index for refresh.
+        """
+        if self.describe_cache:
+            self.describe_cache.invalidate(resource_type)
+        if self.image_index and resource_type in [None, 'images']:
+            self.image_index.stale = True
+
+    def _describe(self, resource_type, method, *args, **kwargs):
+        """
+        Returns method(*args, **kwargs), from the describe cache if enabled
+        """
+        if self.describe_cache is None:
+            return method(*args, **kwargs)
+        return self.describe_cache.get(resource_type, method, *args, **kwargs)
+
     def get_ec2_ip(self):
         """Parse the eucarc for the S3_URL"""
         ec2_url = self.parse_eucarc("EC2_URL")
@@ -203,6 +264,8 @@ disable_root: false"""
         self.debug("Adding the following tags:" + str(tags))
         self.debug("To Resources: " + str(resource_ids))
         self.ec2.create_tags(resource_ids=resource_ids, tags=tags)
+        #Tags may be used as filters by any cached describe
+        self.invalidate_describe_cache()
 
     def delete_tags(self, resource_ids, tags):
         """
@@ -214,6 +277,7 @@ disable_root: false"""
         self.debug("Deleting the following tags:" + str(tags))
         self.debug("From Resources: " + str(resource_ids))
         self.ec2.delete_tags(resource_ids=resource_ids, tags=tags)
+        self.invalidate_describe_cache()
 
     def add_keypair(self, key_name=None):
         """
@@ -234,6 +298,7 @@ disable_root: false"""
             self.debug( 'Creating keypair: %s' % key_name)
             # Create an SSH key to use when logging into instances.
             key = self.ec2.create_key_pair(key_name)
+            self.invalidate_describe_cache('keypairs')
             # AWS will store the public key but the private key is
             # generated and returned and needs to be stored locally.
             # The save method will also chmod the file to protect
@@ -321,6 +386,7 @@ disable_root: false"""
         name = keypair.name
         self.debug(  "Sending delete for keypair: " + name)
         keypair.delete()
+        self.invalidate_describe_cache('keypairs')
         try:
             keypair = self.ec2.get_all_key_pairs(keynames=[name])
         except EC2ResponseError:
@@ -393,6 +459,7 @@ disable_root: false"""
             if not description:
                 description = group_name
             group = self.ec2.create_security_group(group_name, description)
+            self.invalidate_describe_cache('security-groups')
             self.test_resources["security-groups"].append(group)
         return self.get_security_group(name=group_name)
 
@@ -406,6 +473,7 @@ disable_root: false"""
         name = group.name
         self.debug( "Sending delete for security group: " + name )
         group.delete()
+        self.invalidate_describe_cache('security-groups')
         if self.check_group(name):
             self.fail("Group still found after attempt to delete it")
             return False
@@ -479,6 +547,7 @@ disable_root: false"""
                                                          src_security_group_name=src_security_group_name,
                                                          src_security_group_owner_id=src_security_group_owner_id,
                                                          )
+            self.invalidate_describe_cache('security-groups')
             return True
         except self.ec2.ResponseError, e:
             if e.code == 'InvalidPermission.Duplicate':
@@ -544,26 +613,7 @@ disable_root: false"""
         if poll_count is not None:
             timeout = poll_count*10 
         self.debug( "Beginning poll loop for instance " + str(instance) + " to go to " + str(state) )
-        instance.update()
-        instance_original_state = instance.state
-        start = time.time()
-        elapsed = 0
-        ### If the instance changes state or goes to the desired state before my poll count is complete
-        while( elapsed <  timeout ) and (instance.state != state) and (instance.state != 'terminated'):
-            #poll_count -= 1
-            self.debug( "Instance("+instance.id+") State("+instance.state+"), elapsed:"+str(elapsed)+"/"+str(timeout))
-            time.sleep(10)
-            instance.update()
-            elapsed = int(time.time()- start)
-            if instance.state != instance_original_state:
-                break
-        self.debug("Instance("+instance.id+") State("+instance.state+") time elapsed (" +str(elapsed).split('.')[0]+")")
-        #self.debug( "Waited a total o" + str( (self.poll_count - poll_count) * 10 ) + " seconds" )
-        if instance.state != state:
-            raise Exception( str(instance) + " did not enter "+str(state)+" state after elapsed:"+str(elapsed))
-
-        self.debug( str(instance) + ' is now in ' + instance.state )
-        return True
+        return self.wait_for_reservation([instance], state=state, timeout=timeout)
 
     def wait_for_reservation(self,reservation, state="running",timeout=480):
         """
@@ -574,15 +624,42 @@ disable_root: false"""
         :param timeout: How long in seconds to wait for state
         :return: True on success
         """
-        aggregate_result = True
         instance_list = reservation
         if isinstance(reservation, Reservation):
             instance_list = reservation.instances
         self.debug( "Beginning poll loop for the " + str(len(instance_list))   + " instance found in " + str(instance_list) )
+        self.update_instances(instance_list)
+        waiter = EuWaiter(self, timeout=timeout, max_poll_interval=10)
         for instance in instance_list:
-            if not self.wait_for_instance(instance, state, timeout=timeout):
-                aggregate_result = False
-        return aggregate_result
+            ### Stop waiting on an instance once it reaches the state, terminates, or otherwise changes state
+            waiter.add(instance,
+                       lambda i, original_state=instance.state: i.state in [state, 'terminated', ] or
+                                                                i.state != original_state,
+                       description="Instance(" + str(instance.id) + ")")
+        waiter.wait(raise_on_failure=False)
+        for instance in instance_list:
+            self.debug("Instance(" + instance.id + ") State(" + instance.state + ")")
+            if instance.state != state:
+                raise Exception(str(instance) + " did not enter " + str(state) + " state, current state:" +
+                                str(instance.state))
+            self.debug( str(instance) + ' is now in ' + instance.state )
+        return True
+
+    def wait_for_resources(self, pairs, timeout=600, raise_on_failure=True):
+        """
+        Wait on many resources at once, each for its own predicate. Resources are updated with batched
+        describe requests per resource type each poll, see eutester.euwaiter.EuWaiter.
+
+        :param pairs: list of (resource, predicate) tuples, predicate(resource) returns True when done
+        :param timeout: seconds to wait for all the resources
+        :param raise_on_failure: raise an exception if any resource did not reach its state
+        :return: the EuWaiter used, ie for print_time_to_state()
+        """
+        waiter = EuWaiter(self, timeout=timeout)
+        for resource, predicate in pairs:
+            waiter.add(resource, predicate)
+        waiter.wait(raise_on_failure=raise_on_failure)
+        return waiter
     
     
     @Eutester.printinfo
@@ -712,7 +789,8 @@ disable_root: false"""
                                            poll_interval=10,
                                            deletefailed=True,
                                            size=1,
-                                           timepergig=120):
+                                           timepergig=120,
+                                           min_poll_interval=None):
         """
 
 
@@ -728,6 +806,7 @@ disable_root: false"""
         :param timepergig: integer, time allowed per gig before failing.
         :param poll_interval: int seconds to wait between polling for status
         :param size: int size in gigs to request for volume creation
+        :param min_poll_interval: int seconds, if set polling starts at this interval and backs off to poll_interval
         """
         
         retlist = []
@@ -748,9 +827,14 @@ disable_root: false"""
         # Wait for the volume to be created.
         self.debug( "Polling "+str(len(volumes))+" volumes for status:\""+str(state)+"\"...")
         start = time.time()
+        poll_intervals = self.get_poll_intervals(poll_interval, min_poll_interval=min_poll_interval)
+        describe_requests = 0
+        describe_requests_unbatched = 0
         while volumes:
+            #Update all the monitored volumes at once rather than one DescribeVolumes request per volume
+            describe_requests += self.update_volumes(volumes)
+            describe_requests_unbatched += len(volumes)
             for volume in volumes:
-                volume.update()
                 voltimeout = timepergig * (volume.size or size)
                 elapsed = time.time()-start
                 self.debug("Volume #"+str(volume.eutest_createorder)+" ("+volume.id+") State("+volume.status+
@@ -798,9 +882,12 @@ disable_root: false"""
             self.debug("----Time Elapsed:"+str(int(elapsed))+", Waiting on "+str(len(volumes))+
                        " volumes to enter state:"+str(state)+"-----")
             if volumes:
-                time.sleep(poll_interval)
+                time.sleep(poll_intervals.next())
             else:
                 break
+        self.debug('monitor_created_euvolumes_to_state made ' + str(describe_requests) +
+                   ' DescribeVolumes requests, saved ' + str(describe_requests_unbatched - describe_requests) +
+                   ' vs updating each volume per poll')
         #We have at least mincount of volumes, delete any failed volumes
         if failed and deletefailed:
             self.debug( "Deleting volumes that never became available...")
@@ -826,7 +913,8 @@ disable_root: false"""
                                    poll_interval=10,
                                    timeout=180,
                                    eof=True,
-                                   validate_args=True):
+                                   validate_args=True,
+                                   min_poll_interval=None):
         """
         (See: monitor_created_euvolumes_to_state() if monitoring newly created volumes, otherwise this method is
               intended for monitoring attached and in-use states of volume(s). )
@@ -843,6 +931,7 @@ disable_root: false"""
         :param eof: exit on first failure encountered, otherwise wait until other volumes pass/fail. Default=True
         :param validate_args: boolean, Will check args for a valid status/available_status pair.
                                 If False will monitor to a non-valid state for testing purposes
+        :param min_poll_interval: int seconds, if set polling starts at this interval and backs off to poll_interval
         """
         good = []
         failed = []
@@ -871,20 +960,24 @@ disable_root: false"""
         elapsed = 0
         self.debug('Updating volume list before monitoring...')
         for vol in euvolumes:
-            try:
-                vol = self.get_volume(vol.id)
-                if not isinstance(vol, EuVolume):
-                    vol = EuVolume.make_euvol_from_vol(vol,self)
-                monitor.append(vol)
-            except:
-                self.debug(self.get_traceback())
+            if not isinstance(vol, EuVolume):
+                vol = EuVolume.make_euvol_from_vol(vol,self)
+            monitor.append(vol)
+        describe_requests = self.update_volumes(monitor)
+        describe_requests_unbatched = len(monitor)
+        poll_intervals = self.get_poll_intervals(poll_interval, min_poll_interval=min_poll_interval)
 
         self.print_euvolume_list(monitor)
         while monitor and (elapsed < timeout):
             elapsed = int(time.time()-start)
+            last_attached_statuses = {}
             for vol in monitor:
-                last_attached_status = vol.eutest_attached_status
-                vol.update()
+                last_attached_statuses[vol.id] = vol.eutest_attached_status
+            #Update all the monitored volumes at once rather than one DescribeVolumes request per volume
+            describe_requests += self.update_volumes(monitor)
+            describe_requests_unbatched += len(monitor)
+            for vol in monitor:
+                last_attached_status = last_attached_statuses[vol.id]
                 if vol.eutest_attached_instance_id:
                     instance_debug_str = ', (att_instance'+str(vol.eutest_attached_instance_id)+")"
                 else:
@@ -913,11 +1006,14 @@ disable_root: false"""
                 if vol.status == status:
                         if vol.eutest_attached_status == attached_status:
                             good.append(monitor.pop(monitor.index(vol)))
+            next_poll_interval = poll_intervals.next()
             self.debug('Waiting for '+str(len(monitor))+ " remaining Volumes. Sleeping for poll_interval: "
-                       +str(poll_interval)+" seconds ...")
+                       +str(next_poll_interval)+" seconds ...")
             self.print_euvolume_list(euvolumes)
-            time.sleep(poll_interval)
-        self.debug('Done with monitor volumes after '+str(elapsed)+"/"+str(timeout)+"...")
+            time.sleep(next_poll_interval)
+        self.debug('Done with monitor volumes after '+str(elapsed)+"/"+str(timeout)+", made "+
+                   str(describe_requests)+" DescribeVolumes requests, saved "+
+                   str(describe_requests_unbatched - describe_requests)+" vs updating each volume per poll...")
         self.print_euvolume_list(euvolumes)
         if monitor:
             for vol in monitor:
@@ -982,11 +1078,10 @@ disable_root: false"""
             buf += snapshot.printself(title=False)
         self.debug("\n"+str(buf)+"\n")
 
-    def wait_for_volume(self, volume, status="available"):
-        def get_volume_state():
-            volume.update()
-            return volume.status
-        self.wait_for_result(get_volume_state, status)
+    def wait_for_volume(self, volume, status="available", timeout=60):
+        waiter = EuWaiter(self, timeout=timeout, max_poll_interval=10)
+        waiter.add(volume, lambda v: v.status == status, description="Volume(" + str(volume.id) + ")")
+        waiter.wait()
 
     def delete_volume(self, volume, poll_interval=10, timeout=180):
         """
@@ -1440,6 +1535,9 @@ disable_root: false"""
                     snapshot.eutest_volume_md5 = volume.md5
                     snapshot.eutest_volume_md5len = volume.md5len
                     snapshot.eutest_volume_zone = volume.zone
+                    #Only a fingerprint taken since the volume was last written describes the snapshot's data
+                    if volume.get_current_fingerprint():
+                        snapshot.set_volume_fingerprint(volume.get_current_fingerprint())
                     
                     snapshot.update()
                     if description and (not re.match(str(snapshot.description), str(description)) ):
@@ -1501,7 +1599,8 @@ disable_root: false"""
                                      poll_interval=10, 
                                      timeout=0,
                                      monitor_to_progress = None,
-                                     delete_failed=True ):
+                                     delete_failed=True,
+                                     min_poll_interval=None):
         """
         Monitor an EBS snapshot list for snapshots to enter the to the completed state.
         By default will poll for poll_count.  If wait_on_progress is specified than will wait on "wait_on_progress"
@@ -1519,6 +1618,8 @@ disable_root: false"""
         :param monitor_to_progress (optional integer): will consider the monitor successful and exit when the snapshot's
                                                         progress is >= this value
         :param delete_failed: (optional boolean) automatically delete failed volumes
+        :param min_poll_interval: (optional integer) if set polling starts at this interval and backs off to
+                                  poll_interval
         :return: EuSnapshot list
         """
               
@@ -1544,13 +1645,18 @@ disable_root: false"""
                 snap.eutest_poll_count = poll_count
         
         self.debug('Waiting for '+str(len(snapshots))+" snapshots to go to completed state...")
+        poll_intervals = self.get_poll_intervals(poll_interval, min_poll_interval=min_poll_interval)
+        describe_requests = 0
+        describe_requests_unbatched = 0
         
         while (timeout == 0 or elapsed <= timeout) and snapshots:
             self.debug("Waiting for "+str(len(snapshots))+" snapshots to complete creation")
+            #Update all the monitored snapshots at once rather than one DescribeSnapshots request per snapshot
+            describe_requests += self.update_snapshots(snapshots)
+            describe_requests_unbatched += len(snapshots)
             for snapshot in snapshots:
                 try:
                     snapshot.eutest_polls += 1
-                    snapshot.update()
                     snapshot.eutest_laststatus = snapshot.status
                     if snapshot.status == 'failed':
                         raise Exception(str(snapshot) + " failed after Polling("+str(snapshot.eutest_polls)+
@@ -1600,7 +1706,9 @@ disable_root: false"""
                         snapshots.remove(snapshot)
             elapsed = int(time.time()-monitor_start)
             if snapshots:
-                time.sleep(poll_interval)
+                time.sleep(poll_intervals.next())
+        self.debug('monitor_eusnaps_to_completed made ' + str(describe_requests) + ' DescribeSnapshots requests, saved ' +
+                   str(describe_requests_unbatched - describe_requests) + ' vs updating each snapshot per poll')
         for snap in snapshots:
             snapshot.eutest_failmsg = "Snapshot timed out in creation after "+str(elapsed)+" seconds"
             snapshot.eutest_timeintest = elapsed
@@ -1987,6 +2095,7 @@ disable_root: false"""
             raise Exception(
                 'deregister_image: Error attempting to get image:' + str(image.id) + ", err:" + str(tb) + '\n' + str(e))
         self.ec2.deregister_image(image.id)
+        self.invalidate_describe_cache('images')
         try:
             # make sure the image was removed (should throw an exception),if not make sure it is in the deregistered state
             # if it is still associated with a running instance'
@@ -2072,7 +2181,16 @@ disable_root: false"""
         if name is None:
              emi = "mi-"
 
-        images = self.ec2.get_all_images(filters=filters)
+        images = None
+        if self.image_index:
+            index_filters = dict(filters)
+            if name is None and 'image-id' not in filters:
+                #The default emi pattern selects images by id type, narrow to those ids from the prefix map
+                index_filters['id-prefix'] = self.image_index.get_id_prefixes(emi)
+            #Returns None if these filters need to be sent as a request
+            images = self.image_index.find(index_filters)
+        if images is None:
+            images = self._describe('images', self.ec2.get_all_images, filters=filters)
         self.debug("Got " + str(len(images)) + " total images " + str(emi) + ", now filtering..." )
         for image in images:
             if (re.search(emi, image.id) is None) and (re.search(emi, image.name) is None):
@@ -2932,7 +3050,7 @@ disable_root: false"""
         #Not sure if botos filter on group names and ids is reliable?
         if not id and not name:
             raise Exception('get_security_group needs either a name or an id')
-        groups = self.ec2.get_all_security_groups(groupnames=[name], group_ids=id)
+        groups = self._describe('security-groups', self.ec2.get_all_security_groups, groupnames=[name], group_ids=id)
         for group in groups:
             if not id or (id and group.id == id):
                 if not name or (name and group.name == name):
@@ -3013,7 +3131,8 @@ disable_root: false"""
         else:
             res = self.get_reservation_for_instance(instance)
         for group in res.groups:
-         secgroups.extend(self.ec2.get_all_security_groups(groupnames=str(group.id)))
+         secgroups.extend(self._describe('security-groups', self.ec2.get_all_security_groups,
+                                         groupnames=str(group.id)))
         return secgroups
     
     def get_reservation_for_instance(self, instance):
@@ -3035,6 +3154,121 @@ disable_root: false"""
                     return res
         raise Exception('No reservation found for instance:'+str(instance.id))
     
+    def update_instances(self, instances, chunk_size=100):
+        """
+        Definition: Update a list of instances in place using one DescribeInstances request per 'chunk_size'
+        instances rather than one request per instance. EuInstance and WinInstance objects also have
+        their last status recorded as they would by their own update().
+        If a chunk's request fails (ie an instance id is no longer found), that chunk falls back to per
+        instance updates.
+
+        :param instances: list of instance, euinstance or wininstance objs to update
+        :param chunk_size: max number of instance ids per DescribeInstances request
+        :return: int number of DescribeInstances requests made
+        """
+        def describe(ids):
+            found = []
+            for res in self.ec2.get_all_instances(instance_ids=ids):
+                found.extend(res.instances)
+            return found
+
+        def apply_update(instance, updated):
+            instance._update(updated)
+            if hasattr(instance, 'set_last_status'):
+                instance.set_last_status()
+
+        return self._update_resources_in_chunks(instances, describe, apply_update, chunk_size=chunk_size)
+
+    def update_volumes(self, volumes, chunk_size=100):
+        """
+        Definition: Update a list of volumes in place using one DescribeVolumes request per 'chunk_size'
+        volumes rather than one request per volume. See update_instances()
+
+        :param volumes: list of volume or euvolume objs to update
+        :param chunk_size: max number of volume ids per DescribeVolumes request
+        :return: int number of DescribeVolumes requests made
+        """
+        def apply_update(volume, updated):
+            if isinstance(volume, EuVolume):
+                volume.update_from_volume(updated)
+            else:
+                volume._update(updated)
+
+        return self._update_resources_in_chunks(volumes,
+                                                lambda ids: self.ec2.get_all_volumes(volume_ids=ids),
+                                                apply_update,
+                                                chunk_size=chunk_size)
+
+    def update_snapshots(self, snapshots, chunk_size=100):
+        """
+        Definition: Update a list of snapshots in place using one DescribeSnapshots request per 'chunk_size'
+        snapshots rather than one request per snapshot. See update_instances()
+
+        :param snapshots: list of snapshot or eusnapshot objs to update
+        :param chunk_size: max number of snapshot ids per DescribeSnapshots request
+        :return: int number of DescribeSnapshots requests made
+        """
+        def apply_update(snapshot, updated):
+            if isinstance(snapshot, EuSnapshot):
+                snapshot.update_from_snapshot(updated)
+            else:
+                snapshot._update(updated)
+
+        return self._update_resources_in_chunks(snapshots,
+                                                lambda ids: self.ec2.get_all_snapshots(snapshot_ids=ids),
+                                                apply_update,
+                                                chunk_size=chunk_size)
+
+    def _update_resources_in_chunks(self, resources, describe, apply_update, chunk_size=100):
+        """
+        Fetch 'resources' by id, 'chunk_size' ids per call to describe(ids), and apply each fetched obj to the
+        resource with the same id using apply_update(resource, fetched). Results are matched by id since
+        some describe requests may return more than was asked for.
+        If a chunk's describe fails with an EC2ResponseError, the chunk falls back to each resource's own update().
+        Returns the number of describe requests made.
+        """
+        if not isinstance(resources, types.ListType):
+            resources = [resources]
+        requests = 0
+        for index in xrange(0, len(resources), chunk_size):
+            chunk = resources[index:index + chunk_size]
+            requests += 1
+            try:
+                fetched = describe([resource.id for resource in chunk])
+            except EC2ResponseError, e:
+                self.debug('Batched update failed, updating resources individually. Err:' + str(e))
+                for resource in chunk:
+                    requests += 1
+                    try:
+                        resource.update()
+                    except EC2ResponseError, ue:
+                        self.debug('Failed to update:' + str(resource.id) + ', err:' + str(ue))
+                continue
+            updated = {}
+            for fetched_resource in fetched:
+                updated[fetched_resource.id] = fetched_resource
+            for resource in chunk:
+                if resource.id in updated:
+                    apply_update(resource, updated[resource.id])
+        return requests
+
+    @classmethod
+    def get_poll_intervals(cls, poll_interval, min_poll_interval=None, backoff=1.5):
+        """
+        Generator of the time to sleep between polls. If min_poll_interval is given, polling starts at
+        min_poll_interval and backs off by 'backoff' each poll up to poll_interval. This catches resources
+        which change state quickly early on, while not polling slow ones as often later.
+        Otherwise every poll uses poll_interval.
+
+        :param poll_interval: int/float seconds, the max (or fixed) time between polls
+        :param min_poll_interval: int/float seconds, the time before the first poll when adaptive
+        :param backoff: multiplier applied to the interval after each poll when adaptive
+        """
+        interval = min(min_poll_interval or poll_interval, poll_interval)
+        while True:
+            yield interval
+            interval = min(interval * backoff, poll_interval)
+
     @Eutester.printinfo    
     def monitor_euinstances_to_state(self,
                                      instance_list,
@@ -3067,6 +3301,8 @@ disable_root: false"""
         failmsg = None
         pollinterval = 10
         failmsg = ""
+        describe_requests = 0
+        describe_requests_unbatched = 0
         #If no min allowed successful instance count is given, set it to the length of the list provdied. 
         if min is None:
             min = len(instance_list)
@@ -3074,9 +3310,11 @@ disable_root: false"""
             elapsed = int(time.time() - start)
             self.debug("\n------>Waiting for remaining "+str(len(monitor))+"/"+str(len(instance_list))+
                        " instances to go to state:"+str(state)+', elapsed:('+str(elapsed)+'/'+str(timeout)+")...")
+            #Update all the monitored instances at once rather than one DescribeInstances request per instance
+            describe_requests += self.update_instances(monitor)
+            describe_requests_unbatched += len(monitor)
             for instance in monitor:
                 try:
-                    instance.update()
                     bdm_root_vol_status = None
                     bdm_root_vol_id = None
                     if instance.root_device_type == 'ebs':
@@ -3130,6 +3368,8 @@ disable_root: false"""
                 time.sleep(poll_interval)
                 
         self.print_euinstance_list(instance_list)
+        self.debug('monitor_euinstances_to_state made ' + str(describe_requests) + ' DescribeInstances requests, saved ' +
+                   str(describe_requests_unbatched - describe_requests) + ' vs updating each instance per poll')
         if monitor:
             failmsg = "Some instances did not go to state:"+str(state)+' within timeout:'+str(timeout)+"\nFailed:"
             for instance in monitor:
@@ -3216,10 +3456,13 @@ disable_root: false"""
         good = []
         start = time.time()
         zeros = re.compile(regex)
+        describe_requests = 0
+        describe_requests_unbatched = 0
         while monitoring and (elapsed <= timeout):
             elapsed = int(time.time()- start)
+            describe_requests += self.update_instances(monitoring)
+            describe_requests_unbatched += len(monitoring)
             for instance in monitoring:
-                instance.update()
                 if hasattr(instance, 'ip_address') and instance.ip_address and \
                         (zeros.search(str(instance.ip_address)) or zeros.search(str(instance.private_ip_address))):
                     self.debug(str(instance.id)+": WAITING for public ip. Current:"+str(instance.ip_address)+
@@ -3240,7 +3483,8 @@ disable_root: false"""
                 buf += "Instance: "+str(instance.id)+", public ip: "+str(instance.ip_address)+", private ip: "+str(instance.private_ip_address)+"\n"
             raise Exception(buf)
         self.check_system_for_dup_ip(instances=good)
-        self.debug('Wait_for_valid_ip done')
+        self.debug('Wait_for_valid_ip done, made ' + str(describe_requests) + ' DescribeInstances requests, saved ' +
+                   str(describe_requests_unbatched - describe_requests) + ' vs updating each instance per poll')
                 
     def check_system_for_dup_ip(self, instances=None):
         """
@@ -3376,7 +3620,7 @@ disable_root: false"""
         :raise: Exception on failure to find keypair
         """
         try:
-            return self.ec2.get_all_key_pairs([name])[0]
+            return self._describe('keypairs', self.ec2.get_all_key_pairs, [name])[0]
         except IndexError, e:
             raise Exception("Keypair: " + name + " not found")
         
@@ -3386,7 +3630,7 @@ disable_root: false"""
 
         :return: list of zone names
         """
-        zone_objects = self.ec2.get_all_zones()
+        zone_objects = self._describe('zones', self.ec2.get_all_zones)
         zone_names = []
         for zone in zone_objects:
             zone_names.append(zone.name)
@@ -3872,6 +4116,7 @@ disable_root: false"""
 
         rs = self.ec2.get_object('RegisterImage', params,
                                  ResultSet, verb='POST')
+        self.invalidate_describe_cache('images')
         image_id = getattr(rs, 'imageId', None)
         return image_id
 
@@ -3926,6 +4171,7 @@ disable_root: false"""
             else:
                 raise Exception("More than one image returned for: " + image_id)
         self.wait_for_result(get_emi_state, "available", timeout=timeout,poll_wait=20)
+        self.invalidate_describe_cache('images')
         return image_id
 
 
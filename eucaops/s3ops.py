@@ -31,13 +31,19 @@
 # Author: vic.iglesias@eucalyptus.com
 
 from eutester import Eutester
+from eutester.s3load import S3LoadGenerator
 import os
+import time
+import base64
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from boto.s3.connection import OrdinaryCallingFormat
 from boto.s3.key import Key
 from boto.s3.acl import ACL, Grant
-from boto.exception import S3ResponseError
+from boto.exception import S3ResponseError, BotoServerError
 from boto.s3.deletemarker import DeleteMarker
+from boto.s3.multipart import MultiPartUpload
 import boto.s3
 
 class S3opsException(Exception):
@@ -50,7 +56,60 @@ class S3opsException(Exception):
         self.msg = msg
     
     def __str__(self):
-        print self.msg
+        return str(self.msg)
+
+class EtagHasher():
+    """
+    Incrementally computes an object's md5 and, for each candidate part size, the multipart style etag
+    (the md5 of the concatenated part md5s followed by '-<part count>') from data fed to update() in any
+    size chunks. Only the running hashers and 16 bytes per completed part are kept, so memory use does not
+    grow with the size of the data.
+    """
+    def __init__(self, part_sizes=None):
+        self.md5 = hashlib.md5()
+        self.size = 0
+        self.parts = {}
+        for part_size in part_sizes or []:
+            # [completed part digests, current part hasher, bytes in current part]
+            self.parts[part_size] = [[], hashlib.md5(), 0]
+
+    def update(self, data):
+        self.md5.update(data)
+        self.size += len(data)
+        for part_size, state in self.parts.iteritems():
+            offset = 0
+            while offset < len(data):
+                chunk = data[offset:offset + part_size - state[2]]
+                state[1].update(chunk)
+                state[2] += len(chunk)
+                offset += len(chunk)
+                if state[2] == part_size:
+                    state[0].append(state[1].digest())
+                    state[1] = hashlib.md5()
+                    state[2] = 0
+
+    def get_etag(self, part_size=None):
+        """
+        Returns the plain md5 etag, or the multipart etag for part_size (which must have been a candidate)
+        """
+        if part_size is None:
+            return self.md5.hexdigest()
+        digests, current, current_size = self.parts[part_size]
+        if current_size:
+            digests = digests + [current.digest()]
+        return hashlib.md5("".join(digests)).hexdigest() + '-' + str(len(digests))
+
+    def match(self, etag):
+        """
+        Returns the part size whose etag matches 'etag', 0 for a plain md5 match, or None if nothing matches
+        """
+        etag = str(etag).strip('"')
+        if etag == self.get_etag():
+            return 0
+        for part_size in sorted(self.parts):
+            if etag == self.get_etag(part_size):
+                return part_size
+        return None
 
 class S3ops(Eutester):
     s3_groups = {
@@ -84,6 +143,8 @@ class S3ops(Eutester):
                                    }
             self.debug("Attempting to create S3 connection to " + endpoint + ':' + str(port) + path)
             self.s3 = boto.connect_s3(**s3_connection_args)
+            #Kept to create a connection per worker thread for parallel operations
+            self.s3_connection_args = s3_connection_args
         except Exception, e:
             raise Exception("Was unable to create S3 connection because of exception: " + str(e))
 
@@ -184,6 +245,208 @@ class S3ops(Eutester):
         self.test_resources["keys"].append(key)
         return key
     
+    def get_thread_s3_connection(self):
+        """
+        Returns an S3 connection for use only by the calling thread, boto connections should not be shared
+        between threads. Falls back to self.s3 if the connection args are not known.
+        """
+        connection_args = getattr(self, 's3_connection_args', None)
+        if not connection_args:
+            return self.s3
+        if not hasattr(self, '_s3_thread_local'):
+            self._s3_thread_local = threading.local()
+        connection = getattr(self._s3_thread_local, 'connection', None)
+        if connection is None:
+            connection = boto.connect_s3(**connection_args)
+            self._s3_thread_local.connection = connection
+        return connection
+
+    @classmethod
+    def get_file_part_md5(cls, fp, offset, size, readsize=1024 * 1024):
+        """
+        Returns the md5 hexdigest of 'size' bytes of the open file 'fp' starting at 'offset', read 'readsize'
+        bytes at a time. Leaves fp positioned at offset.
+        """
+        hasher = hashlib.md5()
+        fp.seek(offset)
+        remaining = size
+        while remaining > 0:
+            data = fp.read(min(readsize, remaining))
+            if not data:
+                break
+            hasher.update(data)
+            remaining -= len(data)
+        fp.seek(offset)
+        return hasher.hexdigest()
+
+    def _run_parts(self, parts, part_method, max_workers, retries):
+        """
+        Run part_method(part) for each part dict in a pool of max_workers threads, retrying each failed
+        part up to 'retries' more times. Records 'attempts', 'elapsed' (of the successful attempt) and 'error'
+        in each part. Returns the list of parts which still failed.
+        """
+        def run_part(part):
+            part['attempts'] = 0
+            while True:
+                part['attempts'] += 1
+                start = time.time()
+                try:
+                    part_method(part)
+                    part['elapsed'] = time.time() - start
+                    part['error'] = None
+                    return
+                except Exception, e:
+                    part['error'] = str(e)
+                    self.debug('Part ' + str(part['part']) + ' attempt ' + str(part['attempts']) +
+                               ' failed, err:' + str(e))
+                    if part['attempts'] > retries:
+                        return
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(run_part, parts))
+        return [part for part in parts if part['error']]
+
+    @classmethod
+    def get_transfer_summary(cls, parts, total_bytes, elapsed):
+        """
+        Returns a dict summarizing a parallel transfer: the parts, total bytes, elapsed seconds, aggregate MB/s
+        and the min/max part latency.
+        """
+        latencies = [part['elapsed'] for part in parts if part.get('elapsed') is not None]
+        return {'parts': parts,
+                'bytes': total_bytes,
+                'elapsed': elapsed,
+                'mbps': total_bytes / (elapsed or 1) / 1048576.0,
+                'min_part_latency': min(latencies) if latencies else None,
+                'max_part_latency': max(latencies) if latencies else None}
+
+    def upload_object_parallel(self, bucket_name, key_name, path_to_file, part_size=8 * 1024 * 1024,
+                               max_workers=4, retries=2):
+        """
+        Upload a local file as a multipart upload, uploading its parts concurrently. Each part's md5 is computed
+        by reading the part incrementally before it is sent, and checked against the etag returned for the part.
+        Only failed parts are retried. The upload is cancelled if a part still fails after its retries.
+        bucket_name   The name of the bucket
+        key_name      The name of the object to create
+        path_to_file  Fully qualified path to local file
+        part_size     Size in bytes of each part, at least 5MB for all but the last part
+        max_workers   Number of parts uploaded at once
+        retries       Number of times a failed part is retried
+        Returns a dict with the key, etag and each part's number/size/md5/latency/attempts, plus the
+        aggregate MB/s. See get_transfer_summary()
+        """
+        bucket = self.get_bucket_by_name(bucket_name)
+        if bucket == None:
+            raise S3opsException("Could not find bucket " + bucket_name + " to upload file")
+        file_size = os.path.getsize(path_to_file)
+        parts = []
+        for part_number, offset in enumerate(xrange(0, file_size or 1, part_size)):
+            parts.append({'part': part_number + 1, 'offset': offset, 'size': min(part_size, file_size - offset),
+                          'md5': None, 'etag': None})
+        start = time.time()
+        mp = bucket.initiate_multipart_upload(key_name)
+        self.debug("Uploading " + str(path_to_file) + " (" + str(file_size) + " bytes) to " + str(bucket_name) +
+                   "/" + str(key_name) + " in " + str(len(parts)) + " parts, " + str(max_workers) + " at a time")
+
+        def upload_part(part):
+            # Each worker uses its own connection, so build a multipart upload obj on it
+            thread_mp = MultiPartUpload(self.get_thread_s3_connection().get_bucket(bucket_name, validate=False))
+            thread_mp.key_name = mp.key_name
+            thread_mp.id = mp.id
+            with open(path_to_file, 'rb') as fp:
+                md5 = self.get_file_part_md5(fp, part['offset'], part['size'])
+                part['md5'] = md5
+                key = thread_mp.upload_part_from_file(fp, part['part'], size=part['size'],
+                                                      md5=(md5, base64.b64encode(md5.decode('hex'))))
+            part['etag'] = str(key.etag).strip('"')
+            if part['etag'] != md5:
+                raise S3opsException('Part ' + str(part['part']) + ' etag:' + str(part['etag']) +
+                                     ' != md5:' + str(md5))
+
+        failed = self._run_parts(parts, upload_part, max_workers, retries)
+        if failed:
+            mp.cancel_upload()
+            raise S3opsException("Multipart upload of " + str(key_name) + " cancelled, failed parts:" +
+                                 ", ".join(str(part['part']) + ":" + str(part['error']) for part in failed))
+        completed = mp.complete_upload()
+        # The multipart etag is the md5 of the part md5s, so the whole upload is checked without rereading the file
+        expected_etag = hashlib.md5("".join(part['md5'].decode('hex') for part in parts)).hexdigest() + \
+                        '-' + str(len(parts))
+        if str(completed.etag).strip('"') != expected_etag:
+            raise S3opsException("Multipart upload of " + str(key_name) + " etag:" + str(completed.etag) +
+                                 " != expected:" + expected_etag)
+        key = bucket.get_key(key_name)
+        self.test_resources["keys"].append(key)
+        summary = self.get_transfer_summary(parts, file_size, time.time() - start)
+        summary['key'] = key
+        summary['etag'] = str(completed.etag).strip('"')
+        self.debug("Uploaded key: " + str(key_name) + " to bucket:" + str(bucket_name) + ", " +
+                   ("%.2f" % summary['mbps']) + " MB/s")
+        return summary
+
+    def download_object_parallel(self, bucket_name, key_name, path_to_file, part_size=8 * 1024 * 1024,
+                                 max_workers=4, retries=2, readsize=1024 * 1024):
+        """
+        Download an object to a local file using concurrent ranged GETs. Each range writes straight into its
+        own region of the preallocated file and its md5 is computed as it is read. Only failed ranges are retried.
+        bucket_name   The name of the bucket
+        key_name      The name of the object to download
+        path_to_file  Fully qualified path to the local file to write
+        part_size     Size in bytes of each range
+        max_workers   Number of ranges downloaded at once
+        retries       Number of times a failed range is retried
+        readsize      Bytes read and written per iteration
+        Returns a dict with each part's number/offset/size/md5/latency/attempts, plus the object's etag and
+        the aggregate MB/s. See get_transfer_summary()
+        """
+        bucket = self.get_bucket_by_name(bucket_name)
+        if bucket == None:
+            raise S3opsException("Could not find bucket " + bucket_name + " to download from")
+        key = bucket.get_key(key_name)
+        if key is None:
+            raise S3opsException("Could not find key " + str(key_name) + " in bucket " + str(bucket_name))
+        object_size = int(key.size)
+        parts = []
+        for part_number, offset in enumerate(xrange(0, object_size, part_size)):
+            parts.append({'part': part_number + 1, 'offset': offset, 'size': min(part_size, object_size - offset),
+                          'md5': None})
+        with open(path_to_file, 'wb') as fp:
+            fp.truncate(object_size)
+        start = time.time()
+        self.debug("Downloading " + str(bucket_name) + "/" + str(key_name) + " (" + str(object_size) +
+                   " bytes) to " + str(path_to_file) + " in " + str(len(parts)) + " ranges, " + str(max_workers) +
+                   " at a time")
+
+        def download_part(part):
+            thread_key = Key(self.get_thread_s3_connection().get_bucket(bucket_name, validate=False), key_name)
+            end = part['offset'] + part['size'] - 1
+            thread_key.open_read(headers={'Range': 'bytes=' + str(part['offset']) + '-' + str(end)})
+            hasher = hashlib.md5()
+            received = 0
+            try:
+                with open(path_to_file, 'r+b') as fp:
+                    fp.seek(part['offset'])
+                    for data in iter(lambda: thread_key.read(readsize), ''):
+                        fp.write(data)
+                        hasher.update(data)
+                        received += len(data)
+            finally:
+                thread_key.close()
+            if received != part['size']:
+                raise S3opsException('Range ' + str(part['offset']) + '-' + str(end) + ' got ' + str(received) +
+                                     ' bytes, expected ' + str(part['size']))
+            part['md5'] = hasher.hexdigest()
+
+        failed = self._run_parts(parts, download_part, max_workers, retries)
+        if failed:
+            raise S3opsException("Download of " + str(key_name) + " failed, failed ranges:" +
+                                 ", ".join(str(part['part']) + ":" + str(part['error']) for part in failed))
+        summary = self.get_transfer_summary(parts, object_size, time.time() - start)
+        summary['etag'] = str(key.etag).strip('"')
+        self.debug("Downloaded key: " + str(key_name) + " from bucket:" + str(bucket_name) + ", " +
+                   ("%.2f" % summary['mbps']) + " MB/s")
+        return summary
+
     def get_objects_by_prefix(self, bucket_name, prefix):
         """
         Get keys in the specified bucket that match the prefix if no prefix is passed all objects are returned
@@ -208,17 +471,26 @@ class S3ops(Eutester):
         except Exception, e:
             return
         
-    def clear_bucket(self, bucket_name=None):
+    def clear_bucket(self, bucket_name=None, bulk=False, batch_size=1000, max_workers=4):
         """Deletes the contents of the bucket specified and the bucket itself
             THIS WILL DELETE EVERYTHING!
            bucket       bucket name to clear
+           bulk         use multi-object delete batches, see bulk_clear_bucket()
+           batch_size   max keys per multi-object delete when bulk
+           max_workers  number of concurrent multi-object deletes when bulk
         """
         try :
             bucket = self.s3.get_bucket(bucket_name=bucket_name)      
         except S3ResponseError as e:
             self.debug('No bucket' + bucket_name + ' found: ' + e.message)
             raise Exception('Not found')
-        
+
+        if bulk:
+            self.bulk_clear_bucket(bucket, batch_size=batch_size, max_workers=max_workers)
+            self.debug(  "Deleting bucket " + bucket.name )
+            bucket.delete()
+            return
+
         try:
             self.debug( "Getting bucket listing for " + bucket.name )     
             self.debug(  "Iterating throught the bucket" )
@@ -255,6 +527,127 @@ class S3ops(Eutester):
             else:
                 self.debug('Got ' + e.message + ' and status ' + str(e.status))
                     
+    def bulk_clear_bucket(self, bucket, batch_size=1000, max_workers=4, prefix=''):
+        """
+        Deletes every key, key version and delete marker in a bucket (but not the bucket itself) using
+        multi-object delete requests of up to batch_size keys, max_workers requests at a time.
+        The version listing is paged through as batches are deleted rather than being read up front,
+        and at most 2 x max_workers batches are held at once. Buckets which do not support version listing
+        are listed by key instead, and batches the server will not multi-delete fall back to deleting each key.
+        bucket       bucket obj to clear
+        batch_size   max keys per multi-object delete, 1000 at most
+        max_workers  number of concurrent multi-object deletes
+        prefix       only clear keys starting with this prefix
+        Returns a dict with the counts of keys deleted and errors, the elapsed time and keys per second.
+        """
+        batch_size = min(batch_size, 1000)
+        bucket_name = bucket.name
+        stats = {'deleted': 0, 'errors': 0, 'batches': 0}
+        stats_lock = threading.Lock()
+        start = time.time()
+
+        def delete_batch(batch):
+            thread_bucket = self.get_thread_s3_connection().get_bucket(bucket_name, validate=False)
+            try:
+                result = thread_bucket.delete_keys(batch, quiet=True)
+                deleted = len(batch) - len(result.errors)
+                errors = result.errors
+            except S3ResponseError, e:
+                #Multi-object delete not supported by this server, delete the batch one key at a time
+                self.debug('Multi-object delete failed (' + str(e.status) + '), deleting batch by key')
+                deleted = 0
+                errors = []
+                for key_name, version_id in batch:
+                    try:
+                        thread_bucket.delete_key(key_name, version_id=version_id)
+                        deleted += 1
+                    except S3ResponseError, ke:
+                        ke.key = key_name
+                        ke.version_id = version_id
+                        errors.append(ke)
+            for error in errors:
+                #Multi-delete errors carry code/message, S3ResponseErrors from the per key fallback carry error_code
+                code = getattr(error, 'error_code', None) or getattr(error, 'code', None) or getattr(error, 'status', None)
+                message = getattr(error, 'message', None) or getattr(error, 'reason', None)
+                if code is None and message is None:
+                    code, message = 'Unknown', 'server returned no error code or message'
+                self.debug('Error deleting key:' + str(error.key) + ', version:' + str(error.version_id) + ', ' +
+                           str(code) + ' ' + str(message))
+            with stats_lock:
+                stats['deleted'] += deleted
+                stats['errors'] += len(errors)
+                stats['batches'] += 1
+                elapsed = time.time() - start
+                self.debug('Cleared ' + str(stats['deleted']) + ' keys from ' + str(bucket_name) + ' in ' +
+                           str(stats['batches']) + ' batches, ' + ("%.1f" % (stats['deleted'] / (elapsed or 1))) +
+                           ' keys/sec')
+
+        def list_keys():
+            listed = 0
+            last = None
+            try:
+                for k in bucket.list_versions(prefix=prefix):
+                    #Some servers list each overwrite of an unversioned key under the same version id, only
+                    #send each key/version once or the repeat fails within the multi-delete
+                    if isinstance(k, (Key, DeleteMarker)) and (k.name, k.version_id) != last:
+                        listed += 1
+                        last = (k.name, k.version_id)
+                        yield last
+            except BotoServerError, e:
+                if listed:
+                    raise
+                self.debug('Version listing not supported (' + str(e.status) + '), listing keys')
+                for k in bucket.list(prefix=prefix):
+                    if isinstance(k, Key):
+                        yield (k.name, None)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = []
+            batch = []
+            for key in list_keys():
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    pending.append(executor.submit(delete_batch, batch))
+                    batch = []
+                    #Bound the number of batches held in memory
+                    while len(pending) >= 2 * max_workers:
+                        pending.pop(0).result()
+            if batch:
+                pending.append(executor.submit(delete_batch, batch))
+            for future in pending:
+                future.result()
+        stats['elapsed'] = time.time() - start
+        stats['keys_per_sec'] = stats['deleted'] / (stats['elapsed'] or 1)
+        self.debug('Bulk clear of ' + str(bucket_name) + ' done, deleted:' + str(stats['deleted']) + ', errors:' +
+                   str(stats['errors']) + ', elapsed:' + ("%.2f" % stats['elapsed']) + ', ' +
+                   ("%.1f" % stats['keys_per_sec']) + ' keys/sec')
+        return stats
+
+    def run_load(self, duration=60, workers=8, operations=None, buckets=2, keys_per_bucket=100, object_size=1024,
+                 mix=None, cleanup=True, printmethod=None):
+        """
+        Run a mix of PUT/GET/HEAD/DELETE/LIST requests against new buckets from concurrent workers, see
+        eutester.s3load.S3LoadGenerator. Prints and returns the per operation throughput and latency results.
+        duration         seconds to run the load for
+        workers          number of concurrent workers
+        operations       optional total number of operations, the load stops at this or duration
+        buckets          number of buckets to spread the load across
+        keys_per_bucket  number of key names used per bucket
+        object_size      bytes per put, or a (min, max) tuple
+        mix              dict of operation -> relative weight, ie {'put':30, 'get':50, 'head':10, 'delete':5, 'list':5}
+        cleanup          delete the load buckets afterwards
+        """
+        load = S3LoadGenerator(self, buckets=buckets, keys_per_bucket=keys_per_bucket, object_size=object_size,
+                               mix=mix)
+        load.setup()
+        try:
+            results = load.run(duration=duration, workers=workers, operations=operations)
+            load.print_results(printmethod=printmethod)
+        finally:
+            if cleanup:
+                load.cleanup()
+        return results
+
     def clear_keys_with_prefix(self, bucket, prefix):
         try :
             listing = self.walrus.get_all_buckets()        
@@ -340,11 +733,144 @@ class S3ops(Eutester):
             
         return not len(acl1grants.symmetric_difference(acl2grants)) > 0
 
-    def check_md5(self, eTag=None, data=None):
-        hasher = hashlib.md5()
+    def check_md5(self, eTag=None, data=None, part_size=None):
+        """
+        Check that 'data' matches eTag, either as a plain md5 or, for a multipart etag, as the md5 of its
+        part md5s. See get_etag_part_sizes() for the part sizes tried when part_size is not given.
+        """
+        digest, part_count = self.parse_etag(eTag)
+        hasher = EtagHasher(self.get_etag_part_sizes(len(data), part_count, part_size))
         hasher.update(data)
-        data_hash = "\"" + hasher.hexdigest() + "\""
-        if data_hash != eTag:
-            raise Exception( "Hash/eTag mismatch: \nhash = " + data_hash + "\neTag= " + eTag)
+        if hasher.match(eTag) is None:
+            raise Exception( "Hash/eTag mismatch: \nhash = \"" + hasher.get_etag() + "\"\neTag= " + eTag)
+
+    # Part sizes commonly used by S3 clients, tried when verifying a multipart etag of unknown part size
+    etag_part_sizes = [size * 1024 * 1024 for size in [5, 8, 10, 15, 16, 25, 32, 50, 64, 100, 128, 256, 512, 1024]]
+
+    @classmethod
+    def parse_etag(cls, etag):
+        """
+        Returns a (md5 hexdigest, part count) tuple for an etag, part count is None for a non-multipart etag
+        """
+        etag = str(etag).strip('"')
+        if '-' in etag:
+            digest, part_count = etag.split('-', 1)
+            return digest, int(part_count)
+        return etag, None
+
+    @classmethod
+    def get_etag_part_sizes(cls, object_size, part_count, part_size=None):
+        """
+        Returns the candidate part sizes for an object of object_size bytes uploaded in part_count parts.
+        The etag only records the part count, so this is part_size if given, otherwise each of etag_part_sizes
+        which gives part_count parts, plus the object size divided by part_count rounded up to a whole MB.
+        """
+        if not part_count:
+            return []
+        if part_size:
+            return [part_size]
+        sizes = set(size for size in cls.etag_part_sizes if (object_size + size - 1) / size == part_count)
+        megabyte = 1024 * 1024
+        min_size = (object_size + part_count - 1) / part_count
+        rounded = ((min_size + megabyte - 1) / megabyte) * megabyte
+        for size in [min_size, rounded]:
+            if size and (object_size + size - 1) / size == part_count:
+                sizes.add(size)
+        return sorted(sizes)
+
+    def verify_object_etag(self, bucket_name, key_name, part_size=None, readsize=1024 * 1024, raise_on_mismatch=True):
+        """
+        Stream an object and check its content against its etag, without holding the object in memory.
+        Multipart etags are checked against the md5 of the part md5s, see get_etag_part_sizes().
+        bucket_name        The name of the bucket
+        key_name           The name of the object to verify
+        part_size          Part size the object was uploaded with, if known
+        readsize           Bytes read per iteration
+        raise_on_mismatch  Raise S3opsException if the content does not match the etag
+        Returns a dict with the key name, etag, computed md5, matched part size, bytes, elapsed and 'ok'.
+        """
+        bucket = self.get_thread_s3_connection().get_bucket(bucket_name, validate=False)
+        key = bucket.get_key(key_name)
+        if key is None:
+            raise S3opsException("Could not find key " + str(key_name) + " in bucket " + str(bucket_name))
+        digest, part_count = self.parse_etag(key.etag)
+        hasher = EtagHasher(self.get_etag_part_sizes(int(key.size), part_count, part_size))
+        start = time.time()
+        key.open_read()
+        try:
+            for data in iter(lambda: key.read(readsize), ''):
+                hasher.update(data)
+        finally:
+            key.close()
+        return self._get_etag_result(key_name, key.etag, hasher, time.time() - start, raise_on_mismatch)
+
+    def verify_file_etag(self, path_to_file, etag, part_size=None, readsize=1024 * 1024, raise_on_mismatch=True):
+        """
+        Check a local file against an etag, ie the etag returned when uploading the file, reading the file
+        'readsize' bytes at a time. See verify_object_etag() for the arguments and return value.
+        """
+        digest, part_count = self.parse_etag(etag)
+        hasher = EtagHasher(self.get_etag_part_sizes(os.path.getsize(path_to_file), part_count, part_size))
+        start = time.time()
+        with open(path_to_file, 'rb') as fp:
+            for data in iter(lambda: fp.read(readsize), ''):
+                hasher.update(data)
+        return self._get_etag_result(path_to_file, etag, hasher, time.time() - start, raise_on_mismatch)
+
+    def _get_etag_result(self, name, etag, hasher, elapsed, raise_on_mismatch):
+        matched = hasher.match(etag)
+        result = {'name': name,
+                  'etag': str(etag).strip('"'),
+                  'md5': hasher.get_etag(),
+                  'part_size': matched,
+                  'bytes': hasher.size,
+                  'elapsed': elapsed,
+                  'ok': matched is not None}
+        if not result['ok']:
+            msg = "Hash/eTag mismatch for " + str(name) + ": md5 = " + result['md5'] + ", eTag = " + result['etag']
+            if hasher.parts:
+                msg += ", part sizes tried:" + ",".join(str(size) for size in sorted(hasher.parts))
+            if raise_on_mismatch:
+                raise S3opsException(msg)
+            self.debug(msg)
+        return result
+
+    def verify_objects(self, bucket_name, key_names=None, prefix='', max_workers=8, part_size=None,
+                       readsize=1024 * 1024, raise_on_failure=True):
+        """
+        Verify many objects against their etags concurrently, streaming each one, see verify_object_etag().
+        bucket_name       The name of the bucket
+        key_names         Names of the objects to verify, defaults to every object in the bucket with 'prefix'
+        prefix            Prefix of the objects to verify when key_names is not given
+        max_workers       Number of objects verified at once
+        part_size         Part size the objects were uploaded with, if known
+        raise_on_failure  Raise S3opsException listing the objects which did not verify
+        Returns a list of result dicts, objects which could not be read have 'ok' False and an 'error'.
+        """
+        if key_names is None:
+            key_names = (key.name for key in self.get_bucket_by_name(bucket_name).list(prefix=prefix)
+                         if isinstance(key, Key))
+
+        def verify(key_name):
+            try:
+                return self.verify_object_etag(bucket_name, key_name, part_size=part_size, readsize=readsize,
+                                               raise_on_mismatch=False)
+            except Exception, e:
+                return {'name': key_name, 'ok': False, 'bytes': 0, 'error': str(e)}
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(verify, key_names))
+        elapsed = time.time() - start
+        failed = [result for result in results if not result['ok']]
+        total_bytes = sum(result['bytes'] for result in results)
+        self.debug("Verified " + str(len(results) - len(failed)) + "/" + str(len(results)) + " objects in " +
+                   str(bucket_name) + ", " + str(total_bytes) + " bytes in " + ("%.2f" % elapsed) + " seconds, " +
+                   ("%.2f" % (total_bytes / (elapsed or 1) / 1048576.0)) + " MB/s")
+        if failed and raise_on_failure:
+            raise S3opsException("Objects failed etag verification in " + str(bucket_name) + ": " +
+                                 ", ".join(str(result['name']) + ":" + str(result.get('error', 'mismatch'))
+                                           for result in failed))
+        return results
             
                 
\ No newline at end of file
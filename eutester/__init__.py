@@ -44,6 +44,7 @@ import sys
 import traceback
 import StringIO
 import eulogger
+import apitimings
 import types
 import operator
 
@@ -410,6 +411,27 @@ class Eutester(object):
         except Exception, e:
                 buf = "Could not get traceback"+str(e)
         return str(buf) 
+
+    def enable_api_timings(self, dumpfile=None):
+        '''
+        Time every cloud API request and ssh cmd() made in this process, see eutester.apitimings.
+        If dumpfile is given the timings are written to it (csv if it ends in '.csv', else json) at exit.
+        Returns the process wide timing registry.
+        '''
+        apitimings.registry.enable(dumpfile=dumpfile)
+        return apitimings.registry
+
+    def disable_api_timings(self):
+        apitimings.registry.disable()
+
+    def print_api_timings(self, printmethod=None, limit=None):
+        '''
+        Print count, errors, total time and latency percentiles per API operation, most total time first
+        '''
+        return apitimings.registry.print_stats(printmethod=printmethod or self.debug, limit=limit)
+
+    def dump_api_timings(self, path):
+        apitimings.registry.dump(path)
     
     def __str__(self):
         return 'got self'
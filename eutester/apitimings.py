@@ -0,0 +1,237 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009-2011, Eucalyptus Systems, Inc.
+# All rights reserved.
+#
+# Redistribution and use of this software in source and binary forms, with or
+# without modification, are permitted provided that the following conditions
+# are met:
+#
+#   Redistributions of source code must retain the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer in the documentation and/or other
+#   materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+'''
+Timing of cloud API requests and ssh commands.
+
+Once enabled, every request made through a boto query connection (EC2, IAM, STS, AutoScaling, ELB,
+CloudWatch, CloudFormation), every S3 request and every SshConnection.cmd() in this process is timed and
+recorded in the module level 'registry' by operation name, ie 'ec2:DescribeInstances',
+'s3:PUT object', 'ssh:dd'. Since the hooks are on the connection classes this covers calls made through
+EC2ops, S3ops, IAMops, ASops, ELBops and CWops as well as direct boto calls. S3 times are to the response
+headers, streamed bodies are read after the request returns.
+
+example:
+    from eutester import apitimings
+    apitimings.registry.enable(dumpfile='/tmp/api_timings.json')
+    ... run tests ...
+    apitimings.registry.print_stats(printmethod=tester.debug)
+    # the registry is also written to dumpfile (json, or csv if it ends in .csv) at exit
+'''
+import atexit
+import csv
+import json
+import threading
+import time
+from boto.connection import AWSQueryConnection
+from boto.s3.connection import S3Connection
+
+
+class OperationTimings():
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+
+    def get_percentile(self, percent):
+        latencies = sorted(self.latencies)
+        index = int(round((percent / 100.0) * len(latencies))) - 1
+        return latencies[min(max(index, 0), len(latencies) - 1)]
+
+    def get_summary(self):
+        total = sum(self.latencies)
+        return {'operation': self.name,
+                'count': len(self.latencies),
+                'errors': self.errors,
+                'total': total,
+                'mean': total / len(self.latencies),
+                'min': min(self.latencies),
+                'p50': self.get_percentile(50),
+                'p95': self.get_percentile(95),
+                'p99': self.get_percentile(99),
+                'max': max(self.latencies)}
+
+
+class ApiTimings():
+    summary_fields = ['operation', 'count', 'errors', 'total', 'mean', 'min', 'p50', 'p95', 'p99', 'max']
+
+    def __init__(self):
+        self.operations = {}
+        self.enabled = False
+        self.dumpfile = None
+        self._originals = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, elapsed, error=False):
+        with self._lock:
+            operation = self.operations.get(name)
+            if operation is None:
+                operation = self.operations[name] = OperationTimings(name)
+            operation.latencies.append(elapsed)
+            if error:
+                operation.errors += 1
+
+    def timed(self, get_name, is_error=None):
+        '''
+        Returns a decorator recording the time of each call of the decorated method under
+        get_name(*args, **kwargs). A call is an error if it raises or is_error(return value) is True.
+        '''
+        def decorator(method):
+            def timed_method(*args, **kwargs):
+                start = time.time()
+                error = True
+                try:
+                    ret = method(*args, **kwargs)
+                    error = bool(is_error and is_error(ret))
+                    return ret
+                finally:
+                    try:
+                        self.record(get_name(*args, **kwargs), time.time() - start, error=error)
+                    except Exception:
+                        pass
+            timed_method.__name__ = method.__name__
+            timed_method.__doc__ = method.__doc__
+            return timed_method
+        return decorator
+
+    @classmethod
+    def get_service_name(cls, connection):
+        return connection.__class__.__name__.replace('Connection', '').lower() or 'aws'
+
+    @classmethod
+    def get_query_name(cls, connection, action, *args, **kwargs):
+        return cls.get_service_name(connection) + ':' + str(action)
+
+    @classmethod
+    def get_s3_name(cls, connection, method, bucket='', key='', headers=None, data='', query_args=None, *args,
+                    **kwargs):
+        name = 's3:' + str(method) + ' ' + ('object' if key else 'bucket' if bucket else 'service')
+        if query_args:
+            name += '?' + str(query_args).split('&')[0].split('=')[0]
+        return name
+
+    @classmethod
+    def get_ssh_name(cls, connection, cmd, *args, **kwargs):
+        words = str(cmd).split()
+        return 'ssh:' + (words[0].split('/')[-1] if words else '')
+
+    @classmethod
+    def is_error_response(cls, response):
+        return getattr(response, 'status', 200) >= 400
+
+    @classmethod
+    def is_error_status(cls, ret):
+        return isinstance(ret, dict) and ret.get('status') not in [0, None]
+
+    def enable(self, dumpfile=None):
+        '''
+        Start timing API requests and ssh commands made in this process.
+
+        :param dumpfile: optional path the registry is written to at exit, as csv if it ends in '.csv' else json
+        '''
+        #sshconnection can only be imported once eucaops has been, which a standalone script may not have done
+        import eucaops
+        from eutester.sshconnection import SshConnection
+        if dumpfile:
+            if not self.dumpfile:
+                atexit.register(self._dump_at_exit)
+            self.dumpfile = dumpfile
+        if self.enabled:
+            return
+        hooks = [(AWSQueryConnection, 'make_request', self.get_query_name, self.is_error_response),
+                 (S3Connection, 'make_request', self.get_s3_name, self.is_error_response),
+                 (SshConnection, 'cmd', self.get_ssh_name, self.is_error_status)]
+        for cls, method_name, get_name, is_error in hooks:
+            original = cls.__dict__[method_name]
+            self._originals[(cls, method_name)] = original
+            setattr(cls, method_name, self.timed(get_name, is_error)(original))
+        self.enabled = True
+
+    def disable(self):
+        '''
+        Stop timing, the recorded timings are kept until reset()
+        '''
+        for (cls, method_name), original in self._originals.iteritems():
+            setattr(cls, method_name, original)
+        self._originals = {}
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.operations = {}
+
+    def get_stats(self):
+        '''
+        Returns a list of summary dicts, one per operation, sorted by total time spent descending.
+        Times are in seconds.
+        '''
+        with self._lock:
+            summaries = [operation.get_summary() for operation in self.operations.values()]
+        return sorted(summaries, key=lambda summary: summary['total'], reverse=True)
+
+    def print_stats(self, printmethod=None, limit=None):
+        stats = self.get_stats()
+        grand_total = sum(summary['total'] for summary in stats) or 1
+        buf = ("\n" + "OPERATION".ljust(40) + "COUNT".rjust(8) + "ERRORS".rjust(8) + "TOTAL(s)".rjust(10) +
+               "%TIME".rjust(7) + "MEAN(ms)".rjust(10) + "P50(ms)".rjust(10) + "P95(ms)".rjust(10) +
+               "P99(ms)".rjust(10) + "MAX(ms)".rjust(10) + "\n")
+        for summary in stats[:limit]:
+            buf += (str(summary['operation'])[:39].ljust(40) + str(summary['count']).rjust(8) +
+                    str(summary['errors']).rjust(8) + ('%.2f' % summary['total']).rjust(10) +
+                    ('%.1f' % (100 * summary['total'] / grand_total)).rjust(7))
+            for field in ['mean', 'p50', 'p95', 'p99', 'max']:
+                buf += ('%.1f' % (summary[field] * 1000)).rjust(10)
+            buf += "\n"
+        if printmethod:
+            printmethod(buf)
+        return buf
+
+    def dump_json(self, path):
+        with open(path, 'w') as dumpfile:
+            json.dump(self.get_stats(), dumpfile, indent=2)
+
+    def dump_csv(self, path):
+        with open(path, 'wb') as dumpfile:
+            writer = csv.DictWriter(dumpfile, fieldnames=self.summary_fields)
+            writer.writeheader()
+            for summary in self.get_stats():
+                writer.writerow(summary)
+
+    def dump(self, path):
+        if str(path).endswith('.csv'):
+            self.dump_csv(path)
+        else:
+            self.dump_json(path)
+
+    def _dump_at_exit(self):
+        if self.dumpfile and self.operations:
+            self.dump(self.dumpfile)
+
+
+registry = ApiTimings()
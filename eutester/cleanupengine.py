@@ -0,0 +1,342 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009-2011, Eucalyptus Systems, Inc.
+# All rights reserved.
+#
+# Redistribution and use of this software in source and binary forms, with or
+# without modification, are permitted provided that the following conditions
+# are met:
+#
+#   Redistributions of source code must retain the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer in the documentation and/or other
+#   materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+'''
+Dependency aware, concurrent cleanup of the artifacts a tester tracks in its test_resources.
+
+Resources are deleted in stages so nothing is deleted while something which can depend on it still exists:
+auto scaling groups/load balancers -> instances/launch configs -> addresses/volumes/images/s3 keys ->
+snapshots -> security groups/keypairs and everything else. Within a stage every deletion is sent
+concurrently, then the stage waits for the resources which go away asynchronously (instances, volumes,
+snapshots, auto scaling groups) using one batched describe per resource type per poll.
+Each stage's timing and any resources left behind are recorded, see print_results().
+
+example:
+    engine = CleanupEngine(tester, max_workers=8)
+    engine.run()
+    engine.print_results()
+'''
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from boto.ec2.image import Image
+from boto.ec2.instance import Reservation
+from boto.exception import BotoServerError
+
+
+class CleanupStage():
+    def __init__(self, name, resource_keys):
+        '''
+        :param name: name of the stage used in debug and the results
+        :param resource_keys: list of test_resources keys deleted in this stage
+        '''
+        self.name = name
+        self.resource_keys = resource_keys
+        self.items = 0
+        self.deleted = 0
+        self.elapsed = 0
+        # list of (resource key, item, error) for items not deleted
+        self.leftovers = []
+
+
+class CleanupEngine():
+    # Stages in the order they run, test_resources keys not listed here are deleted in the last stage
+    stage_order = [('autoscaling/elb', ['auto-scaling-groups', 'load_balancers']),
+                   ('instances', ['reservations', 'launch-configurations']),
+                   ('addresses/volumes/images', ['addresses', 'volumes', 'images', 'keys']),
+                   ('snapshots', ['snapshots']),
+                   ('groups/keys/other', ['security-groups', 'keypairs'])]
+    # Max ids per batched describe request
+    chunk_size = 100
+
+    def __init__(self, tester, max_workers=8, timeout=600, poll_interval=10, skip_keys=None):
+        '''
+        :param tester: Eucaops obj whose test_resources are cleaned up
+        :param max_workers: max deletions sent at once within a stage
+        :param timeout: seconds each stage waits for its resources to go away
+        :param poll_interval: max seconds between the batched describes while waiting
+        :param skip_keys: list of test_resources keys not to delete
+        '''
+        self.tester = tester
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.skip_keys = skip_keys or []
+        self.stages = []
+        self.elapsed = 0
+
+    def debug(self, msg):
+        self.tester.debug(msg)
+
+    def get_stages(self):
+        '''
+        Returns the list of CleanupStages covering every non skipped key in the tester's test_resources
+        '''
+        staged_keys = []
+        stages = []
+        for name, resource_keys in self.stage_order:
+            staged_keys.extend(resource_keys)
+            stages.append(CleanupStage(name, [key for key in resource_keys if key not in self.skip_keys]))
+        stages[-1].resource_keys.extend(sorted(key for key in self.tester.test_resources.keys()
+                                               if key not in staged_keys and key not in self.skip_keys))
+        return stages
+
+    def run(self):
+        '''
+        Run every stage in order. Returns the list of CleanupStages, see get_leftovers() for what remains.
+        '''
+        start = time.time()
+        self.stages = self.get_stages()
+        for stage in self.stages:
+            self.run_stage(stage)
+        self.elapsed = time.time() - start
+        self.print_results()
+        return self.stages
+
+    def run_stage(self, stage):
+        start = time.time()
+        items = []
+        for key in stage.resource_keys:
+            for item in list(self.tester.test_resources.get(key, [])):
+                items.append((key, item))
+        stage.items = len(items)
+        if not items:
+            return stage
+        self.debug('Cleanup stage ' + str(stage.name) + ': deleting ' + str(len(items)) + ' resources')
+        volumes = [item for key, item in items if key == 'volumes']
+        if volumes:
+            self.detach_volumes(volumes)
+        # list of (key, item, list of (kind, id) which must go away before the item is deleted)
+        waiting = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            futures = {}
+            for key, item in items:
+                futures[executor.submit(self.delete_item, key, item)] = (key, item)
+            for future in as_completed(futures):
+                key, item = futures[future]
+                try:
+                    waitables = future.result()
+                except Exception, e:
+                    stage.leftovers.append((key, item, str(e)))
+                    continue
+                if waitables:
+                    waiting.append((key, item, waitables))
+                else:
+                    self.remove_resource(key, item)
+                    stage.deleted += 1
+        kinds = {}
+        for key, item, waitables in waiting:
+            for kind, resource_id in waitables:
+                kinds.setdefault(kind, set()).add(resource_id)
+        pending = set()
+        for kind, resource_ids in kinds.iteritems():
+            for resource_id in self.wait_for_deleted(kind, resource_ids, timeout=self.timeout - (time.time() - start)):
+                pending.add((kind, resource_id))
+        for key, item, waitables in waiting:
+            remaining = [resource_id for kind, resource_id in waitables if (kind, resource_id) in pending]
+            if remaining:
+                stage.leftovers.append((key, item, 'still present after ' + str(int(time.time() - start)) +
+                                        ' seconds: ' + ",".join(remaining)))
+            else:
+                self.remove_resource(key, item)
+                stage.deleted += 1
+        stage.elapsed = time.time() - start
+        self.debug('Cleanup stage ' + str(stage.name) + ' done in ' + ('%.1f' % stage.elapsed) + 's, deleted:' +
+                   str(stage.deleted) + '/' + str(stage.items))
+        return stage
+
+    def remove_resource(self, key, item):
+        resources = self.tester.test_resources.get(key, [])
+        if item in resources:
+            resources.remove(item)
+
+    @classmethod
+    def is_not_found(cls, error):
+        return isinstance(error, BotoServerError) and (error.status == 404 or (error.status == 400 and
+                                                       'NotFound' in str(error.error_code or error.body)))
+
+    def delete_item(self, key, item):
+        '''
+        Send the deletion of a single tracked resource.
+        Returns a list of (kind, id) which go away asynchronously and must be waited on, see get_present(),
+        or an empty list if the item is already gone.
+        '''
+        self.debug('Deleting ' + str(item))
+        try:
+            if key == 'auto-scaling-groups':
+                self.tester.autoscale.delete_auto_scaling_group(name=item.name, force_delete=True)
+                return [('auto-scaling-groups', item.name)]
+            if key == 'load_balancers':
+                self.tester.elb.delete_load_balancer(item.name)
+            elif key == 'launch-configurations':
+                self.tester.autoscale.delete_launch_configuration(item.name)
+            elif isinstance(item, Reservation):
+                return self.terminate_reservation(item)
+            elif key == 'volumes':
+                item.delete()
+                return [('volumes', item.id)]
+            elif key == 'snapshots':
+                item.delete()
+                return [('snapshots', item.id)]
+            elif key == 'addresses':
+                item.release()
+            elif isinstance(item, Image):
+                item.deregister()
+            else:
+                item.delete()
+        except BotoServerError, e:
+            if not self.is_not_found(e):
+                raise
+            self.debug('Resource not found assuming it is already deleted, resource:' + str(item))
+        return []
+
+    def terminate_reservation(self, reservation):
+        '''
+        Terminate a reservation's instances with one request, falling back to per instance requests if that
+        fails (ie one of the instances no longer exists). Returns the instances to wait on.
+        '''
+        instance_ids = [instance.id for instance in reservation.instances]
+        if not instance_ids:
+            return []
+        try:
+            self.tester.ec2.terminate_instances(instance_ids=instance_ids)
+        except BotoServerError, e:
+            self.debug('Terminate of ' + str(reservation.id) + ' failed, terminating instances individually. Err:' +
+                       str(e))
+            for instance in reservation.instances:
+                try:
+                    instance.terminate()
+                except BotoServerError, ie:
+                    if not self.is_not_found(ie):
+                        raise
+                    instance_ids.remove(instance.id)
+        return [('instances', instance_id) for instance_id in instance_ids]
+
+    def detach_volumes(self, volumes):
+        '''
+        Detach any of 'volumes' still attached, and wait for them to detach so they can be deleted
+        '''
+        try:
+            attached = [volume for volume in self.describe('volumes', [volume.id for volume in volumes])
+                        if volume.status == 'in-use']
+        except BotoServerError, e:
+            self.debug('Failed to describe volumes to detach, err:' + str(e))
+            return
+        if not attached:
+            return
+        self.debug('Detaching ' + str(len(attached)) + ' volumes before deleting them')
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(attached))) as executor:
+            for volume in attached:
+                executor.submit(volume.detach, True)
+        self.wait_for_deleted('detaching volumes', [volume.id for volume in attached], timeout=self.timeout)
+
+    def describe(self, kind, resource_ids):
+        '''
+        Returns the resources of type 'kind' out of 'resource_ids' which still exist, using one describe per
+        'chunk_size' ids. Ids are passed as filters so ids which no longer exist do not fail the request.
+        '''
+        ec2 = self.tester.ec2
+        resource_ids = list(resource_ids)
+        found = []
+        for index in xrange(0, len(resource_ids), self.chunk_size):
+            chunk = resource_ids[index:index + self.chunk_size]
+            if kind == 'instances':
+                for reservation in ec2.get_all_instances(filters={'instance-id': chunk}):
+                    found.extend(reservation.instances)
+            elif kind in ['volumes', 'detaching volumes']:
+                found.extend(ec2.get_all_volumes(filters={'volume-id': chunk}))
+            elif kind == 'snapshots':
+                found.extend(ec2.get_all_snapshots(filters={'snapshot-id': chunk}))
+            elif kind == 'auto-scaling-groups':
+                found.extend(self.tester.autoscale.get_all_groups(names=chunk))
+            else:
+                raise Exception('Unknown resource kind to describe:' + str(kind))
+        return found
+
+    def get_present(self, kind, resource_ids):
+        '''
+        Returns the set of 'resource_ids' of type 'kind' which have not yet gone away
+        '''
+        present = set()
+        for resource in self.describe(kind, resource_ids):
+            if kind == 'instances' and resource.state == 'terminated':
+                continue
+            if kind == 'volumes' and resource.status == 'deleted':
+                continue
+            if kind == 'detaching volumes' and resource.status not in ['in-use', 'detaching']:
+                continue
+            if kind == 'snapshots' and resource.status == 'deleted':
+                continue
+            present.add(getattr(resource, 'id', None) or resource.name)
+        return present & set(resource_ids)
+
+    def wait_for_deleted(self, kind, resource_ids, timeout=None):
+        '''
+        Poll with batched describes until none of 'resource_ids' of type 'kind' are present, or timeout.
+        Returns the set of ids still present.
+        '''
+        timeout = self.timeout if timeout is None else timeout
+        start = time.time()
+        pending = set(resource_ids)
+        intervals = self.tester.get_poll_intervals(self.poll_interval, min_poll_interval=1)
+        while pending:
+            try:
+                pending = self.get_present(kind, pending)
+            except BotoServerError, e:
+                self.debug('Failed to describe ' + str(kind) + ', err:' + str(e))
+            elapsed = time.time() - start
+            if not pending or elapsed >= timeout:
+                break
+            self.debug('Waiting on ' + str(len(pending)) + '/' + str(len(resource_ids)) + ' ' + str(kind) +
+                       ', elapsed:' + str(int(elapsed)) + '/' + str(int(timeout)))
+            time.sleep(min(intervals.next(), max(0, timeout - elapsed)))
+        return pending
+
+    def get_leftovers(self):
+        '''
+        Returns list of (stage name, resource key, item, error) for every resource not deleted
+        '''
+        leftovers = []
+        for stage in self.stages:
+            for key, item, error in stage.leftovers:
+                leftovers.append((stage.name, key, item, error))
+        return leftovers
+
+    def print_results(self, printmethod=None):
+        printmethod = printmethod or self.debug
+        buf = ("\n" + "STAGE".ljust(28) + "|" + "ITEMS".center(7) + "|" + "DELETED".center(9) + "|" +
+               "LEFTOVER".center(10) + "|" + "ELAPSED(s)".center(12) + "\n")
+        for stage in self.stages:
+            buf += (str(stage.name).ljust(28) + "|" + str(stage.items).center(7) + "|" +
+                    str(stage.deleted).center(9) + "|" + str(len(stage.leftovers)).center(10) + "|" +
+                    ('%.1f' % stage.elapsed).center(12) + "\n")
+        buf += "Total elapsed:" + ('%.1f' % self.elapsed) + "s\n"
+        for stage_name, key, item, error in self.get_leftovers():
+            buf += "LEFTOVER " + str(key) + ": " + str(item) + ", " + str(error) + "\n"
+        printmethod(buf)
+        return buf
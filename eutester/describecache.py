@@ -0,0 +1,120 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009-2011, Eucalyptus Systems, Inc.
+# All rights reserved.
+#
+# Redistribution and use of this software in source and binary forms, with or
+# without modification, are permitted provided that the following conditions
+# are met:
+#
+#   Redistributions of source code must retain the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer in the documentation and/or other
+#   materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+'''
+Read through cache for describe style requests.
+
+Responses are cached per resource type (ie 'images', 'zones') and keyed by the request method plus the
+args it was called with. Each resource type has its own time to live. Testers invalidate a resource type
+when they change it (ie register or deregister an image) so later reads see the change.
+
+Cached responses are shared between callers. The returned list is a copy, but the resource objs in it
+are the same objs handed to every caller until the entry expires.
+'''
+import copy
+import threading
+import time
+
+
+class DescribeCache():
+    def __init__(self, ttls=None, default_ttl=60):
+        '''
+        :param ttls: dict of resource type -> seconds to keep responses of that type
+        :param default_ttl: seconds to keep responses of resource types not in ttls
+        '''
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.entries = {}
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def make_key(cls, value):
+        '''
+        Returns a hashable key for 'value' which is the same for equal dicts regardless of their ordering
+        '''
+        if isinstance(value, dict):
+            return tuple(sorted((cls.make_key(k), cls.make_key(v)) for k, v in value.iteritems()))
+        if isinstance(value, (list, tuple, set)):
+            return tuple(cls.make_key(v) for v in value)
+        return value
+
+    def get_ttl(self, resource_type):
+        return self.ttls.get(resource_type, self.default_ttl)
+
+    def get(self, resource_type, method, *args, **kwargs):
+        '''
+        Return the cached response of method(*args, **kwargs) if it is within the resource type's ttl,
+        otherwise call method and cache its response.
+        '''
+        key = (getattr(method, '__name__', str(method)), self.make_key(args), self.make_key(kwargs))
+        now = time.time()
+        with self._lock:
+            type_entries = self.entries.setdefault(resource_type, {})
+            entry = type_entries.get(key)
+            if entry and (now - entry[0]) < self.get_ttl(resource_type):
+                self.hits[resource_type] = self.hits.get(resource_type, 0) + 1
+                return copy.copy(entry[1])
+            self.misses[resource_type] = self.misses.get(resource_type, 0) + 1
+        response = method(*args, **kwargs)
+        with self._lock:
+            self.entries.setdefault(resource_type, {})[key] = (now, response)
+        return copy.copy(response)
+
+    def invalidate(self, resource_type=None):
+        '''
+        Drop the cached responses for resource_type, or for all resource types if None
+        '''
+        with self._lock:
+            if resource_type is None:
+                self.entries = {}
+            else:
+                self.entries.pop(resource_type, None)
+
+    def get_stats(self):
+        '''
+        Returns dict of resource type -> {'hits', 'misses', 'entries'}
+        '''
+        stats = {}
+        with self._lock:
+            for resource_type in set(self.hits.keys() + self.misses.keys() + self.entries.keys()):
+                stats[resource_type] = {'hits': self.hits.get(resource_type, 0),
+                                        'misses': self.misses.get(resource_type, 0),
+                                        'entries': len(self.entries.get(resource_type, {}))}
+        return stats
+
+    def print_stats(self, printmethod=None):
+        buf = "\n" + "RESOURCE TYPE".ljust(20) + "TTL".ljust(8) + "HITS".ljust(8) + "MISSES".ljust(8) + "ENTRIES\n"
+        for resource_type, stats in sorted(self.get_stats().iteritems()):
+            buf += (str(resource_type).ljust(20) + str(self.get_ttl(resource_type)).ljust(8) +
+                    str(stats['hits']).ljust(8) + str(stats['misses']).ljust(8) + str(stats['entries']) + "\n")
+        if printmethod:
+            printmethod(buf)
+        return buf
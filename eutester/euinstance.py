@@ -53,6 +53,7 @@ from eutester.euvolume import EuVolume
 from eutester import eulogger
 from eutester.taggedresource import TaggedResource
 from random import randint
+import hashlib
 import sshconnection
 import sys
 import os
@@ -64,6 +65,8 @@ import operator
 
 
 class EuInstance(Instance, TaggedResource):
+    #Seconds a guest block device inventory is reused for, see get_guest_block_devices()
+    guest_block_device_ttl = 5
    
     @classmethod
     def make_euinstance_from_instance(cls, 
@@ -546,6 +549,77 @@ class EuInstance(Instance, TaggedResource):
         for line in out:
             retlist.append(line.strip())
         return retlist
+
+    def get_guest_block_devices(self, md5lens=None, match=None, ttl=None, refresh=False):
+        '''
+        Returns an inventory of the guest's block devices gathered in a single remote command, as a dict of
+        '/dev/<name>' -> {'dev', 'size', 'serial', 'ids', 'md5s'}, where 'ids' lists the /dev/disk/by-id links to
+        the device and 'md5s' is a dict of length -> md5 of the device's first 'length' bytes (0 is the whole device).
+        The inventory is cached on this instance and reused for 'ttl' seconds, unless a requested md5 length is
+        missing from it.
+        md5lens - optional - list of lengths to md5 the head of each device with, defaults to [32]
+        match - optional - grep criteria for the device names in /dev, see get_dev_dir()
+        ttl - optional - seconds a cached inventory is valid for, defaults to self.guest_block_device_ttl
+        refresh - optional - boolean, if True ignore any cached inventory
+        '''
+        md5lens = sorted(set(int(md5len) for md5len in (md5lens or [32])))
+        ttl = self.guest_block_device_ttl if ttl is None else ttl
+        if match is None:
+            match = '^sd\|^vd\|^xd\|^xvd'
+        cached = getattr(self, '_guest_block_devices', None)
+        if (not refresh and cached and cached['match'] == match and (time.time() - cached['time']) <= ttl and
+                not [md5len for md5len in md5lens if md5len not in cached['md5lens']]):
+            return cached['devices']
+        script = ('for dev in $(ls -1 /dev/ | grep \'' + str(match) + '\'); do\n'
+                  '  [ -b /dev/$dev ] || continue\n'
+                  '  size=$(blockdev --getsize64 /dev/$dev 2>/dev/null || '
+                  'echo $(( $(cat /sys/class/block/$dev/size 2>/dev/null || echo 0) * 512 )))\n'
+                  '  serial=$(cat /sys/class/block/$dev/serial /sys/class/block/$dev/device/serial 2>/dev/null | '
+                  'head -n 1 | tr -d \' \')\n'
+                  '  ids=""\n'
+                  '  for link in /dev/disk/by-id/*; do\n'
+                  '    [ "$(readlink -f $link 2>/dev/null)" = "/dev/$dev" ] && ids="$ids,${link##*/}"\n'
+                  '  done\n'
+                  '  md5s=""\n'
+                  '  for len in ' + " ".join(str(md5len) for md5len in md5lens) + '; do\n'
+                  '    if [ "$len" = 0 ]; then md5=$(md5sum /dev/$dev | cut -d" " -f1)\n'
+                  '    else md5=$(head -c $len /dev/$dev | md5sum | cut -d" " -f1); fi\n'
+                  '    md5s="$md5s,$len:$md5"\n'
+                  '  done\n'
+                  '  echo "EUDEVINFO /dev/$dev ${size:-0} ${serial:--} ${ids:-,} $md5s"\n'
+                  'done\n')
+        out = self.sys(script, code=0, timeout=60 + 30 * len(md5lens), verbose=False)
+        devices = {}
+        for line in out:
+            fields = str(line).split()
+            if len(fields) != 6 or fields[0] != 'EUDEVINFO':
+                continue
+            md5s = {}
+            for entry in fields[5].split(','):
+                if ':' in entry:
+                    md5len, md5 = entry.split(':', 1)
+                    md5s[int(md5len)] = md5
+            devices[fields[1]] = {'dev': fields[1],
+                                  'size': int(fields[2]) if fields[2].isdigit() else 0,
+                                  'serial': None if fields[3] == '-' else fields[3],
+                                  'ids': [link for link in fields[4].split(',') if link],
+                                  'md5s': md5s}
+        self._guest_block_devices = {'time': time.time(), 'match': match, 'md5lens': md5lens, 'devices': devices}
+        self.debug(str(self.id) + ': inventoried ' + str(len(devices)) + ' guest block devices')
+        return devices
+
+    def find_guest_block_device(self, md5, md5len, devices=None, ttl=None, refresh=False):
+        '''
+        Returns the '/dev/<name>' of the guest block device whose first md5len bytes have the md5 'md5', matched
+        against the inventory from get_guest_block_devices(), or None if no device matches.
+        devices - optional - inventory to match against instead of fetching one
+        '''
+        if devices is None:
+            devices = self.get_guest_block_devices(md5lens=[md5len], ttl=ttl, refresh=refresh)
+        for dev in sorted(devices.keys()):
+            if devices[dev]['md5s'].get(int(md5len)) == md5:
+                return dev
+        return None
     
     def assertFilePresent(self,filepath):
         '''
@@ -882,6 +956,10 @@ class EuInstance(Instance, TaggedResource):
         
         voldev = euvolume.guestdev.strip()
         self.assertFilePresent(voldev)
+        #The cached md5s of the volume's head and its fingerprint are stale once written, see
+        #get_guest_block_devices() and get_dev_fingerprint()
+        self._guest_block_devices = None
+        euvolume.clear_fingerprint()
         if srcdev is None:
             if self.found('ls /dev/urandom', 'urandom'):
                 srcdev = '/dev/urandom'
@@ -893,17 +971,24 @@ class EuInstance(Instance, TaggedResource):
             timeout = int(euvolume.size) * timepergig
         else:
             timeout = timepergig * ((length/gb) or 1)
+        if not self.get_dd_features()['bytes']:
+            #Without oflag=seek_bytes, dd can only seek past the volume id in whole blocks. Stream the id and the
+            #data together instead so the data starts right after the id.
+            if not length:
+                ddcmd = '(echo '+str(euvolume.id)+'; cat '+str(srcdev)+') | dd of='+str(voldev)+' bs='+str(fsize)
+            else:
+                ddcmd = ('(echo '+str(euvolume.id)+'; head -c '+str(length)+' '+str(srcdev)+') | head -c '+
+                         str(length)+' | dd of='+str(voldev)+' bs='+str(self.get_dd_block_size(length)))
+            return self.dd_monitor(ddcmd=ddcmd, timeout=timeout)
         #write the volume id into the volume for starters
         ddcmd = 'echo '+str(euvolume.id)+' | dd of='+str(voldev)
         dd_res_for_id = self.dd_monitor(ddcmd=ddcmd, timeout=timeout, sync=False)
-        len_remaining = length - int(dd_res_for_id['dd_bytes'])
-        self.debug('length remaining to write after adding volumeid:' + str(len_remaining))
-        if len_remaining <= 0:
-            self.sys('sync')
-            return dd_res_for_id
-        ddbs = 1024
-        if len_remaining < ddbs:
-            ddbs = len_remaining
+        if length:
+            len_remaining = length - int(dd_res_for_id['dd_bytes'])
+            self.debug('length remaining to write after adding volumeid:' + str(len_remaining))
+            if len_remaining <= 0:
+                self.sys('sync')
+                return dd_res_for_id
         if not length:
             return self.dd_monitor(ddif=str(srcdev),
                                    ddof=str(voldev),
@@ -913,7 +998,6 @@ class EuInstance(Instance, TaggedResource):
         else:
             return self.dd_monitor(ddif=str(srcdev),
                                    ddof=str(voldev),
-                                   ddbs=ddbs,
                                    ddbytes=len_remaining,
                                    ddseek=int(dd_res_for_id['dd_bytes']),
                                    timeout=timeout)
@@ -928,21 +1012,59 @@ class EuInstance(Instance, TaggedResource):
         return self.dd_monitor(ddcmd=ddcmd, poll_interval=poll_interval, tmpfile=tmpfile)
 
 
+    def get_dd_features(self, refresh=False):
+        '''
+        Returns dict of which optional GNU dd features the guest's dd supports, probed once per instance:
+        'bytes' - iflag=count_bytes and oflag=seek_bytes, count and seek given in bytes
+        'progress' - status=progress, dd writes its own periodic progress lines
+        'fullblock' - iflag=fullblock, short reads (ie interrupted by a signal, or from a pipe) are retried so
+                      count blocks are always full
+        '''
+        if refresh or not getattr(self, '_dd_features', None):
+            out = self.sys('dd if=/dev/zero of=/dev/null count=1 iflag=count_bytes oflag=seek_bytes 2>/dev/null '
+                           '&& echo dd_bytes_ok; dd if=/dev/zero of=/dev/null count=1 status=progress 2>/dev/null '
+                           '&& echo dd_progress_ok; dd if=/dev/zero of=/dev/null count=1 iflag=fullblock 2>/dev/null '
+                           '&& echo dd_fullblock_ok', verbose=False)
+            self._dd_features = {'bytes': 'dd_bytes_ok' in out, 'progress': 'dd_progress_ok' in out,
+                                 'fullblock': 'dd_fullblock_ok' in out}
+        return self._dd_features
+
+    @classmethod
+    def get_dd_block_size(cls, length=None, bytes_flags=True, max_bs=4194304, min_bs=512):
+        '''
+        Returns a dd block size for copying 'length' bytes. Large copies use max_bs, smaller ones the largest
+        power of two at or below a quarter of the length. Without the dd byte flags count is in blocks, so the
+        block size must also divide the length for the copy to be exact (down to min_bs).
+        '''
+        if not length:
+            return 1048576
+        bs = max_bs
+        while bs > min_bs and bs * 4 > length:
+            bs /= 2
+        if not bytes_flags:
+            while bs > min_bs and length % bs:
+                bs /= 2
+        return bs
+
     @Eutester.printinfo
     def dd_monitor(self,
                    ddif=None,
                    ddof=None,
                    ddcount=None,
-                   ddbs=1024,
+                   ddbs=None,
                    ddbytes=None,
                    ddcmd=None,
                    ddseek=None,
                    timeout=300,
                    poll_interval=1,
                    tmpfile=None,
-                   sync=True):
+                   sync=True,
+                   max_samples=1000):
         '''
-        Executes dd command on instance, monitors and displays ongoing status, and returns stats dict for dd outcome
+        Executes dd command on instance, monitors and displays ongoing status, and returns stats dict for dd outcome.
+        dd runs in the foreground of a single ssh cmd() and its periodic progress lines (status=progress, or a
+        kill -USR1 loop on guests without it) are parsed as they stream in, building a time series of throughput
+        samples. Only the parsed stats and samples are kept, not dd's output.
         :type ddif: str
         :param ddif: Interface to read data in from
         
@@ -953,33 +1075,36 @@ class EuInstance(Instance, TaggedResource):
         :param ddcount: Number or count of block size (ddbs) to read/write
         
         :type ddbs: int
-        :param ddbs: Block size used for  reads/writes
+        :param ddbs: Block size used for reads/writes, default is picked from ddbytes, see get_dd_block_size()
         
         :type ddbytes: int
-        :param ddbytes: Number of bytes to be roughly read/write (note: used as ddbytes/ddbs = count) 
+        :param ddbytes: Number of bytes to be read/written, exact when the guest's dd supports iflag=count_bytes
         
         :type ddcmd: str
         :param ddcmd: String representing a preformed dd comand to be executed and monitored
         
         :type ddseek: int
-        :param ddseek: length of ddof file to seek before writing
+        :param ddseek: bytes of ddof to seek before writing (in ddbs blocks if the guest's dd lacks oflag=seek_bytes)
         
         :type timeout: int
         :param timeout: Number of seconds to wait before timing out on dd cmd. 
         
         :type poll_interval: int
-        :param poll_interval: Number of seconds to pause between polling dd and updating status
+        :param poll_interval: Seconds between progress samples
         
         :type tmpfile: str
-        :param tmpfile: temp file used on remote instance to redirect dd's stderr to in order to nohup dd. 
+        :param tmpfile: path prefix on the remote instance for dd's pid file
+        
+        :type max_samples: int
+        :param max_samples: Max throughput samples kept, older samples are thinned out past this
         
         :rtype: dict
-        :returns: dict containing dd stats
+        :returns: dict containing dd stats, 'dd_samples' holds the list of progress samples, each a dict of
+                  'time' (dd's elapsed seconds), 'bytes' (copied so far) and 'mbps' (MB/s since the last sample)
         '''
         
         mb = 1048576 #bytes per mb
         gig = 1073741824 #bytes per gig
-        #this tmp file will be created on remote instance to write stderr from dd to...
         if not tmpfile:
             tstamp = time.time()
             tmpfile = '/tmp/eutesterddcmd.'+str(int(tstamp))
@@ -998,50 +1123,51 @@ class EuInstance(Instance, TaggedResource):
                'dd_full_rec_out' : 0,
                'dd_partial_rec_in' : 0,
                'dd_partial_rec_out' : 0,
+               'dd_samples' : [],
                'test_time' : 0,
                'test_rate' : 0,
                'ddcmd' : "" }
-        dd_units = 0
-        elapsed = 0
-        done = False
-        infobuf = None
-        outbuf = None
-        start = time.time()
-        if ddcmd:
-            ddcmd = ddcmd
-        else:
+        features = self.get_dd_features()
+        if not ddcmd:
             if not ddif or not ddof:
                 raise Exception('dd_monitor needs ddif and ddof, or a preformed ddcmd string')
-            ddbs_str = str(' bs='+str(ddbs)+' ') or ""
+            ddbs = ddbs or self.get_dd_block_size(ddbytes, bytes_flags=features['bytes'])
+            ddcmd = 'dd if='+str(ddif)+' of='+str(ddof)+' bs='+str(ddbs)
+            iflags = []
+            oflags = []
             if ddcount:
-                ddcount_str = str(' count='+str(ddcount)+' ')
-            elif ddbytes and ddbs:
-                ddcount_str = str(' count='+str((ddbytes/ddbs) or 1)+' ')
-            else:
-                ddcount_str = ''
-            if ddseek:
-                ddseek_str = str(' seek='+str(ddseek)+' ')
-            else:
-                 ddseek_str = ''
-            ddcmd = str('dd if='+str(ddif)+' of='+str(ddof)+str(ddseek_str)+str(ddbs_str)+str(ddcount_str))
+                ddcmd += ' count='+str(ddcount)
+            elif ddbytes and features['bytes']:
+                ddcmd += ' count='+str(ddbytes)
+                iflags.append('count_bytes')
+            elif ddbytes and features['fullblock']:
+                ddcmd += ' count='+str((ddbytes/ddbs) or 1)
+                iflags.append('fullblock')
+            elif ddbytes:
+                #Without fullblock, reads cut short by the USR1 status signals would still use up count, so let
+                #head stop the copy at exactly ddbytes instead
+                ddcmd = 'head -c '+str(ddbytes)+' '+str(ddif)+' | dd of='+str(ddof)+' bs='+str(ddbs)
+            if ddseek and features['bytes']:
+                ddcmd += ' seek='+str(ddseek)
+                oflags.append('seek_bytes')
+            elif ddseek:
+                ddcmd += ' seek='+str(ddseek)
+            if iflags:
+                ddcmd += ' iflag='+",".join(iflags)
+            if oflags:
+                ddcmd += ' oflag='+",".join(oflags)
             ret['ddcmd'] = ddcmd
+            ret['dd_bs'] = ddbs
         '''
-        Due to the ssh psuedo tty, this is done in an ugly manner to get output of future usr1 signals 
-        for dd status updates and allow this to run with nohup in the background. Added sleep so cmd is nohup'd 
-        before tty is terminated (maybe?)
+        dd runs in the background of the remote shell so its pid can be recorded and, without status=progress,
+        signalled with USR1 for a status update every poll_interval. The shell then waits on dd for its exit code,
+        so the cmd ends when dd does. The first USR1 is only sent after a sleep, once dd has its handler installed.
         '''
-        cmd = 'nohup '+str(ddcmd)+' 2> '+str(tmpfile)+' & echo $! && sleep 2'
-        #Execute dd command and store echo'd pid from output
-        try:
-            dd_pid = self.sys(cmd, code=0)[0]
-        except sshconnection.CommandExitCodeException, se:
-            dbg_buf = ""
-            file_contents = self.sys('cat ' + str(tmpfile))
-            if file_contents:
-                dbg_buf = "\n".join(file_contents)
-            raise Exception('Failed dd cmd:"' +str(cmd) + '", tmpfile contents:\n' + str(dbg_buf) )
-
-
+        if features['progress'] and not re.search('status=', ddcmd):
+            cmd = (str(ddcmd) + ' status=progress 2>&1 & pid=$!; echo $pid > ' + str(tmppidfile) + '; wait $pid')
+        else:
+            cmd = (str(ddcmd) + ' 2>&1 & pid=$!; echo $pid > ' + str(tmppidfile) + '; while sleep ' +
+                   str(poll_interval) + ' && kill -USR1 $pid 2>/dev/null; do :; done; wait $pid')
         
         #Form the table headers for printing dd status...
         linediv = '\n----------------------------------------------------------------------------------------------------------------------------\n'
@@ -1070,52 +1196,16 @@ class EuInstance(Instance, TaggedResource):
         buf += linediv
         sys.stdout.write(buf)
         sys.stdout.flush()
-        
-        #Keep getting and printing dd status until done...
-        while not done and (elapsed < timeout):
-            #send sig usr1 to have dd process dump status to stderr redirected to tmpfile
-            output = self.cmd('kill -USR1 '+str(dd_pid), verbose=False)
-            cmdstatus = int(output['status'])
-            if cmdstatus != 0:
-                done = True
-                #if the command returned error, process is done
-                out = self.sys('cat '+str(tmpfile)+"; rm -f "+str(tmpfile),code=0, verbose=False)
-            else:
-                #if the above command didn't error out then dd ps is still running, grab status from tmpfile, and clear it
-                out= self.sys('cat '+str(tmpfile)+" && echo '' > "+str(tmpfile)+ ' 2>&1 > /dev/null', code=0, verbose=False)
-            for line in out:
-                line = str(line)
-                try:
-                    if re.search('records in',line):
-                        ret['dd_records_in'] = str(line.split()[0]).strip()
-                        ret['dd_full_rec_in'] = str(ret['dd_records_in'].split("+")[0].strip())
-                        #dd_full_rec_in = int(dd_full_rec_in)
-                        ret['dd_partial_rec_in'] = str(ret['dd_records_in'].split("+")[1].strip())
-                        #dd_partial_rec_in = int(dd_partial_rec_in)
-                    elif re.search('records out', line):
-                        ret['dd_records_out'] = str(line.split()[0]).strip()
-                        ret['dd_full_rec_out'] = str(ret['dd_records_out'].split("+")[0].strip())
-                        #dd_ful_rec_out = int(dd_full_rec_out)
-                        ret['dd_partial_rec_out'] = str(ret['dd_records_out'].split("+")[1].strip())
-                        #dd_partial_rec_out = int(dd_partial_rec_out)
-                    elif re.search('copied',line):
-                        #123456789 bytes (123 MB) copied, 12.34 s, 123.45 MB/s
-                        summary = line.split()
-                        ret['dd_bytes'] = int(summary[0])
-                        ret['dd_mb'] = float("{0:.2f}".format(ret['dd_bytes']/float(mb)))
-                        ret['dd_gig'] = float("{0:.2f}".format(ret['dd_bytes']/float(gig)))
-                        ret['dd_elapsed'] = float(summary[5])
-                        ret['dd_rate'] = float(summary[7])
-                        ret['dd_units'] = str(summary[8])
-                except Exception, e:
-                    #catch any exception in the data parsing and show it as info/debug later...
-                    tb = self.tester.get_traceback()
-                    infobuf = '\n\nCaught exception while processing line:"'+str(line)+'"'
-                    infobuf += '\n'+str(tb)+"\n"+str(e)+'\n'
+
+        start = time.time()
+        #Parse state shared with the callback: partial line, last sample, min seconds between samples
+        state = {'partial': '', 'last': (0, 0), 'min_interval': poll_interval, 'other': []}
+        copied_re = re.compile('^(\d+) bytes .*copied, ([\d.]+) s, ([\d.]+) (\S+)')
+
+        def print_status():
             elapsed = float(time.time()-start)
-            ret['test_rate'] = float("{0:.2f}".format(ret['dd_mb'] / elapsed ))
+            ret['test_rate'] = float("{0:.2f}".format(ret['dd_mb'] / (elapsed or 1)))
             ret['test_time'] = "{0:.4f}".format(elapsed)
-            #Create and format the status output buffer, then print it...
             buf = str(ret['dd_bytes']).ljust(15)
             buf += '|'+str(ret['dd_mb']).center(15)
             buf += '|'+str(ret['dd_gig']).center(8)
@@ -1127,31 +1217,97 @@ class EuInstance(Instance, TaggedResource):
             buf += '|'+str("F:"+str(ret['dd_full_rec_out'])+" P:"+str(ret['dd_partial_rec_out'])).center(18)
             sys.stdout.write("\r\x1b[K"+str(buf))
             sys.stdout.flush()
-            time.sleep(poll_interval)
+
+        def add_sample(dd_time, dd_bytes, final=False):
+            #Samples are timed by dd's own elapsed time so ssh buffering does not skew them
+            last_time, last_bytes = state['last']
+            if dd_bytes == last_bytes or (not final and dd_time - last_time < state['min_interval']):
+                return
+            samples = ret['dd_samples']
+            samples.append({'time': dd_time, 'bytes': dd_bytes,
+                            'mbps': round((dd_bytes - last_bytes) / float(mb) / ((dd_time - last_time) or 1), 2)})
+            state['last'] = (dd_time, dd_bytes)
+            if len(samples) > max_samples:
+                #Thin out to every other sample and halve the sample rate from here on, bounding memory use
+                samples[:] = samples[1::2]
+                state['min_interval'] *= 2
+
+        def parse_line(line):
+            if re.search('records in',line):
+                ret['dd_records_in'] = str(line.split()[0]).strip()
+                ret['dd_full_rec_in'] = str(ret['dd_records_in'].split("+")[0].strip())
+                ret['dd_partial_rec_in'] = str(ret['dd_records_in'].split("+")[1].strip())
+            elif re.search('records out', line):
+                ret['dd_records_out'] = str(line.split()[0]).strip()
+                ret['dd_full_rec_out'] = str(ret['dd_records_out'].split("+")[0].strip())
+                ret['dd_partial_rec_out'] = str(ret['dd_records_out'].split("+")[1].strip())
+            else:
+                match = copied_re.search(line)
+                if not match:
+                    #Keep the last few other lines (ie dd errors) for the exception below
+                    state['other'] = (state['other'] + [line])[-10:]
+                    return
+                #123456789 bytes (123 MB, 118 MiB) copied, 12.34 s, 123.45 MB/s
+                ret['dd_bytes'] = int(match.group(1))
+                ret['dd_mb'] = float("{0:.2f}".format(ret['dd_bytes']/float(mb)))
+                ret['dd_gig'] = float("{0:.2f}".format(ret['dd_bytes']/float(gig)))
+                ret['dd_elapsed'] = float(match.group(2))
+                ret['dd_rate'] = float(match.group(3))
+                ret['dd_units'] = str(match.group(4))
+                add_sample(ret['dd_elapsed'], ret['dd_bytes'])
+                print_status()
+
+        def dd_callback(buf):
+            lines = re.split('[\r\n]', state['partial'] + buf)
+            state['partial'] = lines.pop()
+            for line in lines:
+                line = line.strip()
+                if line:
+                    try:
+                        parse_line(line)
+                    except Exception, e:
+                        self.debug('Caught exception while processing dd line:"' + str(line) + '", ' + str(e))
+            return sshconnection.SshCbReturn(stop=False)
+
+        try:
+            out = self.cmd(cmd, verbose=False, timeout=timeout, cb=dd_callback)
+        except sshconnection.CommandTimeoutException, cte:
+            #Attempt to kill dd process...
+            self.sys('kill `cat ' + str(tmppidfile) + '`; rm -f ' + str(tmppidfile), verbose=False)
+            raise Exception('dd_monitor timed out before dd cmd completed, elapsed:' +
+                            str(int(time.time()-start)) + '/' + str(timeout) + ', err:' + str(cte))
+        if state['partial'].strip():
+            parse_line(state['partial'].strip())
+        add_sample(ret['dd_elapsed'], ret['dd_bytes'], final=True)
         sys.stdout.write(linediv)
         sys.stdout.flush()
-        elapsed = int(time.time()-start)
-        if not done:
-            #Attempt to kill dd process...
-            self.sys('kill '+str(dd_pid))
-            raise Exception('dd_monitor timed out before dd cmd completed, elapsed:'+str(elapsed)+'/'+str(timeout))
-        else:
+        if sync:
             #sync to ensure writes to dev
-            if sync:
-                self.sys('sync', code=0)
-                elapsed = int(time.time()-start)
-        #if we have any info from exceptions caught during parsing, print that here...
-        if infobuf:
-            print infobuf
-        #if we didn't transfer any bytes of data, assume the cmd failed and wrote to stderr now in outbuf...
+            self.sys('sync', code=0)
+        elapsed = int(time.time()-start)
+        self.sys('rm -f ' + str(tmppidfile), verbose=False)
+        #dd exits non-zero when it fills a device, so only fail if no data was transferred
+        ret['dd_status'] = out['status']
         if not ret['dd_bytes']:
-            if out:
-                outbuf = "\n".join(out)
-            raise Exception('Did not transfer any data using dd cmd:'+str(ddcmd)+"\nstderr: "+str(outbuf))
-        self.debug('Done with dd, copied '+str(ret['dd_bytes'])+' over elapsed:'+str(elapsed))
-        self.sys('rm -f ' + str(tmpfile))
-        self.sys('rm -f ' + str(tmppidfile))
+            raise Exception('dd cmd failed, status:' + str(out['status']) + ', copied:' + str(ret['dd_bytes']) +
+                            ', cmd:' + str(ddcmd) + "\noutput: " + "\n".join(state['other']))
+        self.debug('Done with dd, copied '+str(ret['dd_bytes'])+' over elapsed:'+str(elapsed) + ', samples:' +
+                   str(len(ret['dd_samples'])))
         return ret
+
+    def print_dd_samples(self, dd_ret, width=50, printmethod=None):
+        '''
+        Print the throughput samples returned by dd_monitor() as a bar chart of MB/s over time
+        '''
+        printmethod = printmethod or self.debug
+        samples = dd_ret.get('dd_samples') or []
+        peak = max([sample['mbps'] for sample in samples] or [0]) or 1
+        buf = "\n" + "TIME(s)".rjust(9) + " " + "MB/s".rjust(9) + " |\n"
+        for sample in samples:
+            buf += (('%.1f' % sample['time']).rjust(9) + " " + ('%.2f' % sample['mbps']).rjust(9) + " |" +
+                    '#' * int(round(sample['mbps'] / peak * width)) + "\n")
+        printmethod(buf)
+        return buf
     
     def vol_write_random_data_get_md5(self, euvolume, srcdev=None, length=32, timepergig=90, overwrite=False):
         '''
@@ -1176,6 +1332,8 @@ class EuInstance(Instance, TaggedResource):
         if overwrite or ( int(self.sys('head -c '+str(length)+ ' '+str(voldev)+' | xargs -0 printf %s | wc -c')[0]) == 0):
             
             self.random_fill_volume(euvolume, srcdev=srcdev, length=length)
+            self._guest_block_devices = None
+            euvolume.clear_fingerprint()
             #length = dd_dict['dd_bytes']
         else:
             self.debug("Volume has existing data, skipping random data fill")
@@ -1220,6 +1378,273 @@ class EuInstance(Instance, TaggedResource):
         else:
             md5 = str(self.sys("head -c "+str(length)+" "+str(devpath)+" | md5sum")[0]).split(' ')[0].strip()
         return md5
+
+    @classmethod
+    def get_fingerprint_blocks(cls, size, blocks=64, blocksize=65536):
+        '''
+        Returns the sorted block indexes (offset/blocksize) sampled by a fingerprint of a device of 'size' bytes.
+        The device is split into 'blocks' even strides with one block sampled at a pseudo random, but
+        deterministic for a given size/blocks/blocksize, position in each. The first and last blocks are always
+        sampled so corruption at the head or tail of the device is caught.
+        '''
+        total = int(size) / int(blocksize)
+        if total < 1:
+            raise Exception('Device size:' + str(size) + ' is smaller than fingerprint block size:' + str(blocksize))
+        blocks = max(2, min(int(blocks), total))
+        stride = total / float(blocks)
+        indexes = set([0, total - 1])
+        for x in xrange(blocks):
+            start = int(x * stride)
+            end = min(max(start + 1, int((x + 1) * stride)), total)
+            #Position within the stride from an md5 of the parameters, so it is the same on every host and process
+            position = int(hashlib.md5('%d:%d:%d:%d' % (int(size), blocks, int(blocksize), x)).hexdigest(), 16)
+            indexes.add(start + int(position % (end - start)))
+        return sorted(indexes)
+
+    @classmethod
+    def parse_fingerprint(cls, fingerprint):
+        '''
+        Returns dict of the 'size', 'blocks', 'blocksize' and 'digest' of a fingerprint string,
+        see get_dev_fingerprint()
+        '''
+        try:
+            version, size, blocks, blocksize, digest = str(fingerprint).split(':')
+            if version != 'fp1':
+                raise ValueError('unknown fingerprint version:' + str(version))
+            return {'size': int(size), 'blocks': int(blocks), 'blocksize': int(blocksize), 'digest': digest}
+        except ValueError, e:
+            raise Exception('Could not parse fingerprint:"' + str(fingerprint) + '", err:' + str(e))
+
+    def get_dev_fingerprint(self, devpath, size=None, blocks=64, blocksize=65536, timeout=120):
+        '''
+        Returns a compact fingerprint of the data on a guest device, made by md5ing 'blocks' sampled blocks
+        spread across the whole device (see get_fingerprint_blocks()) in one remote command. Unlike an md5 of a
+        prefix of the device, the cost does not grow with the device size and changes anywhere in the device,
+        including the tail, are likely to be caught.
+        The fingerprint is a string 'fp1:<size>:<blocks>:<blocksize>:<md5 of the block md5s>', short enough for a tag.
+        devpath - mandatory - guest device to fingerprint
+        size - optional - number of bytes of the device to sample, defaults to the size of the device. Use the
+               source volume's size to verify a larger volume created from its snapshot.
+        blocks - optional - number of blocks to sample
+        blocksize - optional - bytes per sampled block
+        '''
+        self.assertFilePresent(devpath)
+        if size is None:
+            size = int(self.sys('blockdev --getsize64 ' + str(devpath), code=0)[0].strip())
+        indexes = self.get_fingerprint_blocks(size, blocks=blocks, blocksize=blocksize)
+        out = self.sys('for skip in ' + " ".join(str(index) for index in indexes) + '; do dd if=' + str(devpath) +
+                       ' bs=' + str(blocksize) + ' skip=$skip count=1 2>/dev/null | md5sum | cut -d" " -f1; done',
+                       code=0, timeout=timeout, verbose=False)
+        block_md5s = [str(line).strip() for line in out if len(str(line).strip()) == 32]
+        if len(block_md5s) != len(indexes):
+            raise Exception('Got ' + str(len(block_md5s)) + '/' + str(len(indexes)) + ' block md5s fingerprinting ' +
+                            str(devpath) + ', output:\n' + "\n".join(out))
+        digest = hashlib.md5("".join(block_md5s)).hexdigest()
+        return 'fp1:%d:%d:%d:%s' % (int(size), int(blocks), int(blocksize), digest)
+
+    def fingerprint_attached_euvolume(self, euvolume, blocks=64, blocksize=65536, updatevol=True):
+        '''
+        Fingerprints the dev representing the attached euvolume, see get_dev_fingerprint().
+        The euvolume's fingerprint and fingerprint tag are updated with the result unless updatevol is False.
+        Returns the fingerprint
+        '''
+        if not euvolume in self.attached_vols:
+            raise Exception(self.id + " Did not find " + str(euvolume.id) + " in instance's attached list")
+        voldev = euvolume.guestdev.strip()
+        fingerprint = self.get_dev_fingerprint(voldev, size=int(euvolume.size) * 1073741824, blocks=blocks,
+                                               blocksize=blocksize)
+        self.debug("Got fingerprint for Volume:" + euvolume.id + " dev:" + voldev + " fingerprint:" + fingerprint)
+        if updatevol:
+            euvolume.set_fingerprint(fingerprint)
+        return fingerprint
+
+    def verify_euvolume_fingerprint(self, euvolume, fingerprint=None):
+        '''
+        Re-fingerprints an attached euvolume with the parameters of 'fingerprint' and raises an exception if it
+        does not match. To verify the data of a volume created from a snapshot, pass the snapshot's
+        eutest_volume_fingerprint; only the source volume's size is sampled so a larger new volume still matches.
+        fingerprint - optional - expected fingerprint, defaults to the euvolume's recorded fingerprint
+        '''
+        fingerprint = fingerprint or euvolume.fingerprint
+        if not fingerprint:
+            raise Exception('No fingerprint to verify euvolume:' + str(euvolume.id) + ' against')
+        if not euvolume in self.attached_vols:
+            raise Exception(self.id + " Did not find " + str(euvolume.id) + " in instance's attached list")
+        expected = self.parse_fingerprint(fingerprint)
+        current = self.get_dev_fingerprint(euvolume.guestdev.strip(), size=expected['size'],
+                                           blocks=expected['blocks'], blocksize=expected['blocksize'])
+        if current != fingerprint:
+            raise Exception(str(self.id) + ": fingerprint mismatch on volume:" + str(euvolume.id) + " dev:" +
+                            str(euvolume.guestdev) + ", expected:" + str(fingerprint) + " got:" + str(current))
+        self.debug('Verified fingerprint for Volume:' + str(euvolume.id) + ' fingerprint:' + str(current))
+        return current
+
+    def write_and_md5_euvolumes(self, euvolumes=None, length=1048576, srcdev='/dev/urandom', overwrite=False,
+                                max_parallel=None, timepergig=90):
+        '''
+        Writes 'length' bytes (the volume id followed by data from srcdev) to the head of each attached euvolume
+        and md5s that region, running every volume's write and md5 as a parallel job of one remote script, so
+        many volumes cost one round trip. Each euvolume's md5 and md5len are updated with its result.
+        As with vol_write_random_data_get_md5(), a volume whose first 32 bytes are not zero is only md5'd
+        unless overwrite is set.
+        euvolumes - optional - list of attached euvolumes, defaults to all of this instance's attached volumes
+        length - optional - number of bytes to write and md5 per volume
+        srcdev - optional - file or device the data is read from
+        max_parallel - optional - max volumes written at once, defaults to all of them
+        timepergig - optional - seconds per gig written, used to derive the timeout
+        Returns a summary dict, see run_euvolume_pipeline()
+        '''
+        euvolumes = self.attached_vols if euvolumes is None else euvolumes
+        jobs = [(euvolume, length, True) for euvolume in euvolumes]
+        summary = self.run_euvolume_pipeline(jobs, srcdev=srcdev, overwrite=overwrite, max_parallel=max_parallel,
+                                             timepergig=timepergig)
+        for result in summary['results']:
+            result['volume'].md5 = result['md5']
+            result['volume'].md5len = result['length']
+        return summary
+
+    def verify_euvolumes_md5(self, euvolumes=None, max_parallel=None, timepergig=90, raise_on_mismatch=True):
+        '''
+        Re-md5s the head of each attached euvolume (its md5len bytes, or the whole device if 0) in parallel jobs
+        of one remote script and compares the results to each euvolume's recorded md5.
+        Returns the summary dict from run_euvolume_pipeline(), with 'mismatched' listing the euvolumes whose
+        md5 did not match. Raises an exception listing them if raise_on_mismatch is set.
+        '''
+        euvolumes = self.attached_vols if euvolumes is None else euvolumes
+        jobs = [(euvolume, int(euvolume.md5len), False) for euvolume in euvolumes]
+        summary = self.run_euvolume_pipeline(jobs, max_parallel=max_parallel, timepergig=timepergig)
+        summary['mismatched'] = []
+        for result in summary['results']:
+            result['match'] = (result['md5'] == result['volume'].md5)
+            if not result['match']:
+                summary['mismatched'].append(result['volume'])
+        if summary['mismatched'] and raise_on_mismatch:
+            raise Exception(str(self.id) + ": md5 mismatch on volumes:" +
+                            ",".join(str(result['volume'].id) + "(" + str(result['dev']) + ") expected:" +
+                                     str(result['volume'].md5) + " got:" + str(result['md5'])
+                                     for result in summary['results'] if not result['match']))
+        return summary
+
+    def run_euvolume_pipeline(self, jobs, srcdev='/dev/urandom', overwrite=False, max_parallel=None, timepergig=90):
+        '''
+        Runs a write and/or md5 job per attached euvolume as parallel background jobs of a single remote script,
+        max_parallel at a time, and parses every job's result from the script's output.
+        jobs - list of (euvolume, length, write) tuples
+        Returns dict with 'results' (per volume: volume, dev, status, length, bytes written, write/md5 seconds
+        and MB/s, md5), plus 'elapsed', 'total_bytes' (written and read) and 'mbps' aggregate over the whole run.
+        '''
+        mb = 1048576
+        gig = 1073741824
+        if not jobs:
+            return {'results': [], 'elapsed': 0, 'total_bytes': 0, 'mbps': 0}
+        max_parallel = max_parallel or len(jobs)
+        for euvolume, length, write in jobs:
+            if not euvolume in self.attached_vols:
+                raise Exception(self.id + " Did not find " + str(euvolume.id) + " in instance's attached list")
+            if not euvolume.guestdev or not euvolume.guestdev.strip():
+                raise Exception('Guest device not populated for euvolume:' + str(euvolume.id))
+            if write and int(length) <= len(str(euvolume.id)) + 1:
+                raise Exception('Length:' + str(length) + ' too short to write to euvolume:' + str(euvolume.id))
+        total_length = sum(int(length) for euvolume, length, write in jobs)
+        timeout = 60 + timepergig * ((total_length / gig) + 1)
+        script = ('euvoljob() {\n'
+                  '  dev=$1; volid=$2; len=$3; write=$4; status=read; bytes=0\n'
+                  '  if [ ! -b "$dev" ]; then echo "EUVOLRESULT $dev missing 0 0 0 0 none"; return; fi\n'
+                  '  if [ "$write" = 1 ]; then\n'
+                  '    status=written\n'
+                  '    if [ "' + ('1' if overwrite else '0') + '" != 1 ] && '
+                  '[ "$(head -c 32 $dev | tr -d \'\\000\' | wc -c)" -ne 0 ]; then write=0; status=existing; fi\n'
+                  '  fi\n'
+                  '  ws=$(date +%s.%N)\n'
+                  '  if [ "$write" = 1 ]; then\n'
+                  '    bytes=$( (echo $volid; head -c $len ' + str(srcdev) + ') | head -c $len | '
+                  'dd of=$dev bs=' + str(mb) + ' 2>&1 | grep copied | cut -d" " -f1 ); sync\n'
+                  '  fi\n'
+                  '  ms=$(date +%s.%N)\n'
+                  '  if [ "$len" = 0 ]; then md5=$(md5sum $dev | cut -d" " -f1)\n'
+                  '  else md5=$(head -c $len $dev | md5sum | cut -d" " -f1); fi\n'
+                  '  echo "EUVOLRESULT $dev $status ${bytes:-0} $ws $ms $(date +%s.%N) $md5"\n'
+                  '}\n'
+                  'euvolstart=$(date +%s.%N)\n')
+        for index, (euvolume, length, write) in enumerate(jobs):
+            script += ('euvoljob ' + str(euvolume.guestdev.strip()) + ' ' + str(euvolume.id) + ' ' +
+                       str(int(length)) + ' ' + ('1' if write else '0') + ' &\n')
+            if (index + 1) % max_parallel == 0:
+                script += 'wait\n'
+        script += 'wait\necho "EUVOLDONE $euvolstart $(date +%s.%N)"\n'
+        self.debug(str(self.id) + ': running write/md5 pipeline on ' + str(len(jobs)) + ' volumes, ' +
+                   str(max_parallel) + ' at a time')
+        writes = [euvolume for euvolume, length, write in jobs if write]
+        if writes:
+            self._guest_block_devices = None
+            for euvolume in writes:
+                euvolume.clear_fingerprint()
+        out = self.sys(script, code=0, timeout=timeout, verbose=False)
+        if writes:
+            #Drop any inventory or fingerprint taken while the writes were running as well
+            self._guest_block_devices = None
+            for euvolume in writes:
+                euvolume.clear_fingerprint()
+
+        def get_time(value):
+            try:
+                return float(value)
+            except ValueError:
+                #date without %N support, ie busybox
+                return float(str(value).split('.')[0] or 0)
+
+        results = {}
+        elapsed = 0
+        for line in out:
+            fields = str(line).split()
+            if len(fields) == 8 and fields[0] == 'EUVOLRESULT':
+                results[fields[1]] = fields[2:]
+            elif len(fields) == 3 and fields[0] == 'EUVOLDONE':
+                elapsed = get_time(fields[2]) - get_time(fields[1])
+        summary = {'results': [], 'elapsed': elapsed, 'total_bytes': 0, 'mbps': 0}
+        for euvolume, length, write in jobs:
+            dev = euvolume.guestdev.strip()
+            if dev not in results or results[dev][0] == 'missing':
+                raise Exception(str(self.id) + ': no pipeline result for ' + str(euvolume.id) + ' dev:' + str(dev) +
+                                ', output:\n' + "\n".join(out))
+            status, written, write_start, md5_start, md5_end, md5 = results[dev]
+            write_time = get_time(md5_start) - get_time(write_start)
+            md5_time = get_time(md5_end) - get_time(md5_start)
+            written = int(written or 0)
+            if status == 'written' and written != int(length):
+                raise Exception(str(self.id) + ': wrote ' + str(written) + '/' + str(length) + ' bytes to ' +
+                                str(euvolume.id) + ' dev:' + str(dev))
+            summary['total_bytes'] += written + int(length)
+            summary['results'].append({'volume': euvolume,
+                                       'dev': dev,
+                                       'status': status,
+                                       'length': int(length),
+                                       'bytes': written,
+                                       'write_time': write_time,
+                                       'write_mbps': (written / float(mb) / write_time) if written and write_time
+                                                     else 0,
+                                       'md5_time': md5_time,
+                                       'md5_mbps': (int(length) / float(mb) / md5_time) if md5_time else 0,
+                                       'md5': md5})
+        summary['mbps'] = summary['total_bytes'] / float(mb) / (elapsed or 1)
+        self.print_euvolume_pipeline_summary(summary)
+        return summary
+
+    def print_euvolume_pipeline_summary(self, summary, printmethod=None):
+        printmethod = printmethod or self.debug
+        buf = ("\n" + "VOLUME".ljust(15) + "|" + "DEV".center(12) + "|" + "STATUS".center(9) + "|" +
+               "BYTES".center(12) + "|" + "WRITE MB/s".center(12) + "|" + "MD5 MB/s".center(10) + "|" +
+               "MD5".center(34) + "\n")
+        for result in summary['results']:
+            buf += (str(result['volume'].id).ljust(15) + "|" + str(result['dev']).center(12) + "|" +
+                    str(result['status']).center(9) + "|" + str(result['length']).center(12) + "|" +
+                    ("%.2f" % result['write_mbps']).center(12) + "|" + ("%.2f" % result['md5_mbps']).center(10) +
+                    "|" + str(result['md5']).center(34) + "\n")
+        buf += ("Volumes:" + str(len(summary['results'])) + ", bytes written+read:" + str(summary['total_bytes']) +
+                ", elapsed:" + ("%.2f" % summary['elapsed']) + "s, aggregate:" + ("%.2f" % summary['mbps']) +
+                " MB/s\n")
+        printmethod(buf)
+        return buf
         
     def reboot_instance_and_verify(self,
                                    waitconnect=30,
@@ -1358,15 +1783,16 @@ class EuInstance(Instance, TaggedResource):
         '''
         bad_list = []
         vol_list = []
-        checked_vdevs = []
         poll_count = 0
-        dev_list = self.get_dev_dir()
         found = False
 
         if euvol_list is not None:
             vol_list.extend(euvol_list)
         else:
             vol_list = self.attached_vols
+        #md5 every guest device once per poll for all the lengths in use, then match each volume in memory
+        md5lens = [vol.md5len for vol in vol_list if getattr(vol, 'md5len', None) is not None] or [md5length]
+        refresh = True
         self.debug("Checking for volumes whos state is not in sync with our instance's test state...")
         for vol in vol_list:
             #first see if the cloud believes this volume is still attached. 
@@ -1377,7 +1803,6 @@ class EuInstance(Instance, TaggedResource):
                     found = False
                     elapsed = 0 
                     start = time.time()
-                    checked_vdevs = []
                     #loop here for timepervol in case were waiting for a volume to appear in the guest. ie attaching
                     while (not found) and ((elapsed <= timepervol) or (poll_count < min_polls)):
                         try:
@@ -1385,30 +1810,22 @@ class EuInstance(Instance, TaggedResource):
                             #Ugly... :-(
                             #handle virtio and non virtio cases differently (KVM case needs improvement here).
                             if self.virtio_blk or check_md5:
-                                self.debug('Checking any new devs for md5:'+str(vol.md5))
+                                self.debug('Checking guest devs for md5:'+str(vol.md5))
                                 #Do some detective work to see what device name the previously attached volume is using
-                                devlist = self.get_dev_dir()
-                                for vdev in devlist:
-                                    vdev = "/dev/"+str(vdev)
-                                    
-                                    #if we've already checked the md5 on this dev no need to re-check it. 
-                                    if not vdev in checked_vdevs: 
-                                        self.debug('Checking '+str(vdev)+" for match against euvolume:"+str(vol.id))
-                                        md5 = self.get_dev_md5(vdev, vol.md5len )
-                                        self.debug('comparing '+str(md5)+' vs '+str(vol.md5))
-                                        if md5 == vol.md5:
-                                            self.debug('Found match at dev:'+str(vdev))
-                                            found = True
-                                            if (vol.guestdev != vdev ):
-                                                self.debug("("+str(vol.id)+")Found dev match. Guest dev changed! Updating from previous:'"
-                                                           + str(vol.guestdev) + "' to:'"+str(vdev)+"'")
-                                            else:
-                                                self.debug("(" + str(vol.id) + ")Found dev match. Previous dev:'"
-                                                           + str(vol.guestdev) + "', Current dev:'" + str(vdev) + "'")
-                                            vol.guestdev = vdev
-                                        checked_vdevs.append(vdev) # add to list of devices we've already checked.
-                                    if found:
-                                        break
+                                devices = self.get_guest_block_devices(md5lens=md5lens + [vol.md5len],
+                                                                       refresh=refresh)
+                                refresh = False
+                                vdev = self.find_guest_block_device(vol.md5, vol.md5len, devices=devices)
+                                if vdev:
+                                    self.debug('Found match at dev:'+str(vdev))
+                                    found = True
+                                    if (vol.guestdev != vdev ):
+                                        self.debug("("+str(vol.id)+")Found dev match. Guest dev changed! Updating from previous:'"
+                                                   + str(vol.guestdev) + "' to:'"+str(vdev)+"'")
+                                    else:
+                                        self.debug("(" + str(vol.id) + ")Found dev match. Previous dev:'"
+                                                   + str(vol.guestdev) + "', Current dev:'" + str(vdev) + "'")
+                                    vol.guestdev = vdev
                             else:
                                 #Not using virtio_blk assume the device will be the same
                                 self.assertFilePresent(vol.guestdev.strip())
@@ -1419,6 +1836,7 @@ class EuInstance(Instance, TaggedResource):
                             break
                         self.debug('Local device for volume:' + str(vol.id) + ' not found. Sleeping and checking again...')
                         time.sleep(10)
+                        refresh = True
                         elapsed = int(time.time() - start)
                     if not found:
                         bad_list.append(vol)
@@ -1437,21 +1855,16 @@ class EuInstance(Instance, TaggedResource):
 
         md5 = md5 or euvolume.md5
         md5len = md5len or euvolume.md5len
-        for vdev in  self.get_dev_dir():
-            vdev = '/dev/'+ str(vdev).replace('/dev/','')
-            self.debug('Checking '+str(vdev)+" for a matching block device")
-            block_md5 = self.get_dev_md5(vdev, md5len )
-            self.debug('comparing dev' + str(vdev) +': '+str(block_md5)+' vs vol:'+str(md5))
-            if block_md5 == md5:
-                self.debug('Found match at dev:'+str(vdev))
-                if (euvolume):
-                    if ( euvolume.guestdev != vdev ):
-                        self.debug("("+str(euvolume.id)+")Found dev match. Guest dev changed! Updating from previous:'"+str(euvolume.guestdev)+"' to:'"+str(vdev)+"'")
-                    else:
-                        self.debug("("+str(euvolume.id)+")Found dev match. Previous dev:'"+str(euvolume.guestdev)+"', Current dev:'"+str(vdev)+"'")
-                    euvolume.guestdev = vdev
-                guestdev = vdev
-                break
+        vdev = self.find_guest_block_device(md5, md5len)
+        if vdev:
+            self.debug('Found match at dev:'+str(vdev))
+            if (euvolume):
+                if ( euvolume.guestdev != vdev ):
+                    self.debug("("+str(euvolume.id)+")Found dev match. Guest dev changed! Updating from previous:'"+str(euvolume.guestdev)+"' to:'"+str(vdev)+"'")
+                else:
+                    self.debug("("+str(euvolume.id)+")Found dev match. Previous dev:'"+str(euvolume.guestdev)+"', Current dev:'"+str(vdev)+"'")
+                euvolume.guestdev = vdev
+            guestdev = vdev
         if add_to_attached_list:
             if not euvolume in self.attached_vols:
                 euvolume.md5 = md5
@@ -32,6 +32,7 @@
 
 import re
 import time
+import traceback
 from eutester import sshconnection
 from eutester.sshconnection import SshCbReturn, CommandTimeoutException
 import types
@@ -612,9 +613,19 @@ class EuserviceManager(object):
         else:
             clc_machines =[self.tester.clc]
 
+        #Check the service status on all CLCs at once rather than one after the other
+        running_status = machine.MachineGroup(clc_machines, debugmethod=self.debug).run_method(
+            lambda clc: clc.get_eucalyptus_cloud_is_running_status())
         for clc_machine in clc_machines:
             clc_hostnames += clc_machine.hostname + ","
-            if clc_machine.get_eucalyptus_cloud_is_running_status():
+            status = running_status[clc_machine.hostname]
+            if status['exc_info']:
+                self.debug('Error checking eucalyptus cloud status on CLC:' + str(clc_machine.hostname) + '\n' +
+                           "".join(traceback.format_exception(*status['exc_info'])))
+                raise status['exc_info'][0], status['exc_info'][1], status['exc_info'][2]
+            if status['error']:
+                raise status['error']
+            if status['result']:
                 #Add to front of check list if this is the current tester clc, otherwise append to end.
                 if clc_machine == self.tester.clc:
                     good_clc_hosts.insert(0,clc_machine)
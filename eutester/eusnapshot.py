@@ -43,8 +43,10 @@ import time
 
 
 class EuSnapshot(Snapshot, TaggedResource):
+    tag_fingerprint_key = 'fingerprint'
     eutest_volume_md5 = None
     eutest_volume_md5len = None
+    eutest_volume_fingerprint = None
     eutest_volume_zone = None
     eutest_failmsg = None
     eutest_laststatus = None
@@ -65,6 +67,7 @@ class EuSnapshot(Snapshot, TaggedResource):
         newsnap.eutest_volume_md5 = None
         newsnap.tester = tester
         newsnap.eutest_volume_md5len = None
+        newsnap.eutest_volume_fingerprint = newsnap.tags.get(newsnap.tag_fingerprint_key)
         newsnap.eutest_volume_zone = None
         newsnap.eutest_volumes = []
         newsnap.eutest_failmsg = None
@@ -82,7 +85,22 @@ class EuSnapshot(Snapshot, TaggedResource):
     def update(self):
         super(EuSnapshot, self).update()
         self.set_last_status()
+
+    def update_from_snapshot(self, snapshot):
+        """
+        Update this eusnapshot in place from a snapshot obj fetched elsewhere, ie from a batched DescribeSnapshots
+        """
+        self._update(snapshot)
+        self.set_last_status()
     
+    def set_volume_fingerprint(self, fingerprint):
+        '''
+        Record the fingerprint of the source volume's data this snapshot was taken from and tag the snapshot with it,
+        so volumes created from this snapshot can be verified against it, see EuInstance.verify_euvolume_fingerprint()
+        '''
+        self.eutest_volume_fingerprint = fingerprint
+        self.add_tag(self.tag_fingerprint_key, fingerprint)
+
     def set_last_status(self,status=None):
         self.eutest_laststatus = self.status
         self.eutest_laststatustime = time.time()
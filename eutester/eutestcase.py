@@ -17,6 +17,9 @@ import StringIO
 import copy
 from eutester.timer import Timer
 import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 '''
 This is the base class for any test case to be included in the Eutester repo. It should include any
@@ -174,6 +177,14 @@ class EutesterTestUnit():
     
     type eof: boolean
     param eof: boolean to indicate whether a failure while running the given 'method' should end the test case exectution. 
+
+    type depends_on: list
+    param depends_on: EutesterTestUnits (or their names) which must pass before this unit is run when the list
+                      is run with max_workers > 1. See EutesterTestCase.run_test_case_list()
+
+    type resource_groups: list
+    param resource_groups: names of resources (ie a zone) this unit uses. Units sharing a group are not run at
+                           the same time when the list is run with max_workers > 1.
     '''
     def __init__(self,method, *args, **kwargs):
         self.method = method
@@ -193,6 +204,9 @@ class EutesterTestUnit():
             self.error_anchor_id = "ERROR_" + self.anchor_id
         self.description=self.get_test_method_description()
         self.eof=False
+        self.depends_on = []
+        self.resource_groups = []
+        self.output = None
         self.error = ""
         print "Creating testunit:" + str(self.name)+", args:"
         for count, thing in enumerate(args):
@@ -650,12 +664,20 @@ class EutesterTestCase(unittest.TestCase):
                 eof = kwargs['eof']
             else:
                 eof = kwargs.pop('eof')
+        depends_on = []
+        resource_groups = []
+        if 'depends_on' in kwargs and 'depends_on' not in methvars:
+            depends_on = kwargs.pop('depends_on') or []
+        if 'resource_groups' in kwargs and 'resource_groups' not in methvars:
+            resource_groups = kwargs.pop('resource_groups') or []
         ## Only pass the arg if we need it otherwise it will print with all methods/testunits
         if self.args.html_anchors:
             testunit = EutesterTestUnit(method, *args, html_anchors=self.args.html_anchors ,**kwargs)
         else:
             testunit = EutesterTestUnit(method, *args, **kwargs)
         testunit.eof = eof
+        testunit.depends_on = depends_on
+        testunit.resource_groups = resource_groups
         #if autoarg, auto populate testunit arguements from local testcase.args namespace values
         if autoarg:
             self.populate_testunit_with_args(testunit)
@@ -760,7 +782,7 @@ class EutesterTestCase(unittest.TestCase):
             buf += "---------------------\n"
         return buf
     
-    def run_test_case_list(self, list, eof=False, clean_on_exit=True, printresults=True):
+    def run_test_case_list(self, list, eof=False, clean_on_exit=True, printresults=True, max_workers=1):
         '''
         Desscription: wrapper to execute a list of ebsTestCase objects
         
@@ -776,38 +798,46 @@ class EutesterTestCase(unittest.TestCase):
         
         :type printresults: boolean
         :param printresults: Flag to indicate whether or not to print a summary of results upon run_test_case_list completion. 
+
+        :type max_workers: integer
+        :param max_workers: Number of EutesterTestUnits to run at once. When greater than 1 units are run as soon
+                            as their depends_on units have passed and no running unit shares one of their
+                            resource_groups, see run_test_units_concurrently().
         
         :rtype: integer
         :returns: integer exit code to represent pass/fail of the list executed. 
         '''
         self.testlist = list 
         start = time.time()
-        tests_ran=0
+        ran = []
         test_count = len(list)
         t = Timer("/tmp/eutester_" + str(uuid.uuid4()).replace("-", ""))
         try:
-            for test in list:
-                tests_ran += 1
-                self.print_test_unit_startmsg(test)
-                try:
-                    id = t.start()
-                    test.run(eof=eof or test.eof)
-                    t.end(id, str(test.name))
-                except Exception, e:
-                    self.debug('Testcase:'+ str(test.name)+' error:'+str(e))
-                    if eof or (not eof and test.eof):
-                        self.endfailure(str(test.name))
-                        raise e
+            if max_workers > 1:
+                self.run_test_units_concurrently(list, eof=eof, max_workers=max_workers, timer=t, ran=ran)
+            else:
+                for test in list:
+                    ran.append(test)
+                    self.print_test_unit_startmsg(test)
+                    try:
+                        id = t.start()
+                        test.run(eof=eof or test.eof)
+                        t.end(id, str(test.name))
+                    except Exception, e:
+                        self.debug('Testcase:'+ str(test.name)+' error:'+str(e))
+                        if eof or (not eof and test.eof):
+                            self.endfailure(str(test.name))
+                            raise e
+                        else:
+                            self.endfailure(str(test.name))
                     else:
-                        self.endfailure(str(test.name))
-                else:
-                    self.endsuccess(str(test.name))
-                self.debug(self.print_test_list_short_stats(list))
+                        self.endsuccess(str(test.name))
+                    self.debug(self.print_test_list_short_stats(list))
                         
         finally:
             elapsed = int(time.time()-start)
             msgout =  "RUN TEST CASE LIST DONE:\n"
-            msgout += "Ran "+str(tests_ran)+"/"+str(test_count)+" tests in "+str(elapsed)+" seconds\n"
+            msgout += "Ran "+str(len(ran))+"/"+str(test_count)+" tests in "+str(elapsed)+" seconds\n"
             t.finish()
 
             if printresults:
@@ -851,6 +881,111 @@ class EutesterTestCase(unittest.TestCase):
             else:
                 return(0)
 
+    def run_test_units_concurrently(self, list, eof=False, max_workers=4, timer=None, ran=None):
+        '''
+        Description: Runs a list of EutesterTestUnits in a pool of max_workers threads. A unit is started once
+        every unit in its depends_on list has passed, and only while no running unit shares one of its
+        resource_groups. Units are otherwise started in list order. A unit whose dependency failed or was not
+        run is not run. Each unit's output (print and debug) is collected separately and written out as one
+        block when the unit finishes, see TestUnitOutputRouter.
+        If a unit fails with eof (or test.eof) set, no further units are started, the running units are allowed
+        to finish and then the failure is raised as run_test_case_list() does when run serially.
+
+        :type list: list
+        :param list: list of EutesterTestUnit objects to be run
+
+        :type timer: Timer
+        :param timer: optional Timer used to record each unit's run time
+
+        :type ran: list
+        :param ran: optional list each unit is appended to as it is started
+
+        :rtype: list
+        :returns: the units which were started
+        '''
+        ran = [] if ran is None else ran
+        names = {}
+        for test in list:
+            names.setdefault(test.name, test)
+        depends = {}
+        for test in list:
+            depends[test] = []
+            for dep in test.depends_on:
+                if not isinstance(dep, EutesterTestUnit):
+                    if dep not in names:
+                        raise Exception('Testunit ' + str(test.name) + ' depends on unknown testunit:' + str(dep))
+                    dep = names[dep]
+                depends[test].append(dep)
+        pending = [test for test in list]
+        running = {}
+        failure = []
+        router = TestUnitOutputRouter()
+
+        def run_unit(test):
+            router.start_unit(test)
+            try:
+                self.print_test_unit_startmsg(test)
+                id = timer.start() if timer else None
+                try:
+                    test.run(eof=eof or test.eof)
+                    if timer:
+                        timer.end(id, str(test.name))
+                except Exception, e:
+                    self.debug('Testcase:'+ str(test.name)+' error:'+str(e))
+                    self.endfailure(str(test.name))
+                    return e
+                else:
+                    self.endsuccess(str(test.name))
+            finally:
+                router.end_unit(test)
+
+        self.debug('Running ' + str(len(list)) + ' testunits, ' + str(max_workers) + ' at a time')
+        router.install()
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                while pending or running:
+                    for test in [test for test in pending if not failure]:
+                        if len(running) >= max_workers:
+                            break
+                        if [d for d in depends[test] if d in pending or d in running.values()]:
+                            continue
+                        bad_deps = [d for d in depends[test] if d.result != EutesterTestResult.passed]
+                        if bad_deps:
+                            pending.remove(test)
+                            test.result = EutesterTestResult.not_run
+                            test.error = 'Dependencies did not pass:' + ",".join(str(d.name) for d in bad_deps)
+                            self.debug('Not running testunit ' + str(test.name) + ', ' + test.error)
+                            continue
+                        busy_groups = set()
+                        for running_test in running.values():
+                            busy_groups.update(running_test.resource_groups)
+                        if busy_groups.intersection(test.resource_groups):
+                            continue
+                        pending.remove(test)
+                        ran.append(test)
+                        running[executor.submit(run_unit, test)] = test
+                    if not running:
+                        if pending and not failure:
+                            # Nothing is running and nothing can start, what is left depends on itself
+                            for test in pending:
+                                test.error = 'Circular testunit dependencies'
+                            self.debug('Not running testunits with circular dependencies:' +
+                                       ",".join(str(test.name) for test in pending))
+                        break
+                    done, not_done = wait(running.keys(), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        test = running.pop(future)
+                        error = future.result()
+                        if error is not None and (eof or test.eof) and not failure:
+                            failure.append(error)
+                        router.flush_unit(test)
+                    self.debug(self.print_test_list_short_stats(list))
+        finally:
+            router.uninstall()
+        if failure:
+            raise failure[0]
+        return ran
+
     def print_test_unit_startmsg(self,test):
         startbuf = ''
         if self.args.html_anchors:
@@ -1466,6 +1601,70 @@ class EutesterTestCase(unittest.TestCase):
 
 
 
+class TestUnitOutputRouter():
+    '''
+    Description: Keeps the output of concurrently running EutesterTestUnits separate. While installed, writes to
+    sys.stdout and to logging handlers streaming to sys.stdout are routed to a buffer for the test unit the
+    writing thread is running, or straight through if the thread is not running a unit. flush_unit() writes
+    a unit's buffered output out as one block and keeps it as testunit.output.
+    '''
+    def __init__(self):
+        self.stream = sys.stdout
+        self.local = threading.local()
+        self.buffers = {}
+        self.lock = threading.Lock()
+        self.handlers = []
+
+    def install(self):
+        self.stream = sys.stdout
+        sys.stdout = self
+        for logger in [logging.getLogger()] + logging.Logger.manager.loggerDict.values():
+            for handler in getattr(logger, 'handlers', []):
+                if getattr(handler, 'stream', None) is self.stream:
+                    handler.stream = self
+                    self.handlers.append(handler)
+
+    def uninstall(self):
+        sys.stdout = self.stream
+        for handler in self.handlers:
+            handler.stream = self.stream
+        self.handlers = []
+
+    def start_unit(self, testunit):
+        buf = StringIO.StringIO()
+        with self.lock:
+            self.buffers[testunit] = buf
+        self.local.buffer = buf
+
+    def end_unit(self, testunit):
+        self.local.buffer = None
+
+    def flush_unit(self, testunit):
+        with self.lock:
+            buf = self.buffers.pop(testunit, None)
+            if buf is None:
+                return
+            testunit.output = buf.getvalue()
+            self.stream.write("\n" + str(" OUTPUT OF TESTUNIT: " + str(testunit.name) + " ").center(80, '#') +
+                              "\n" + testunit.output)
+            self.stream.flush()
+
+    def write(self, data):
+        buf = getattr(self.local, 'buffer', None)
+        if buf is not None:
+            buf.write(data)
+        else:
+            with self.lock:
+                self.stream.write(data)
+
+    def flush(self):
+        if getattr(self.local, 'buffer', None) is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
 class SkipTestException(Exception):
     def __init__(self, value):
         self.value = value
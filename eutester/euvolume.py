@@ -47,6 +47,7 @@ class EuVolume(Volume, TaggedResource):
     tag_md5len_key = 'md5len'
     tag_instance_id_key = 'instance_id'
     tag_guestdev_key = 'guestdev'
+    tag_fingerprint_key = 'fingerprint'
 
     '''
     Note: Different hypervisors will honor the requested cloud dev differently, so the requested device can not 
@@ -63,6 +64,9 @@ class EuVolume(Volume, TaggedResource):
         newvol.clouddev = "" #the device name given to the cloud as a request to be used.
         newvol.md5 = None
         newvol.md5len = 1024
+        newvol.fingerprint = None #sampled block fingerprint, see EuInstance.get_dev_fingerprint()
+        newvol.eutest_fingerprint_time = None
+        newvol.eutest_last_write = None
         newvol.eutest_failmsg = None
         newvol.eutest_laststatus = newvol.status
         newvol.eutest_ageatstatus = 0 
@@ -74,14 +78,27 @@ class EuVolume(Volume, TaggedResource):
             newvol.md5 = newvol.tags[newvol.tag_md5_key]
         if newvol.tags.has_key(newvol.tag_md5len_key):
             newvol.md5len = newvol.tags[newvol.tag_md5len_key]
+        if newvol.tags.has_key(newvol.tag_fingerprint_key):
+            newvol.fingerprint = newvol.tags[newvol.tag_fingerprint_key]
         newvol.set_attached_status()
 
         return newvol
     
     def update(self):
         super(EuVolume, self).update()
+        self.update_eutest_status()
+
+    def update_from_volume(self, volume):
+        """
+        Update this euvolume in place from a volume obj fetched elsewhere, ie from a batched DescribeVolumes
+        """
+        self._update(volume)
+        self.update_eutest_status()
+
+    def update_eutest_status(self):
         if (self.tags.has_key(self.tag_md5_key) and (self.md5 != self.tags[self.tag_md5_key])) or \
-            (self.tags.has_key(self.tag_md5len_key) and (self.md5len != self.tags[self.tag_md5len_key])):
+            (self.tags.has_key(self.tag_md5len_key) and (self.md5len != self.tags[self.tag_md5len_key])) or \
+            (getattr(self, 'fingerprint', None) and (self.fingerprint != self.tags.get(self.tag_fingerprint_key))):
             self.update_volume_attach_info_tags()
         self.set_last_status()
     
@@ -118,11 +135,14 @@ class EuVolume(Volume, TaggedResource):
             printmethod(buf)
         return buf
 
-    def update_volume_attach_info_tags(self, md5=None, md5len=None, instance_id=None, guestdev=None):
+    def update_volume_attach_info_tags(self, md5=None, md5len=None, instance_id=None, guestdev=None, fingerprint=None):
         md5 = md5 or self.md5
         md5len = md5len or self.md5len
+        fingerprint = fingerprint or getattr(self, 'fingerprint', None)
         self.add_tag(self.tag_md5_key, md5)
         self.add_tag(self.tag_md5len_key, md5len)
+        if fingerprint:
+            self.add_tag(self.tag_fingerprint_key, fingerprint)
         if self.status == 'in-use' and hasattr(self,'attach_data') and self.attach_data:
             instance_id = instance_id or self.eutest_attached_instance_id
             guestdev = guestdev or self.guestdev
@@ -132,6 +152,36 @@ class EuVolume(Volume, TaggedResource):
             self.set_volume_detached_tags()
 
 
+    def set_fingerprint(self, fingerprint):
+        '''
+        Record a fingerprint of this volume's data, see EuInstance.get_dev_fingerprint(), and tag the volume with it
+        '''
+        self.fingerprint = fingerprint
+        self.eutest_fingerprint_time = time.time()
+        self.add_tag(self.tag_fingerprint_key, fingerprint)
+
+    def clear_fingerprint(self):
+        '''
+        Called when this volume's data is written to. Its recorded fingerprint no longer matches the data, so it is
+        dropped along with its tag rather than being re-tagged by update() or copied onto snapshots.
+        '''
+        self.eutest_last_write = time.time()
+        self.fingerprint = None
+        if self.tags.has_key(self.tag_fingerprint_key):
+            self.remove_tag(self.tag_fingerprint_key)
+
+    def get_current_fingerprint(self):
+        '''
+        Returns this volume's fingerprint if it was taken after the last write to the volume, else None
+        '''
+        fingerprint = getattr(self, 'fingerprint', None)
+        last_write = getattr(self, 'eutest_last_write', None)
+        if not fingerprint:
+            return None
+        if last_write is not None and (getattr(self, 'eutest_fingerprint_time', None) or 0) <= last_write:
+            return None
+        return fingerprint
+
     def set_volume_detached_tags(self):
         self.remove_tag(self.tag_instance_id_key)
         self.remove_tag(self.tag_guestdev_key)
@@ -0,0 +1,231 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009-2011, Eucalyptus Systems, Inc.
+# All rights reserved.
+#
+# Redistribution and use of this software in source and binary forms, with or
+# without modification, are permitted provided that the following conditions
+# are met:
+#
+#   Redistributions of source code must retain the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer in the documentation and/or other
+#   materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+'''
+Waits on many resources at once for each to reach a given state.
+
+Each wait is a (resource, predicate) pair. Every poll, the pending resources are grouped by type and
+refreshed with one batched describe per type (ie tester.update_instances()) instead of one request per
+resource, then each predicate is checked against its freshly updated resource. Polls back off
+exponentially with jitter so many waiters do not poll the cloud in lock step.
+
+example:
+    waiter = EuWaiter(tester, timeout=300)
+    for instance in reservation.instances:
+        waiter.add(instance, lambda i: i.state == 'running', failure=lambda i: i.state == 'terminated')
+    waiter.add(volume, lambda v: v.status == 'available')
+    waiter.wait()
+    waiter.print_time_to_state()
+'''
+import time
+import random
+from boto.ec2.instance import Instance
+from boto.ec2.volume import Volume
+from boto.ec2.snapshot import Snapshot
+
+
+class WaitTarget():
+    def __init__(self, resource, predicate, failure=None, description=None):
+        '''
+        A single resource being waited on.
+
+        :param resource: the resource obj to update and test each poll
+        :param predicate: method, predicate(resource) returns True once the resource is in the wanted state
+        :param failure: optional method, failure(resource) returns True if the resource can no longer succeed
+        :param description: optional string used in debug and the time to state report
+        '''
+        self.resource = resource
+        self.predicate = predicate
+        self.failure = failure
+        self.description = description or str(getattr(resource, 'id', resource))
+        self.start = time.time()
+        self.elapsed = None
+        self.succeeded = False
+        self.failed = False
+        self.error = None
+
+    @property
+    def done(self):
+        return self.succeeded or self.failed
+
+    def check(self):
+        if self.done:
+            return
+        try:
+            if self.predicate(self.resource):
+                self.succeeded = True
+            elif self.failure and self.failure(self.resource):
+                self.failed = True
+                self.error = 'entered failure state'
+        except Exception, e:
+            self.failed = True
+            self.error = str(e)
+        if self.done:
+            self.elapsed = time.time() - self.start
+
+
+class EuWaiter():
+    # Resource type -> name of the tester method which updates a list of that type in place with batched requests
+    batch_update_methods = [(Instance, 'update_instances'),
+                            (Volume, 'update_volumes'),
+                            (Snapshot, 'update_snapshots')]
+
+    def __init__(self, tester, timeout=600, poll_interval=2, max_poll_interval=30, backoff=2.0, jitter=0.25):
+        '''
+        :param tester: tester obj used for debug and batched updates (ie an EC2ops)
+        :param timeout: default seconds to wait in wait()
+        :param poll_interval: seconds before the first re-poll
+        :param max_poll_interval: max seconds between polls
+        :param backoff: multiplier applied to the interval after each poll
+        :param jitter: fraction (0-1) of each interval randomly taken off to spread polling
+        '''
+        self.tester = tester
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.targets = []
+        self.polls = 0
+        self.update_requests = 0
+
+    def debug(self, msg):
+        if self.tester:
+            self.tester.debug(msg)
+
+    def add(self, resource, predicate, failure=None, description=None):
+        '''
+        Add a (resource, predicate) pair to wait on, see WaitTarget. Returns the WaitTarget.
+        '''
+        target = WaitTarget(resource, predicate, failure=failure, description=description)
+        self.targets.append(target)
+        return target
+
+    @property
+    def pending(self):
+        return [target for target in self.targets if not target.done]
+
+    def get_sleep_time(self, poll):
+        interval = min(self.poll_interval * (self.backoff ** poll), self.max_poll_interval)
+        return interval - (interval * self.jitter * random.random())
+
+    def update_resources(self, targets):
+        '''
+        Update the resources of 'targets', each distinct resource once, batching by type where the tester
+        supports it and otherwise falling back to each resource's own update().
+        '''
+        resources = []
+        for target in targets:
+            if not [r for r in resources if r is target.resource]:
+                resources.append(target.resource)
+        for resource_type, method_name in self.batch_update_methods:
+            batch = [r for r in resources if isinstance(r, resource_type)]
+            update_method = getattr(self.tester, method_name, None)
+            if batch and update_method:
+                self.update_requests += update_method(batch)
+                resources = [r for r in resources if not isinstance(r, resource_type)]
+        for resource in resources:
+            if hasattr(resource, 'update'):
+                self.update_requests += 1
+                resource.update()
+
+    def poll(self):
+        pending = self.pending
+        if pending:
+            self.update_resources(pending)
+            for target in pending:
+                target.check()
+        self.polls += 1
+        return self.pending
+
+    def wait(self, timeout=None, raise_on_failure=True):
+        '''
+        Poll until every target has succeeded or failed, or until timeout.
+
+        :param timeout: seconds to wait, defaults to the timeout this waiter was created with
+        :param raise_on_failure: raise an exception listing any failed or timed out targets
+        :return: list of the targets which succeeded
+        '''
+        timeout = self.timeout if timeout is None else timeout
+        start = time.time()
+        pending = self.poll()
+        poll = 0
+        while pending and (time.time() - start) < timeout:
+            sleep_time = min(self.get_sleep_time(poll), max(0, timeout - (time.time() - start)))
+            self.debug('Waiting on ' + str(len(pending)) + '/' + str(len(self.targets)) + ' resources, elapsed:' +
+                       str(int(time.time() - start)) + '/' + str(timeout) + ', next poll in:' +
+                       ('%.1f' % sleep_time))
+            time.sleep(sleep_time)
+            pending = self.poll()
+            poll += 1
+        for target in pending:
+            target.error = 'timed out after ' + str(int(time.time() - start)) + ' seconds'
+        self.debug('Waiter done after ' + str(self.polls) + ' polls, ' + str(self.update_requests) +
+                   ' update requests for ' + str(len(self.targets)) + ' resources')
+        failed = [target for target in self.targets if not target.succeeded]
+        if failed and raise_on_failure:
+            buf = str(len(failed)) + '/' + str(len(self.targets)) + ' resources did not reach their state:\n'
+            for target in failed:
+                buf += str(target.description) + ': ' + str(target.error) + '\n'
+            raise Exception(buf)
+        return [target for target in self.targets if target.succeeded]
+
+    def get_time_to_state(self):
+        '''
+        Returns dict of resource type name -> sorted list of seconds taken by each successful resource
+        '''
+        times = {}
+        for target in self.targets:
+            if target.succeeded:
+                times.setdefault(target.resource.__class__.__name__, []).append(target.elapsed)
+        for elapsed_list in times.itervalues():
+            elapsed_list.sort()
+        return times
+
+    def print_time_to_state(self, buckets=10, width=40, printmethod=None):
+        '''
+        Print a histogram per resource type of the time each resource took to reach its state.
+        '''
+        printmethod = printmethod or self.debug
+        buf = "\n"
+        for type_name, times in sorted(self.get_time_to_state().iteritems()):
+            low = times[0]
+            high = times[-1]
+            bucket_width = ((high - low) / buckets) or 1
+            counts = [0] * buckets
+            for elapsed in times:
+                counts[min(int((elapsed - low) / bucket_width), buckets - 1)] += 1
+            buf += (str(type_name) + ' time to state, count:' + str(len(times)) + ', min:' + ('%.1f' % low) +
+                    ', median:' + ('%.1f' % times[len(times) / 2]) + ', max:' + ('%.1f' % high) + '\n')
+            for index, count in enumerate(counts):
+                label = ('%.1f' % (low + index * bucket_width)).rjust(8) + 's |'
+                bar = '#' * int(round(float(count) / max(counts) * width))
+                buf += label + bar + ' ' + str(count) + '\n'
+        printmethod(buf)
+        return buf
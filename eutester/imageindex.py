@@ -0,0 +1,188 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009-2011, Eucalyptus Systems, Inc.
+# All rights reserved.
+#
+# Redistribution and use of this software in source and binary forms, with or
+# without modification, are permitted provided that the following conditions
+# are met:
+#
+#   Redistributions of source code must retain the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer in the documentation and/or other
+#   materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+'''
+In memory index of a cloud's images, answering DescribeImages style filters without a request.
+
+The index is built from one unfiltered DescribeImages request and maps each supported filter
+(image-id, name, root-device-type, virtualization-type, platform, tag-key, etc) value to the ids of the
+images with that value. A query intersects the id sets of each filter given. Refreshing the index makes
+one more DescribeImages request and only re-indexes images which were added, changed or removed.
+
+example:
+    index = ImageIndex(tester, ttl=300)
+    images = index.find({'root-device-type': 'ebs', 'platform': 'windows'})
+    machine_images = index.find({'id-prefix': index.get_id_prefixes('mi-')})
+'''
+import re
+import threading
+import time
+
+
+class ImageIndex():
+    # Filter name -> method returning the values an image is indexed under for that filter
+    indexed_filters = {'image-id': lambda image: [image.id],
+                       'id-prefix': lambda image: [str(image.id).split('-')[0]],
+                       'name': lambda image: [image.name],
+                       'state': lambda image: [image.state],
+                       'architecture': lambda image: [image.architecture],
+                       'owner-id': lambda image: [image.owner_id],
+                       'platform': lambda image: [image.platform],
+                       'root-device-type': lambda image: [image.root_device_type],
+                       'root-device-name': lambda image: [image.root_device_name],
+                       'virtualization-type': lambda image: [getattr(image, 'virtualization_type', None)],
+                       'tag-key': lambda image: (image.tags or {}).keys(),
+                       'tag-value': lambda image: (image.tags or {}).values()}
+
+    def __init__(self, tester, ttl=300):
+        '''
+        :param tester: tester obj with an ec2 connection, used for DescribeImages and debug
+        :param ttl: seconds before the index is refreshed on the next query
+        '''
+        self.tester = tester
+        self.ttl = ttl
+        self.stale = True
+        self.last_refresh = None
+        self.images = {}
+        self.order = []
+        self.signatures = {}
+        self.maps = {}
+        for filter_name in self.indexed_filters:
+            self.maps[filter_name] = {}
+        self._lock = threading.RLock()
+
+    def debug(self, msg):
+        if self.tester:
+            self.tester.debug(msg)
+
+    @classmethod
+    def get_signature(cls, image):
+        '''
+        Returns the indexed values of an image, used to find images which changed between refreshes
+        '''
+        signature = []
+        for filter_name in sorted(cls.indexed_filters):
+            signature.append(tuple(sorted(str(value) for value in cls.indexed_filters[filter_name](image))))
+        return tuple(signature) + (image.location,)
+
+    def _add(self, image):
+        self.images[image.id] = image
+        self.signatures[image.id] = self.get_signature(image)
+        for filter_name, get_values in self.indexed_filters.iteritems():
+            for value in get_values(image):
+                if value is not None:
+                    self.maps[filter_name].setdefault(str(value), set()).add(image.id)
+
+    def _remove(self, image_id):
+        image = self.images.pop(image_id, None)
+        self.signatures.pop(image_id, None)
+        if not image:
+            return
+        for filter_name, get_values in self.indexed_filters.iteritems():
+            for value in get_values(image):
+                ids = self.maps[filter_name].get(str(value))
+                if ids is not None:
+                    ids.discard(image_id)
+                    if not ids:
+                        self.maps[filter_name].pop(str(value))
+
+    def refresh(self):
+        '''
+        Fetch all images with one DescribeImages request and re-index those added, changed or removed
+        since the last refresh. Unchanged images keep the same obj so references held by callers stay valid.
+        '''
+        with self._lock:
+            images = self.tester.ec2.get_all_images()
+            added = updated = removed = 0
+            order = []
+            for image in images:
+                order.append(image.id)
+                if image.id not in self.images:
+                    self._add(image)
+                    added += 1
+                elif self.get_signature(image) != self.signatures[image.id]:
+                    self._remove(image.id)
+                    self._add(image)
+                    updated += 1
+            fetched = set(order)
+            for image_id in self.images.keys():
+                if image_id not in fetched:
+                    self._remove(image_id)
+                    removed += 1
+            self.order = order
+            self.last_refresh = time.time()
+            self.stale = False
+            self.debug('Image index refreshed, ' + str(len(order)) + ' images, added:' + str(added) + ', updated:' +
+                       str(updated) + ', removed:' + str(removed))
+
+    def _refresh_if_expired(self):
+        if self.stale or (time.time() - self.last_refresh) > self.ttl:
+            self.refresh()
+
+    def get_id_prefixes(self, pattern):
+        '''
+        Return the indexed image id prefixes (ie 'emi', 'eki') whose ids match the regex 'pattern',
+        ie 'mi-' returns ['ami', 'emi'] on a cloud with both. For use as the 'id-prefix' filter of find().
+
+        :param pattern: regex matched against '<prefix>-'
+        '''
+        with self._lock:
+            self._refresh_if_expired()
+            return sorted(prefix for prefix in self.maps['id-prefix'] if re.search(pattern, prefix + '-'))
+
+    def find(self, filters=None):
+        '''
+        Return the images matching 'filters', in DescribeImages order, refreshing the index first if it is
+        stale or older than ttl. Filter values may be a string or a list of strings (any of which match).
+        Returns None if a filter is not indexed or uses wildcards, for the caller to make the request instead.
+
+        :param filters: dict of DescribeImages filter name -> value(s)
+        '''
+        filters = filters or {}
+        for filter_name, values in filters.iteritems():
+            if filter_name not in self.indexed_filters:
+                return None
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+            for value in values:
+                if '*' in str(value) or '?' in str(value):
+                    return None
+        with self._lock:
+            self._refresh_if_expired()
+            matches = None
+            for filter_name, values in filters.iteritems():
+                if not isinstance(values, (list, tuple)):
+                    values = [values]
+                ids = set()
+                for value in values:
+                    ids.update(self.maps[filter_name].get(str(value), set()))
+                matches = ids if matches is None else (matches & ids)
+            if matches is None:
+                return [self.images[image_id] for image_id in self.order]
+            return [self.images[image_id] for image_id in self.order if image_id in matches]
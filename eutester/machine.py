@@ -33,7 +33,8 @@ import select
 import threading
 import time
 import eulogger
-from eutester import Eutester
+from concurrent.futures import ThreadPoolExecutor, wait
+from eutester import Eutester, TimeoutFunctionException
 from eutester.euconfig import EuConfig
 import sshconnection
 import re
@@ -125,7 +126,8 @@ class Machine:
                                                     timeout=timeout, 
                                                     retry=retry,
                                                     debugmethod=self.debugmethod,
-                                                    verbose=True)
+                                                    verbose=True,
+                                                    cache_connection=True)
             self.sftp = self.ssh.connection.open_sftp()
         # If we were given a conf file, and have an ssh/sftp session, attempt to populate eucalyptus_conf into
         # a euconfig object for this machine...
@@ -244,6 +246,18 @@ class Machine:
             return self.ssh.cmd(cmd, verbose=verbose, timeout=timeout, listformat=listformat, cb=cb, cbargs=cbargs)
         else:
             raise Exception("Euinstance ssh connection is None")
+
+    def cmd_async(self, cmd, verbose=True, timeout=120, listformat=False, cb=None, cbargs=[]):
+        '''
+        Issues a command against the ssh connection to this machine without waiting for it to complete.
+        Commands share this machine's ssh transport, see SshConnection.cmd_async() for more info.
+        returns concurrent.futures.Future, future.result() returns the cmd() dict
+        '''
+        if (self.ssh is not None):
+            return self.ssh.cmd_async(cmd, verbose=verbose, timeout=timeout, listformat=listformat, cb=cb,
+                                      cbargs=cbargs)
+        else:
+            raise Exception("Euinstance ssh connection is None")
         
     def sys_until_found(self, cmd, regex, verbose=True, timeout=120, listformat=True):
         '''
@@ -734,3 +748,147 @@ class Machine:
         s += "+" + "Components: " +   str(self.components) +"\n"
         s += "+++++++++++++++++++++++++++++++++++++++++++++++++++++"
         return s
+
+
+class MachineGroup:
+    def __init__(self, machines, max_workers=None, debugmethod=None):
+        """
+        Runs commands or methods against a list of machines concurrently, so a check across
+        the whole cloud takes roughly the time of the slowest machine rather than the sum of all of them.
+        example:
+            group = MachineGroup(tester.get_component_machines('nc'))
+            results = group.sys('virsh list', timeout=30)
+            for hostname, result in results.iteritems():
+                print hostname, result['status'], result['elapsed'], result['output']
+
+        :param machines: list of Machine objects
+        :param max_workers: max number of machines worked on at once, defaults to the number of machines
+        :param debugmethod: method used to print debug
+        """
+        self.machines = machines or []
+        self.max_workers = max_workers
+        self.debugmethod = debugmethod
+
+    def debug(self, msg):
+        if self.debugmethod:
+            self.debugmethod(msg)
+        else:
+            print msg
+
+    def run_method(self, method, *args, **kwargs):
+        """
+        Run 'method' against every machine concurrently, called as method(machine, *args, **kwargs).
+        Returns a dict keyed by machine hostname of result dicts:
+            ['machine'] - The Machine object
+            ['result'] - The value returned by method, or None if it raised or did not complete
+            ['error'] - The exception raised by method, or TimeoutFunctionException if it did not complete in time
+            ['exc_info'] - sys.exc_info() of the exception raised by method, to re-raise it with its traceback
+            ['elapsed'] - Time in seconds method ran against this machine
+
+        :param method: method to run against each machine
+        :param timeout: optional keyword only, global time in seconds to wait for all machines to complete.
+                        It is not passed on to method.
+        :return: dict of result dicts keyed by machine hostname
+        """
+        timeout = kwargs.pop('timeout', None)
+        results = {}
+        if not self.machines:
+            return results
+        def run(machine):
+            start = time.time()
+            result = {'machine': machine, 'result': None, 'error': None, 'exc_info': None, 'elapsed': None}
+            try:
+                result['result'] = method(machine, *args, **kwargs)
+            except Exception, e:
+                result['error'] = e
+                result['exc_info'] = sys.exc_info()
+            result['elapsed'] = time.time() - start
+            return result
+        start = time.time()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers or len(self.machines))
+        try:
+            futures = {}
+            for machine in self.machines:
+                futures[executor.submit(run, machine)] = machine
+            done, not_done = wait(futures.keys(), timeout=timeout)
+            for future in done:
+                results[futures[future].hostname] = future.result()
+            for future in not_done:
+                future.cancel()
+                results[futures[future].hostname] = {'machine': futures[future],
+                                                     'result': None,
+                                                     'error': TimeoutFunctionException(
+                                                         'Did not complete within timeout:' + str(timeout)),
+                                                     'exc_info': None,
+                                                     'elapsed': time.time() - start}
+        finally:
+            # Don't block on machines which did not complete within the timeout
+            executor.shutdown(wait=False)
+        return results
+
+    def cmd(self, cmd, verbose=False, timeout=120, listformat=False):
+        """
+        Run 'cmd' on every machine concurrently via ssh.
+        Returns a dict keyed by machine hostname of result dicts:
+            ['machine'] - The Machine object
+            ['output'] - The std out/err from the executed command, None if it did not complete
+            ['status'] - The exitcode of the command, SshConnection.cmd_timeout_err_code if it timed out, or
+                         SshConnection.cmd_not_executed_code if it could not be run
+            ['error'] - Exception raised while running the cmd on this machine, else None
+            ['elapsed'] - Time in seconds the command ran on this machine
+
+        :param cmd: string, the command to be executed
+        :param verbose: boolean flag to enable debug
+        :param timeout: time in seconds for the commands on all machines to complete
+        :param listformat: specifies returned output in list of lines, or single string buffer
+        :return: dict of result dicts keyed by machine hostname
+        """
+        results = {}
+        method_results = self.run_method(lambda machine: machine.cmd(cmd, verbose=verbose, timeout=timeout,
+                                                                     listformat=listformat),
+                                         timeout=timeout)
+        for hostname, method_result in method_results.iteritems():
+            out = method_result['result'] or {}
+            error = method_result['error']
+            if 'status' in out:
+                status = out['status']
+            elif isinstance(error, (TimeoutFunctionException, sshconnection.CommandTimeoutException)):
+                status = sshconnection.SshConnection.cmd_timeout_err_code
+            else:
+                status = sshconnection.SshConnection.cmd_not_executed_code
+            results[hostname] = {'machine': method_result['machine'],
+                                 'output': out.get('output'),
+                                 'status': status,
+                                 'error': error,
+                                 'elapsed': method_result['elapsed']}
+        return results
+
+    def sys(self, cmd, verbose=False, timeout=120, listformat=True, code=None):
+        """
+        Run 'cmd' on every machine concurrently via ssh, see cmd() for the returned dict format.
+        If 'code' is provided an exception is raised listing every machine whose cmd status did not match it.
+        """
+        results = self.cmd(cmd, verbose=verbose, timeout=timeout, listformat=listformat)
+        if code is not None:
+            failed = ""
+            for hostname in sorted(results):
+                if results[hostname]['status'] != code:
+                    failed += "\n" + str(hostname) + ": status:" + str(results[hostname]['status']) \
+                              + ", error:" + str(results[hostname]['error']) \
+                              + ", output:" + str(results[hostname]['output'])
+            if failed:
+                raise sshconnection.CommandExitCodeException('Cmd:' + str(cmd) + ' failed on machines:' + failed)
+        return results
+
+    def print_results(self, results, printmethod=None):
+        """
+        Print a summary table of the results returned by cmd()/sys()/run_method()
+        """
+        printmethod = printmethod or self.debug
+        buf = "\n" + "HOSTNAME".ljust(30) + "STATUS".ljust(10) + "ELAPSED".ljust(10) + "ERROR\n"
+        for hostname in sorted(results):
+            result = results[hostname]
+            status = result.get('status', '')
+            buf += str(hostname).ljust(30) + str(status).ljust(10) + ("%.2f" % result['elapsed']).ljust(10) \
+                   + str(result['error'] or '') + "\n"
+        printmethod(buf)
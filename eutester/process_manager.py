@@ -33,13 +33,93 @@
 from eutester.eutestcase import EutesterTestCase
 from multiprocessing import Process
 from multiprocessing import Queue
+from multiprocessing import Pipe
+import cPickle as pickle
+import copy_reg
+import traceback
 import inspect
+import select
+import types
+import time
 import uuid
 
+
+def _reduce_method(method):
+    # Lets bound methods of picklable objects be sent to pool workers
+    return getattr, (method.im_self or method.im_class, method.im_func.func_name)
+copy_reg.pickle(types.MethodType, _reduce_method)
+
+
+def _pool_worker(conn):
+    '''
+    Pool worker process loop, runs (task id, pickled (method, arguments)) requests received on 'conn' until it
+    receives None, sending back (task id, succeeded, return value or error string, remote traceback).
+    '''
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if request is None:
+            return
+        task_id, payload = request
+        try:
+            method, arguments = pickle.loads(payload)
+            conn.send((task_id, True, method(**arguments), None))
+        except Exception, e:
+            conn.send((task_id, False, str(e.__class__.__name__) + ': ' + str(e), traceback.format_exc()))
+
+
+class ProcessTaskError(Exception):
+    def __init__(self, msg, remote_traceback=None):
+        self.msg = msg
+        self.remote_traceback = remote_traceback
+
+    def __str__(self):
+        if self.remote_traceback:
+            return str(self.msg) + "\nRemote traceback:\n" + str(self.remote_traceback)
+        return str(self.msg)
+
+
+class ProcessTask():
+    def __init__(self, id, method, payload, timeout=None):
+        '''
+        A method call submitted to the ProcessManager worker pool, see ProcessManager.submit()
+        '''
+        self.id = id
+        self.number = None
+        self.name = str(getattr(method, '__name__', method))
+        self.payload = payload
+        self.timeout = timeout
+        self.worker = None
+        self.start = None
+        self.elapsed = None
+        self.done = False
+        self.value = None
+        self.error = None
+        self.remote_traceback = None
+
+    def result(self):
+        '''
+        Returns the method's return value, or raises ProcessTaskError with the remote traceback if it raised,
+        timed out or its worker died.
+        '''
+        if not self.done:
+            raise ProcessTaskError('Task ' + str(self.name) + ':' + str(self.id) + ' has not completed')
+        if self.error is not None:
+            raise ProcessTaskError('Task ' + str(self.name) + ':' + str(self.id) + ' failed, ' + str(self.error),
+                                   remote_traceback=self.remote_traceback)
+        return self.value
+
+
 class ProcessManager():
     def __init__(self):
         self.process_pool = {}
         self.queue_pool = {}
+        self.workers = []
+        self.tasks = {}
+        self.task_count = 0
+        self.pending_tasks = []
 
     def lookup_process(self, id):
         try:
@@ -84,11 +164,15 @@ class ProcessManager():
         """
         arguments = {}
         spec = inspect.getargspec(func)
+        spec_args = spec.args
+        if inspect.ismethod(func) and func.im_self is not None:
+            # Bound method, 'self' is already supplied
+            spec_args = spec_args[1:]
         if spec.defaults:
-            arguments.update(zip(reversed(spec.args), reversed(spec.defaults)))
+            arguments.update(zip(reversed(spec_args), reversed(spec.defaults)))
         if spec.keywords:
             arguments.update(spec.keywords)
-        arguments.update(zip(spec.args, args))
+        arguments.update(zip(spec_args, args))
         arguments.update(kwargs)
         return arguments
 
@@ -115,3 +199,166 @@ class ProcessManager():
                 result_list.append(self.wait_for_process(process))
         return result_list
 
+    def start_pool(self, workers=4):
+        '''
+        Start a pool of 'workers' reusable worker processes for submit(). Tasks are pickled to the workers, so
+        methods must be module level functions or methods of picklable objects, and return picklable values.
+        '''
+        for x in xrange(workers - len(self.workers)):
+            self.workers.append(self.__start_worker())
+
+    def __start_worker(self):
+        conn, worker_conn = Pipe()
+        process = Process(target=_pool_worker, args=(worker_conn,))
+        process.daemon = True
+        process.start()
+        worker_conn.close()
+        return {'process': process, 'conn': conn, 'task': None}
+
+    def __restart_worker(self, worker):
+        if worker['process'].is_alive():
+            worker['process'].terminate()
+        worker['process'].join(1)
+        worker['conn'].close()
+        worker.update(self.__start_worker())
+
+    def shutdown_pool(self, wait=True):
+        '''
+        Stop the pool workers. If wait, idle workers are asked to exit and busy ones are left to finish their
+        current task, otherwise every worker is terminated.
+        '''
+        for worker in self.workers:
+            try:
+                if wait and worker['process'].is_alive():
+                    worker['conn'].send(None)
+                    worker['process'].join()
+                else:
+                    worker['process'].terminate()
+            finally:
+                worker['conn'].close()
+        self.workers = []
+
+    def submit(self, method, *args, **kwargs):
+        '''
+        Queue method(*args, **kwargs) to run in the worker pool, starting a default sized pool if needed.
+        A 'timeout' kwarg (if 'method' does not take one) sets the seconds the call may run before its worker is
+        killed and replaced and the task fails. Returns the task id, see as_completed() and wait_for_task().
+        '''
+        methvars = EutesterTestCase.get_meth_arg_names(method)
+        timeout = None
+        if 'timeout' in kwargs and 'timeout' not in methvars:
+            timeout = kwargs.pop('timeout')
+        if not self.workers:
+            self.start_pool()
+        payload = pickle.dumps((method, self.__get_arguments(method, args, kwargs)), pickle.HIGHEST_PROTOCOL)
+        id = uuid.uuid1().hex
+        task = ProcessTask(id, method, payload, timeout=timeout)
+        task.number = self.task_count
+        self.task_count += 1
+        self.tasks[id] = task
+        self.pending_tasks.append(task)
+        self.__dispatch_tasks()
+        return id
+
+    def __dispatch_tasks(self):
+        for worker in self.workers:
+            if not self.pending_tasks:
+                return
+            if worker['task'] is None:
+                task = self.pending_tasks.pop(0)
+                task.worker = worker
+                task.start = time.time()
+                worker['task'] = task
+                worker['conn'].send((task.id, task.payload))
+
+    def __complete_task(self, task, value=None, error=None, remote_traceback=None):
+        task.done = True
+        task.elapsed = time.time() - task.start
+        task.value = value
+        task.error = error
+        task.remote_traceback = remote_traceback
+        task.payload = None
+        task.worker['task'] = None
+        task.worker = None
+
+    def as_completed(self, timeout=None):
+        '''
+        Generator yielding each submitted ProcessTask as it completes, in completion order rather than submit
+        order. Call task.result() for the return value or to raise the remote error. Tasks past their own
+        timeout are failed and their worker replaced. Raises ProcessTaskError if 'timeout' seconds pass with
+        tasks still running. Yielded tasks are no longer tracked by the manager.
+        '''
+        for task in [task for task in self.tasks.values() if task.done]:
+            del self.tasks[task.id]
+            yield task
+        for task in self.__run_tasks(timeout=timeout):
+            self.tasks.pop(task.id, None)
+            yield task
+
+    def __run_tasks(self, timeout=None):
+        start = time.time()
+        while True:
+            self.__dispatch_tasks()
+            running = [worker['task'] for worker in self.workers if worker['task']]
+            if not running:
+                return
+            now = time.time()
+            deadlines = [task.start + task.timeout for task in running if task.timeout is not None]
+            if timeout is not None:
+                deadlines.append(start + timeout)
+            wait_time = max(0, min(deadlines) - now) if deadlines else None
+            ready, w, x = select.select([task.worker['conn'] for task in running], [], [], wait_time)
+            completed = []
+            for task in running:
+                worker = task.worker
+                if worker['conn'] in ready:
+                    try:
+                        task_id, succeeded, value, remote_traceback = worker['conn'].recv()
+                    except (EOFError, IOError), e:
+                        self.__complete_task(task, error='worker process exited (' + str(e) + ')')
+                        self.__restart_worker(worker)
+                    else:
+                        if succeeded:
+                            self.__complete_task(task, value=value)
+                        else:
+                            self.__complete_task(task, error=value, remote_traceback=remote_traceback)
+                    completed.append(task)
+                elif task.timeout is not None and time.time() - task.start >= task.timeout:
+                    self.__complete_task(task, error='timed out after ' + str(task.timeout) + ' seconds')
+                    self.__restart_worker(worker)
+                    completed.append(task)
+            for task in completed:
+                yield task
+            if not completed and timeout is not None and time.time() - start >= timeout:
+                raise ProcessTaskError(str(len(running)) + ' tasks still running after ' + str(timeout) +
+                                       ' seconds')
+
+    def lookup_task(self, id):
+        try:
+            return self.tasks[id]
+        except KeyError,e:
+            raise KeyError("Unable to find task: " + str(id))
+
+    def wait_for_task(self, id, timeout=None):
+        '''
+        Wait for a submitted task and return its result (raising its remote error), see ProcessTask.result()
+        '''
+        task = self.lookup_task(id)
+        if not task.done:
+            for completed in self.__run_tasks(timeout=timeout):
+                if completed is task:
+                    break
+        del self.tasks[id]
+        return task.result()
+
+    def get_all_task_results(self, timeout=None):
+        '''
+        Wait for every submitted task, returning their results in submit order. Raises ProcessTaskError for the
+        first failed task once all have completed.
+        '''
+        for task in self.__run_tasks(timeout=timeout):
+            pass
+        tasks = sorted(self.tasks.values(), key=lambda task: task.number)
+        self.tasks = {}
+        return [task.result() for task in tasks]
+
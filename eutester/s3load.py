@@ -0,0 +1,318 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009-2011, Eucalyptus Systems, Inc.
+# All rights reserved.
+#
+# Redistribution and use of this software in source and binary forms, with or
+# without modification, are permitted provided that the following conditions
+# are met:
+#
+#   Redistributions of source code must retain the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer in the documentation and/or other
+#   materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+'''
+S3 object load generator.
+
+Runs a weighted mix of PUT/GET/HEAD/DELETE/LIST requests across a set of buckets and keys from N
+concurrent workers, each worker using its own S3 connection (see S3ops.get_thread_s3_connection()).
+Object data is sliced from a random data pool generated once up front, so the cost of os.urandom is
+not part of the measured requests. Each request is timed and the results are reported per operation
+as ops/sec, MB/sec and p50/p95/p99 latency.
+
+example:
+    load = S3LoadGenerator(tester, buckets=4, keys_per_bucket=200, object_size=64 * 1024,
+                           mix={'put': 30, 'get': 50, 'head': 10, 'delete': 5, 'list': 5})
+    load.setup()
+    load.run(duration=60, workers=16)
+    load.print_results()
+    load.cleanup()
+'''
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from boto.exception import BotoServerError, S3ResponseError
+
+
+class DataPool():
+    def __init__(self, size=4 * 1024 * 1024):
+        '''
+        A block of random data generated once, object contents are sliced from it at random offsets.
+
+        :param size: bytes of random data in the pool
+        '''
+        self.size = size
+        self.data = os.urandom(size)
+
+    def get_data(self, length):
+        '''
+        Returns 'length' bytes of random data from the pool, repeating the pool if length is larger than it
+        '''
+        if length > self.size:
+            return (self.data * ((length / self.size) + 1))[:length]
+        offset = random.randint(0, self.size - length)
+        return self.data[offset:offset + length]
+
+
+class OperationStats():
+    def __init__(self, name):
+        '''
+        Latencies, byte counts and errors recorded for a single operation type.
+        '''
+        self.name = name
+        self.latencies = []
+        self.bytes = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def record(self, latency, nbytes=0, error=False):
+        with self.lock:
+            if error:
+                self.errors += 1
+            else:
+                self.latencies.append(latency)
+                self.bytes += nbytes
+
+    @property
+    def count(self):
+        return len(self.latencies)
+
+    def get_percentile(self, percent):
+        '''
+        Returns the latency at 'percent' (0-100) of the recorded latencies by nearest rank, or None if there are none
+        '''
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        index = int(round((percent / 100.0) * len(latencies))) - 1
+        return latencies[min(max(index, 0), len(latencies) - 1)]
+
+    def get_summary(self, elapsed):
+        elapsed = elapsed or 1
+        return {'operation': self.name,
+                'count': self.count,
+                'errors': self.errors,
+                'ops_per_sec': self.count / elapsed,
+                'mb_per_sec': self.bytes / elapsed / (1024 * 1024),
+                'p50': self.get_percentile(50),
+                'p95': self.get_percentile(95),
+                'p99': self.get_percentile(99),
+                'max': max(self.latencies) if self.latencies else None}
+
+
+class S3LoadGenerator():
+    operations = ['put', 'get', 'head', 'delete', 'list']
+
+    def __init__(self, tester, buckets=2, keys_per_bucket=100, object_size=1024, mix=None,
+                 bucket_prefix='s3load', pool_size=4 * 1024 * 1024, list_max_keys=100):
+        '''
+        :param tester: S3ops obj, provides the per thread connections and debug
+        :param buckets: number of buckets the load is spread across
+        :param keys_per_bucket: number of key names per bucket, puts overwrite these names
+        :param object_size: bytes per put, or a (min, max) tuple for a random size per put
+        :param mix: dict of operation name -> relative weight, defaults to an even mix
+        :param bucket_prefix: prefix of the bucket names created by setup()
+        :param pool_size: bytes of random data in the pregenerated data pool
+        :param list_max_keys: max keys requested by each list operation
+        '''
+        self.tester = tester
+        self.keys_per_bucket = keys_per_bucket
+        self.object_size = object_size
+        self.mix = mix or dict((op, 1) for op in self.operations)
+        for op in self.mix:
+            if op not in self.operations:
+                raise ValueError('Unknown operation in mix:' + str(op) + ', valid operations:' +
+                                 ",".join(self.operations))
+        self.list_max_keys = list_max_keys
+        self.bucket_names = [bucket_prefix + '-' + str(int(time.time())) + '-' + str(x) for x in xrange(buckets)]
+        self.pool = DataPool(max(pool_size, self.get_max_object_size()))
+        self.stats = dict((op, OperationStats(op)) for op in self.operations)
+        # Key names known to exist per bucket, used to pick keys for get/head/delete
+        self.existing_keys = dict((name, set()) for name in self.bucket_names)
+        self.keys_lock = threading.Lock()
+        self.elapsed = 0
+
+    def debug(self, msg):
+        self.tester.debug(msg)
+
+    def get_max_object_size(self):
+        if isinstance(self.object_size, tuple):
+            return self.object_size[1]
+        return self.object_size
+
+    def get_object_size(self):
+        if isinstance(self.object_size, tuple):
+            return random.randint(self.object_size[0], self.object_size[1])
+        return self.object_size
+
+    def choose_operation(self):
+        total = sum(self.mix.itervalues())
+        pick = random.uniform(0, total)
+        for op, weight in self.mix.iteritems():
+            pick -= weight
+            if pick <= 0:
+                return op
+        return self.mix.keys()[-1]
+
+    def choose_existing_key(self, bucket_name):
+        with self.keys_lock:
+            keys = self.existing_keys[bucket_name]
+            if not keys:
+                return None
+            return random.sample(keys, 1)[0]
+
+    def setup(self, prepopulate=True):
+        '''
+        Create the buckets and, if prepopulate, put half of each bucket's key names so the
+        first get/head/delete requests have objects to work on.
+        '''
+        for bucket_name in self.bucket_names:
+            self.tester.create_bucket(bucket_name)
+        if prepopulate:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                for bucket_name in self.bucket_names:
+                    for x in xrange(self.keys_per_bucket / 2):
+                        executor.submit(self.do_put, bucket_name, 'key-' + str(x), record=False)
+
+    def do_put(self, bucket_name, key_name=None, record=True):
+        key_name = key_name or 'key-' + str(random.randint(0, self.keys_per_bucket - 1))
+        data = self.pool.get_data(self.get_object_size())
+        bucket = self.tester.get_thread_s3_connection().get_bucket(bucket_name, validate=False)
+        start = time.time()
+        bucket.new_key(key_name).set_contents_from_string(data)
+        latency = time.time() - start
+        with self.keys_lock:
+            self.existing_keys[bucket_name].add(key_name)
+        if record:
+            self.stats['put'].record(latency, len(data))
+
+    def do_get(self, bucket_name):
+        key_name = self.choose_existing_key(bucket_name)
+        if key_name is None:
+            return self.do_put(bucket_name)
+        bucket = self.tester.get_thread_s3_connection().get_bucket(bucket_name, validate=False)
+        start = time.time()
+        data = bucket.new_key(key_name).get_contents_as_string()
+        self.stats['get'].record(time.time() - start, len(data))
+
+    def do_head(self, bucket_name):
+        key_name = self.choose_existing_key(bucket_name)
+        if key_name is None:
+            return self.do_put(bucket_name)
+        bucket = self.tester.get_thread_s3_connection().get_bucket(bucket_name, validate=False)
+        start = time.time()
+        if bucket.get_key(key_name) is None:
+            #get_key() returns None on a 404 rather than raising, count it as an error as do_get() does
+            raise S3ResponseError(404, 'Not Found')
+        self.stats['head'].record(time.time() - start)
+
+    def do_delete(self, bucket_name):
+        with self.keys_lock:
+            keys = self.existing_keys[bucket_name]
+            key_name = keys.pop() if keys else None
+        if key_name is None:
+            return self.do_put(bucket_name)
+        bucket = self.tester.get_thread_s3_connection().get_bucket(bucket_name, validate=False)
+        start = time.time()
+        bucket.delete_key(key_name)
+        self.stats['delete'].record(time.time() - start)
+
+    def do_list(self, bucket_name):
+        bucket = self.tester.get_thread_s3_connection().get_bucket(bucket_name, validate=False)
+        start = time.time()
+        bucket.get_all_keys(max_keys=self.list_max_keys)
+        self.stats['list'].record(time.time() - start)
+
+    def worker(self, stop_time, ops_remaining):
+        while time.time() < stop_time:
+            if ops_remaining is not None:
+                with self.keys_lock:
+                    if ops_remaining[0] <= 0:
+                        return
+                    ops_remaining[0] -= 1
+            op = self.choose_operation()
+            bucket_name = random.choice(self.bucket_names)
+            start = time.time()
+            try:
+                getattr(self, 'do_' + op)(bucket_name)
+            except BotoServerError, e:
+                self.stats[op].record(time.time() - start, error=True)
+                self.debug('S3 load ' + str(op) + ' error on bucket ' + str(bucket_name) + ': ' + str(e.status) +
+                           ' ' + str(e.reason))
+            except Exception, e:
+                #Dropped/reset connections and truncated responses under load are counted against the op
+                #rather than ending the run
+                self.stats[op].record(time.time() - start, error=True)
+                self.debug('S3 load ' + str(op) + ' failed on bucket ' + str(bucket_name) + ': ' +
+                           e.__class__.__name__ + ' ' + str(e))
+
+    def run(self, duration=60, workers=8, operations=None):
+        '''
+        Run the operation mix from 'workers' concurrent workers until 'duration' seconds have passed or,
+        if given, 'operations' total operations have been run. Returns the result summaries, see get_results()
+        '''
+        self.debug('Starting S3 load, workers:' + str(workers) + ', duration:' + str(duration) + ', operations:' +
+                   str(operations) + ', buckets:' + str(len(self.bucket_names)) + ', mix:' + str(self.mix))
+        ops_remaining = [operations] if operations is not None else None
+        start = time.time()
+        stop_time = start + duration
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.worker, stop_time, ops_remaining) for x in xrange(workers)]
+            for future in futures:
+                future.result()
+        self.elapsed += time.time() - start
+        return self.get_results()
+
+    def get_results(self):
+        '''
+        Returns a list of summary dicts, one per operation run, with count, errors, ops_per_sec,
+        mb_per_sec and the p50/p95/p99/max latency in seconds
+        '''
+        return [self.stats[op].get_summary(self.elapsed) for op in self.operations
+                if self.stats[op].count or self.stats[op].errors]
+
+    def print_results(self, printmethod=None):
+        printmethod = printmethod or self.debug
+        def ms(latency):
+            return ('%.2f' % (latency * 1000)) if latency is not None else '-'
+        buf = "\n" + "OP".ljust(8) + "COUNT".rjust(9) + "ERRORS".rjust(8) + "OPS/SEC".rjust(10) + "MB/SEC".rjust(9)
+        buf += "P50(ms)".rjust(10) + "P95(ms)".rjust(10) + "P99(ms)".rjust(10) + "MAX(ms)".rjust(10) + "\n"
+        total = 0
+        for result in self.get_results():
+            total += result['count']
+            buf += (result['operation'].ljust(8) + str(result['count']).rjust(9) + str(result['errors']).rjust(8) +
+                    ('%.1f' % result['ops_per_sec']).rjust(10) + ('%.2f' % result['mb_per_sec']).rjust(9) +
+                    ms(result['p50']).rjust(10) + ms(result['p95']).rjust(10) + ms(result['p99']).rjust(10) +
+                    ms(result['max']).rjust(10) + "\n")
+        buf += "TOTAL".ljust(8) + str(total).rjust(9) + " ops in " + ('%.2f' % self.elapsed) + " seconds, " + \
+               ('%.1f' % (total / (self.elapsed or 1))) + " ops/sec\n"
+        printmethod(buf)
+        return buf
+
+    def cleanup(self):
+        '''
+        Delete the buckets created by setup() and everything in them
+        '''
+        for bucket_name in self.bucket_names:
+            try:
+                self.tester.clear_bucket(bucket_name, bulk=True)
+            except Exception, e:
+                self.debug('Failed to clean up load bucket ' + str(bucket_name) + ': ' + str(e))
@@ -92,12 +92,14 @@ import paramiko
 import re
 import select
 import socket
+import threading
 import time
 import types
 import sys
 import termios
 import tty
 import eucaops
+from concurrent.futures import ThreadPoolExecutor
 
 
 
@@ -127,6 +129,140 @@ class SshCbReturn():
         self.buf = buf
 
 
+class SshCacheEntry():
+    def __init__(self, key, transport, parent=None):
+        """
+        A transport held in the SshTransportCache along with its reference count.
+        :param key: the cache key this transport was created for
+        :param transport: authenticated paramiko transport
+        :param parent: optional cache entry this transport depends on, ie the proxy transport a
+                       proxied connection's channel was opened on. Released when this entry is closed.
+        """
+        self.key = key
+        self.transport = transport
+        self.parent = parent
+        self.refcount = 1
+        self.last_used = time.time()
+        self.evicted = False
+
+
+class SshTransportCache():
+    def __init__(self, idle_timeout=300):
+        """
+        Process wide cache of authenticated paramiko transports keyed by the host, port, user, credentials and
+        proxy used to create them. SshConnections acquire() a transport and release() it when done, transports
+        are health checked before being handed out and unused transports are closed after 'idle_timeout' seconds.
+        This lets every connection tunneled through the same CLC/CC proxy share one proxy transport, and lets
+        connections to the same machine share one transport instead of each doing its own tcp/auth handshake.
+
+        :param idle_timeout: seconds an unreferenced transport is kept before being closed
+        """
+        self.idle_timeout = idle_timeout
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._key_locks = {}
+        self._lock = threading.RLock()
+
+    def acquire(self, key, connect_method):
+        """
+        Returns a cache entry with a healthy transport for 'key', using connect_method() to create and
+        authenticate a new transport if one is not cached. The entry must be given back with release().
+
+        :param key: tuple of the attributes used to create the transport
+        :param connect_method: method returning a new authenticated paramiko transport for 'key'
+        :return: SshCacheEntry
+        """
+        self.evict_idle()
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # Only one thread creates the transport for a given key, others wait and then share it
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry:
+                    if self.is_healthy(entry):
+                        entry.refcount += 1
+                        entry.last_used = time.time()
+                        self.hits += 1
+                        return entry
+                    self.evict(entry)
+            transport = connect_method()
+            entry = SshCacheEntry(key, transport)
+            with self._lock:
+                self._entries[key] = entry
+                self.misses += 1
+            return entry
+
+    def release(self, entry):
+        """
+        Give back a reference to a cache entry. The transport stays cached until idle, unless it has been evicted
+        in which case it is closed once nothing references it.
+        """
+        with self._lock:
+            entry.refcount -= 1
+            entry.last_used = time.time()
+            if entry.evicted and entry.refcount <= 0:
+                self._close_entry(entry)
+
+    def evict(self, entry):
+        """
+        Remove an entry from the cache so it is not handed out again. Its transport is closed now if unreferenced,
+        otherwise when the last reference to it is released.
+        """
+        with self._lock:
+            if self._entries.get(entry.key) is entry:
+                self._entries.pop(entry.key)
+            entry.evicted = True
+            if entry.refcount <= 0:
+                self._close_entry(entry)
+
+    def evict_idle(self):
+        """
+        Evict unreferenced entries which have been idle for longer than idle_timeout, or are no longer active.
+        """
+        now = time.time()
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.refcount <= 0 and \
+                        (now - entry.last_used > self.idle_timeout or not entry.transport.is_active()):
+                    self.evict(entry)
+
+    def clear(self):
+        """
+        Evict all entries, closing every unreferenced transport.
+        """
+        with self._lock:
+            for entry in self._entries.values():
+                self.evict(entry)
+
+    def is_healthy(self, entry):
+        """
+        Returns True if the entry's transport is active and can still send on its socket
+        """
+        if not entry.transport.is_active():
+            return False
+        try:
+            entry.transport.send_ignore()
+        except Exception:
+            return False
+        return True
+
+    def _close_entry(self, entry):
+        try:
+            entry.transport.close()
+        except Exception:
+            pass
+        if entry.parent:
+            parent = entry.parent
+            entry.parent = None
+            self.release(parent)
+
+
+#Process wide cache used by all SshConnections
+ssh_transport_cache = SshTransportCache()
+
+
 class SshConnection():
     cmd_timeout_err_code = -100
     cmd_not_executed_code = -99
@@ -149,7 +285,11 @@ class SshConnection():
                  retry=1,
                  debugmethod=None,
                  verbose=False,
-                 debug_connect=False):
+                 debug_connect=False,
+                 port=22,
+                 recv_size=32768,
+                 max_sessions=10,
+                 cache_connection=False):
         """
         :param host: -mandatory - string, hostname or ip address to establish ssh connection to
         :param username: - optional - string, username used to establish ssh session when keypath is not provided
@@ -168,6 +308,13 @@ class SshConnection():
         :param debugmethod: - method, used to handle debug msgs
         :param verbose: - optional - boolean to flag debug output on or off mainly for cmd execution
         :param debug_connect: - optional - boolean to flag debug output on or off for connection related operations
+        :param port: - optional - integer, ssh port on 'host'
+        :param recv_size: - optional - integer, max number of bytes read from a cmd() channel per recv
+        :param max_sessions: - optional - integer, max number of cmd() sessions run concurrently over this
+                             connection's transport. Should not exceed the remote sshd's 'MaxSessions'.
+        :param cache_connection: - optional - boolean, share this connection's transport through the process wide
+                                 ssh_transport_cache with other SshConnections to the same host/user/credentials.
+                                 Proxy transports are always shared through the cache.
         """
 
         self.host = host
@@ -191,8 +338,18 @@ class SshConnection():
             self.key_files = str(self.key_files).split(',')
         self.find_keys = find_keys
         self.debug_connect = debug_connect
-
-        #Used to store the last cmd attempted and it's exit code
+        self.port = port
+        self.recv_size = recv_size
+        self.max_sessions = max_sessions
+        self._session_semaphore = threading.BoundedSemaphore(max_sessions)
+        self._connection_lock = threading.RLock()
+        self._executor = None
+        self.cache_connection = cache_connection
+        self._cache_entry = None
+        self._proxy_cache_entry = None
+
+        #Used to store the last cmd attempted and it's exit code. When cmds are run concurrently
+        #these reflect whichever cmd most recently started/finished.
         self.lastcmd = ""
         self.lastexitcode = SshConnection.cmd_not_executed_code
 
@@ -225,6 +382,7 @@ class SshConnection():
                                                       proxy_password=self.proxy_password,
                                                       proxy_keypath=self.proxy_keypath,
                                                       enable_ipv6_dns=self.enable_ipv6_dns,
+                                                      port=self.port,
                                                       timeout=self.timeout,
                                                       retry=self.retry,
                                                       verbose=self.debug_connect)
@@ -253,6 +411,9 @@ class SshConnection():
         :param proxy_password: proxy password for ssh authentication
         :param proxy_keypath: local path to key used for ssh authentication
         :return: paramiko transport
+
+        The authenticated transport to the proxy host is shared through ssh_transport_cache, so only the
+        first connection through a given proxy pays for the proxy tcp/auth handshake.
         """
         proxy_host = ((proxy_host or self.proxy),port)
         dest_host = ((dest_host or self.host),port)
@@ -264,28 +425,73 @@ class SshConnection():
             key_files = key_files.split(',')
 
         #Make sure there is at least one likely way to authenticate...
-        ssh = paramiko.SSHClient()
         if (proxy_username is not None) and (key_files or self.find_keys or proxy_keypath is not None or \
                          proxy_password is not None ):
-            p_transport = paramiko.Transport(proxy_host)
-            ssh._transport = p_transport
-            p_transport.start_client()
-            if proxy_keypath:
-                priv_key = paramiko.RSAKey.from_private_key_file(proxy_keypath)
-                p_transport.auth_publickey(proxy_username,priv_key)
-            elif proxy_password:
-                p_transport.auth_password(proxy_username, proxy_password)
-            elif self.find_keys:
-                self.debug("Proxy auth -Using local keys, no keypath/password provided",
+            def connect_proxy():
+                ssh = paramiko.SSHClient()
+                p_transport = paramiko.Transport(proxy_host)
+                ssh._transport = p_transport
+                p_transport.start_client()
+                if proxy_keypath:
+                    priv_key = paramiko.RSAKey.from_private_key_file(proxy_keypath)
+                    p_transport.auth_publickey(proxy_username,priv_key)
+                elif proxy_password:
+                    p_transport.auth_password(proxy_username, proxy_password)
+                elif self.find_keys:
+                    self.debug("Proxy auth -Using local keys, no keypath/password provided",
+                               verbose=verbose)
+                    ssh._auth(proxy_username, None,None,key_files, True, True)
+                    p_transport = ssh._transport
+                return p_transport
+
+            cache_key = ('proxy', proxy_host, proxy_username, proxy_password, proxy_keypath, tuple(key_files))
+            #Drop any proxy transport held from a previous connection attempt
+            self._release_proxy_cache_entry()
+            entry = ssh_transport_cache.acquire(cache_key, connect_proxy)
+            try:
+                #forward from 127.0.0.1:<free_random_port> to |dest_host|
+                channel = entry.transport.open_channel('direct-tcpip', dest_host, ('127.0.0.1', 0))
+            except paramiko.ssh_exception.ChannelException:
+                #The proxy refused the forward to dest_host, the proxy transport itself is fine
+                ssh_transport_cache.release(entry)
+                raise
+            except Exception, e:
+                #The cached proxy transport may have gone bad, evict it and retry once on a new transport
+                self.debug("Failed to open channel on proxy transport, reconnecting to proxy. Err:" + str(e),
                            verbose=verbose)
-                ssh._auth(proxy_username, None,None,key_files, True, True)
-                p_transport = ssh._transport
-            #forward from 127.0.0.1:<free_random_port> to |dest_host|
-            channel = p_transport.open_channel('direct-tcpip', dest_host, ('127.0.0.1', 0))
+                ssh_transport_cache.evict(entry)
+                ssh_transport_cache.release(entry)
+                entry = ssh_transport_cache.acquire(cache_key, connect_proxy)
+                try:
+                    channel = entry.transport.open_channel('direct-tcpip', dest_host, ('127.0.0.1', 0))
+                except:
+                    ssh_transport_cache.release(entry)
+                    raise
+            self._proxy_cache_entry = entry
             return paramiko.Transport(channel)
         else:
             raise Exception("Need either a keypath or username+password to create ssh proxy connection")
 
+    def _release_proxy_cache_entry(self):
+        if self._proxy_cache_entry:
+            entry = self._proxy_cache_entry
+            self._proxy_cache_entry = None
+            ssh_transport_cache.release(entry)
+
+    def _release_cache_entries(self):
+        """
+        Give back this connection's references to cached transports. Returns True if this connection's own
+        transport is owned by the cache, and so should not be closed directly.
+        """
+        cached = False
+        if self._cache_entry:
+            entry = self._cache_entry
+            self._cache_entry = None
+            ssh_transport_cache.release(entry)
+            cached = True
+        self._release_proxy_cache_entry()
+        return cached
+
 
     def debug(self, msg, verbose=None):
         """
@@ -342,7 +548,8 @@ class SshConnection():
             enable_debug=False,
             cb=None, cbargs=[],
             invoke_shell=False,
-            get_pty=True):
+            get_pty=True,
+            recv_size=None):
         """ 
         Runs a command 'cmd' within an ssh connection. 
         Upon success returns dict representing outcome of the command.
@@ -368,10 +575,12 @@ class SshConnection():
                         if cb nextargs is set, the next time cb is called these args will be passed instead of cbargs
         :param cbargs: - optional - list of arguments to be appended to output buffer and passed to cb
         :param enable_debug: - optional - boolean, if set will use self.debug() to print additional messages during cmd()
+        :param recv_size: - optional - integer, max bytes to read per recv on the channel. Defaults to self.recv_size
 
         """
         if verbose is None:
             verbose = self.verbose
+        recv_size = recv_size or self.recv_size
         ret = {}
         cbfired = False
         cmd = str(cmd)
@@ -384,15 +593,12 @@ class SshConnection():
                 self.debug(msg)
         if verbose:
             self.debug("[" + self.username + "@" + str(self.host) + "]# " + cmd)
+        chan = None
+        self._session_semaphore.acquire()
         try:
-            tran = self.connection.get_transport()
-            if tran is None or not tran.active:
-                self.debug("SSH transport was None, attempting to restablish ssh to: "+str(self.host))
-                self.refresh_connection()
-                tran = self.connection.get_transport()
+            tran = self.get_active_transport()
             chan = tran.open_session()
             chan.settimeout(timeout)
-            chan.setblocking(0)
             if get_pty:
                 chan.get_pty()
             if invoke_shell:
@@ -400,111 +606,84 @@ class SshConnection():
                 chan.sendall(cmd)
             else:
                 chan.exec_command(cmd)
-            output = None
-            fd = chan.fileno()
+            # Collect rx'd chunks and join them once the channel is done, rather than
+            # re-copying the whole output buffer on every read.
+            output = []
             cmdstart = start = time.time()
-            newdebug = "\n"
-            while not chan.closed:
-                time.sleep(0.05)
-                try:
-                    rl, wl, xl = select.select([fd], [], [], timeout)
-                except select.error:
-                    break
-                elapsed = int(time.time() - start)
+            while True:
+                elapsed = time.time() - start
                 if elapsed >= timeout:
                     raise CommandTimeoutException(
                         "SSH Command timer fired after " + str(int(elapsed)) + " seconds. Cmd:'" + str(cmd) + "'")
-                if len(rl) > 0:
-                    cmddebug('ssh cmd: got input on recv channel')
-                    while chan.recv_ready():
-                        new = chan.recv(1024)
-                        if verbose:
-                            cmddebug('ssh cmd: got new data on channel:"' + str(new) + '"')
-                        if new is not None:
-                            #We have data to handle...
-                            #Run call back if there is one, let call back handle data read in
-                            if cb is not None:
-                                if enable_debug:
-                                    cbname = 'unknown'
-                                    try:
-                                        cbname = str(cb.im_func.func_code.co_name)
-                                    except: pass
-                                    self.debug('ssh cmd: sending new data to callback: ' + str(cbname))
-                                #If cb returns false break, end rx loop, return cmd outcome/output dict. 
-                                #cbreturn = SshCbReturn()
-                                cbreturn = cb(new, *cbargs)
-                                #Let the callback control whether or not to continue
-                                if cbreturn.stop:
-                                    cmddebug('ssh cmd: callback sent stop')
-                                    if cbreturn.buf:
-                                        if output is None:
-                                            output = cbreturn.buf
-                                        else:
-                                            output += cbreturn.buf
-                                    cbfired = True
-                                    chan.close()
-                                    #Let the callback dictate the return code, otherwise -1 for connection err may occur
-                                    if cbreturn.statuscode != -1:
-                                        status = cbreturn.statuscode
-                                    else:
-                                        status = self.lastexitcode = chan.recv_exit_status()
-                                    break
-                                else:
-
-                                    #Let the callback update its calling args if needed
-                                    if cbreturn.nextargs is not None:
-                                        cbargs = cbreturn.nextargs
-                                    #Let the callback update/reset the timeout if needed
-                                    if cbreturn.settimer > 0:
-                                        start = time.time()
-                                        timeout = cbreturn.settimer
-                                    #Let the callback update the output buffer to be returned
-                                    if cbreturn.buf:
-                                        cmddebug('ssh cmd: cb returned buf:"' + str(cbreturn.buf) + '"')
-                                        if output is None:
-                                            output = cbreturn.buf
-                                        else:
-                                            output += cbreturn.buf
-                                    #Change the callback to handle future output from this cmd
-                                    if cbreturn.nextcb:
-                                        cmddebug('ssh cmd: updating to new callback provided in cb return nextcb')
-                                        cb = cbreturn.nextcb
-                                    #Remove all callbacks
-                                    if cbreturn.removecb:
-                                        cmddebug('ssh cmd: removing all callbacks per cb return removecb value')
-                                        cb = None
-                                    #Send a string to the channel provided in callback (similar to expect)
-                                    if cbreturn.sendstring is not None:
-                                        if verbose:
-                                            cmddebug('Sending string:' + str(cbreturn.sendstring))
-                                        chan.send(s=str(cbreturn.sendstring))
-                                        cmddebug('channel status after sending string. Is closed = ' + str(chan.closed))
-                            else:
-                                #if no call back then append output to return dict and handle debug
-                                if output == None:
-                                    output = new
-                                else:
-                                    output += new
-                                if verbose:
-                                    #Dont print line by line output if cb is used, let cb handle that 
-                                    newdebug += new
+                # Block on the channel until data, eof, or the remaining time on the cmd timer expires
+                chan.settimeout(timeout - elapsed)
+                try:
+                    new = chan.recv(recv_size)
+                except socket.timeout:
+                    continue
+                if not new:
+                    cmddebug('ssh cmd: got eof on recv channel')
+                    break
+                if verbose:
+                    cmddebug('ssh cmd: got new data on channel:"' + str(new) + '"')
+                #We have data to handle...
+                #Run call back if there is one, let call back handle data read in
+                if cb is not None:
+                    if enable_debug:
+                        cbname = 'unknown'
+                        try:
+                            cbname = str(cb.im_func.func_code.co_name)
+                        except: pass
+                        self.debug('ssh cmd: sending new data to callback: ' + str(cbname))
+                    #If cb returns false break, end rx loop, return cmd outcome/output dict.
+                    cbreturn = cb(new, *cbargs)
+                    #Let the callback update the output buffer to be returned
+                    if cbreturn.buf:
+                        cmddebug('ssh cmd: cb returned buf:"' + str(cbreturn.buf) + '"')
+                        output.append(cbreturn.buf)
+                    #Let the callback control whether or not to continue
+                    if cbreturn.stop:
+                        cmddebug('ssh cmd: callback sent stop')
+                        cbfired = True
+                        chan.close()
+                        #Let the callback dictate the return code, otherwise -1 for connection err may occur
+                        if cbreturn.statuscode != -1:
+                            status = cbreturn.statuscode
                         else:
                             status = self.lastexitcode = chan.recv_exit_status()
-                            chan.close()
-                            break
-                    if newdebug and verbose:
-                        self.debug(str(newdebug))
-                        newdebug = ''
-                elif enable_debug:
-                    self.debug('ssh cmd: len of rl was < 0')
+                        break
+                    #Let the callback update its calling args if needed
+                    if cbreturn.nextargs is not None:
+                        cbargs = cbreturn.nextargs
+                    #Let the callback update/reset the timeout if needed
+                    if cbreturn.settimer > 0:
+                        start = time.time()
+                        timeout = cbreturn.settimer
+                    #Change the callback to handle future output from this cmd
+                    if cbreturn.nextcb:
+                        cmddebug('ssh cmd: updating to new callback provided in cb return nextcb')
+                        cb = cbreturn.nextcb
+                    #Remove all callbacks
+                    if cbreturn.removecb:
+                        cmddebug('ssh cmd: removing all callbacks per cb return removecb value')
+                        cb = None
+                    #Send a string to the channel provided in callback (similar to expect)
+                    if cbreturn.sendstring is not None:
+                        if verbose:
+                            cmddebug('Sending string:' + str(cbreturn.sendstring))
+                        chan.send(s=str(cbreturn.sendstring))
+                        cmddebug('channel status after sending string. Is closed = ' + str(chan.closed))
+                else:
+                    #if no call back then append output to return dict and handle debug
+                    output.append(new)
+                    if verbose:
+                        #Dont print line by line output if cb is used, let cb handle that
+                        self.debug(str(new))
             cmddebug('ssh cmd: channel closed')
-            if output is None:
-                output = ""
+            output = "".join(output)
             if listformat:
                 #return output as list of lines
                 output = output.splitlines()
-                if output is None:
-                    output = []
 
             #add command outcome in return dict.
             if status is None:
@@ -521,26 +700,69 @@ class SshConnection():
             elapsed = str(int(time.time() - start))
             self.debug("Command (" + cmd + ") timeout exception after " + str(elapsed) + " seconds\nException")
             raise cte
+        finally:
+            #Close the channel on eof, timeout or error so it is not left open on the shared transport
+            if chan is not None:
+                chan.close()
+            self._session_semaphore.release()
         return ret
 
+    def cmd_async(self, cmd, **kwargs):
+        """
+        Runs cmd() in a worker thread over a new channel on this connection's existing transport, so
+        many cmds can be run against this host at once without new tcp/auth handshakes. At most
+        'max_sessions' cmds will run concurrently, additional cmds are queued.
+        example:
+            futures = [ssh.cmd_async('virsh dominfo ' + str(dom)) for dom in domains]
+            for future in futures:
+                print future.result()['output']
+
+        :param cmd: - mandatory - string representing the command to be run against the remote ssh session
+        :param kwargs: - optional - keyword args passed on to cmd()
+        :return: concurrent.futures.Future, whose result() returns the cmd() dict or raises cmd()'s exception
+        """
+        with self._connection_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_sessions)
+            return self._executor.submit(self.cmd, cmd, **kwargs)
+
+    def get_active_transport(self):
+        """
+        Returns this connection's transport, re-establishing the connection first if the transport is
+        no longer active. When cmds are running concurrently only the first thread to find the transport
+        down will refresh it, the others will use the refreshed transport.
+        """
+        with self._connection_lock:
+            tran = self.connection.get_transport()
+            if tran is None or not tran.active:
+                self.debug("SSH transport was None, attempting to restablish ssh to: "+str(self.host))
+                self.refresh_connection()
+                tran = self.connection.get_transport()
+            return tran
+
     def refresh_connection(self):
         """
         Attempts to establish a new ssh connection to replace the old 'connection' of this
         ssh obj.
         """
-        if self.connection:
-            self.connection.close()
-        self.connection = self.get_ssh_connection(self.host,
-                                                  username=self.username,
-                                                  password=self.password,
-                                                  keypath=self.keypath,
-                                                  proxy_username=self.proxy_username,
-                                                  proxy_password=self.proxy_password,
-                                                  proxy_keypath=self.proxy_keypath,
-                                                  enable_ipv6_dns=self.enable_ipv6_dns,
-                                                  timeout=self.timeout,
-                                                  retry=self.retry,
-                                                  verbose=self.debug_connect)
+        with self._connection_lock:
+            if self._cache_entry:
+                #The shared transport is suspect, make sure it is not handed out again
+                ssh_transport_cache.evict(self._cache_entry)
+            if not self._release_cache_entries() and self.connection:
+                self.connection.close()
+            self.connection = self.get_ssh_connection(self.host,
+                                                      username=self.username,
+                                                      password=self.password,
+                                                      keypath=self.keypath,
+                                                      proxy_username=self.proxy_username,
+                                                      proxy_password=self.proxy_password,
+                                                      proxy_keypath=self.proxy_keypath,
+                                                      enable_ipv6_dns=self.enable_ipv6_dns,
+                                                      port=self.port,
+                                                      timeout=self.timeout,
+                                                      retry=self.retry,
+                                                      verbose=self.debug_connect)
 
     def get_ssh_connection(self,
                            hostname,
@@ -579,6 +801,61 @@ class SshConnection():
         :param port: - optional - port to connect to, default 22
         :param verbose: - optional - enable verbose debug output
         """
+        if not self.cache_connection:
+            try:
+                return self._get_ssh_connection(hostname, username=username, password=password, keypath=keypath,
+                                                proxy=proxy, proxy_username=proxy_username,
+                                                proxy_password=proxy_password, proxy_keypath=proxy_keypath,
+                                                key_files=key_files, enable_ipv6_dns=enable_ipv6_dns, port=port,
+                                                timeout=timeout, retry=retry, verbose=verbose)
+            except:
+                self._release_proxy_cache_entry()
+                raise
+        def connect():
+            return self._get_ssh_connection(hostname, username=username, password=password, keypath=keypath,
+                                            proxy=proxy, proxy_username=proxy_username,
+                                            proxy_password=proxy_password, proxy_keypath=proxy_keypath,
+                                            key_files=key_files, enable_ipv6_dns=enable_ipv6_dns, port=port,
+                                            timeout=timeout, retry=retry, verbose=verbose).get_transport()
+        cache_key = ('ssh', str(hostname).strip(), port, username, password, keypath,
+                     tuple(key_files or self.key_files or []), proxy or self.proxy, proxy_username, proxy_keypath)
+        if self._cache_entry:
+            ssh_transport_cache.release(self._cache_entry)
+            self._cache_entry = None
+        try:
+            entry = ssh_transport_cache.acquire(cache_key, connect)
+        except:
+            self._release_proxy_cache_entry()
+            raise
+        if self._proxy_cache_entry and not entry.parent:
+            #This connection created the cached transport, the entry now owns its reference to the proxy transport
+            entry.parent = self._proxy_cache_entry
+            self._proxy_cache_entry = None
+        self._release_proxy_cache_entry()
+        self._cache_entry = entry
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        ssh._transport = entry.transport
+        return ssh
+
+    def _get_ssh_connection(self,
+                            hostname,
+                            username="root",
+                            password=None,
+                            keypath=None,
+                            proxy=None,
+                            proxy_username=None,
+                            proxy_password=None,
+                            proxy_keypath=None,
+                            key_files=None,
+                            enable_ipv6_dns=None,
+                            port=22,
+                            timeout=60,
+                            retry=1,
+                            verbose=False):
+        """
+        Creates a new paramiko ssh session to hostname, see get_ssh_connection()
+        """
         connected = False
         iplist = []
         ip = None
@@ -632,7 +909,7 @@ class SshConnection():
                 if proxy_transport:
                     ssh._transport = proxy_transport
                 else:
-                    ssh._transport = paramiko.Transport(ip)
+                    ssh._transport = paramiko.Transport((ip, port))
                 ssh._transport.start_client()
                 ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
                 try:
@@ -919,7 +1196,11 @@ class SshConnection():
 
 
     def close(self):
-        self.connection.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if not self._release_cache_entries():
+            self.connection.close()
 
 
 class CommandExitCodeException(Exception):
@@ -30,7 +30,7 @@
 #
 # Author: vic.iglesias@eucalyptus.com
 
-import time
+from eutester.euwaiter import EuWaiter
 
 class TaggedResource():
     def __init__(self):
@@ -42,11 +42,8 @@ class TaggedResource():
         self.wait_for_tags(tags, timeout=timeout)
 
     def wait_for_tags(self, tags, creation=True, timeout=60):
-        start= time.time()
-        elapsed = 0
-        while elapsed < timeout:
-            self.update()
-            applied_tags =  self.convert_tag_list_to_dict(self.tester.ec2.get_all_tags(filters={u'resource_id':self.id}))
+        def tags_applied(resource):
+            applied_tags = self.convert_tag_list_to_dict(self.tester.ec2.get_all_tags(filters={u'resource_id':self.id}))
             self.tester.debug("Current tags: " + str(applied_tags))
             found_keys = 0
             for key, value in tags.iteritems():
@@ -54,18 +51,14 @@ class TaggedResource():
                     found_keys += 1
                     self.tester.debug("Found key # " + str(found_keys)  + " out of " + str(len(tags))  + ":" + key)
             if creation:
-                if found_keys == len(tags):
-                    return True
-                else:
-                    pass
+                return found_keys == len(tags)
             else:
-                if found_keys == 0:
-                    return True
-                else:
-                    pass
-            elapsed = int(time.time() - start)
-            time.sleep(5)
-        raise Exception("Did not apply tags within " + str(timeout) + " seconds")
+                return found_keys == 0
+        waiter = EuWaiter(self.tester, timeout=timeout, max_poll_interval=5)
+        waiter.add(self, tags_applied)
+        if not waiter.wait(raise_on_failure=False):
+            raise Exception("Did not apply tags within " + str(timeout) + " seconds")
+        return True
 
     def convert_tag_list_to_dict(self, list):
         new_dict = {}
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009-2011, Eucalyptus Systems, Inc.
+# All rights reserved.
+#
+# Redistribution and use of this software in source and binary forms, with or
+# without modification, are permitted provided that the following conditions
+# are met:
+#
+#   Redistributions of source code must retain the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer in the documentation and/or other
+#   materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+import logging
+import threading
+import time
+import unittest
+import boto
+from boto.ec2.regioninfo import RegionInfo
+from boto.exception import BotoServerError
+import eucaops
+from eucaops.ec2ops import EC2ops
+from eutester.cleanupengine import CleanupEngine
+try:
+    from moto.core.responses import BaseResponse
+    from moto.server import create_backend_app
+    from werkzeug.serving import make_server
+except ImportError:
+    make_server = None
+
+
+class CleanupTester():
+    '''
+    Minimal stand in for the Eucaops obj the engine cleans up after
+    '''
+    get_poll_intervals = EC2ops.__dict__['get_poll_intervals']
+
+    def __init__(self, ec2):
+        self.ec2 = ec2
+        self.test_resources = {}
+
+    def debug(self, msg):
+        pass
+
+
+class RecordingEngine(CleanupEngine):
+    '''
+    Records when each stage starts/ends and when each item's deletion is sent
+    '''
+    def __init__(self, *args, **kwargs):
+        CleanupEngine.__init__(self, *args, **kwargs)
+        self.events = []
+        self.lock = threading.Lock()
+
+    def record(self, *event):
+        with self.lock:
+            self.events.append((time.time(),) + event)
+
+    def run_stage(self, stage):
+        self.record('stage start', stage.name)
+        try:
+            return CleanupEngine.run_stage(self, stage)
+        finally:
+            self.record('stage end', stage.name)
+
+    def delete_item(self, key, item):
+        self.record('delete', key)
+        return CleanupEngine.delete_item(self, key, item)
+
+
+class FailingResource():
+    def __init__(self, status):
+        self.status = status
+
+    def delete(self):
+        raise BotoServerError(self.status, 'Failing', body='<Error><Code>Failing</Code></Error>')
+
+
+@unittest.skipIf(make_server is None, 'moto is not installed')
+class CleanupEngineTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        # Requests to 127.0.0.1 carry no region, serve them all from one region's backend
+        BaseResponse.get_region_from_url = lambda self, request, url: 'us-east-1'
+        cls.server = make_server('127.0.0.1', 0, create_backend_app('ec2'), threaded=True)
+        thread = threading.Thread(target=cls.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        self.ec2 = boto.connect_ec2('access', 'secret', is_secure=False, port=self.server.server_port,
+                                    region=RegionInfo(name='us-east-1', endpoint='127.0.0.1'))
+        self.tester = CleanupTester(self.ec2)
+
+    def create_resources(self):
+        ec2 = self.ec2
+        reservation = ec2.run_instances('ami-12c6146b', min_count=2, max_count=2)
+        volume = ec2.create_volume(1, 'us-east-1a')
+        attached = ec2.create_volume(1, 'us-east-1a')
+        ec2.attach_volume(attached.id, reservation.instances[0].id, '/dev/sdf')
+        snapshot = ec2.create_snapshot(volume.id)
+        name = 'cleanup-' + str(int(time.time() * 1000))
+        self.tester.test_resources = {'reservations': [reservation],
+                                      'volumes': [volume, attached],
+                                      'snapshots': [snapshot],
+                                      'addresses': [ec2.allocate_address()],
+                                      'keypairs': [ec2.create_key_pair(name)],
+                                      'security-groups': [ec2.create_security_group(name, 'cleanup test')],
+                                      'images': [],
+                                      'auto-scaling-groups': []}
+        return reservation, volume, attached, snapshot
+
+    def test_cleanup_stage_order(self):
+        reservation, volume, attached, snapshot = self.create_resources()
+        engine = RecordingEngine(self.tester, max_workers=4, timeout=30, poll_interval=1)
+        stages = engine.run()
+        self.assertEqual([stage.name for stage in stages], [name for name, keys in CleanupEngine.stage_order])
+        self.assertEqual(engine.get_leftovers(), [])
+        for key, items in self.tester.test_resources.iteritems():
+            self.assertEqual(items, [], 'left in test_resources:' + str(key))
+        # Every deletion happened within its own stage, and each stage ran after the previous one ended
+        stage_keys = dict((stage.name, stage.resource_keys) for stage in stages)
+        current = None
+        last_end = 0
+        for when, event, name in sorted(engine.events):
+            if event == 'stage start':
+                self.assertTrue(when >= last_end)
+                current = name
+            elif event == 'stage end':
+                last_end = when
+                current = None
+            else:
+                self.assertTrue(name in stage_keys[current], str(name) + ' deleted in stage ' + str(current))
+        # Resources which go away asynchronously were waited on
+        states = [instance.state for res in self.ec2.get_all_instances(
+                  instance_ids=[instance.id for instance in reservation.instances]) for instance in res.instances]
+        self.assertEqual(set(states), set(['terminated']))
+        self.assertEqual(self.ec2.get_all_volumes(filters={'volume-id': [volume.id, attached.id]}), [])
+        self.assertEqual(self.ec2.get_all_snapshots(filters={'snapshot-id': [snapshot.id]}), [])
+
+    def test_already_deleted_and_failed_resources(self):
+        gone = self.ec2.create_volume(1, 'us-east-1a')
+        gone.delete()
+        failing = FailingResource(500)
+        missing = FailingResource(404)
+        self.tester.test_resources = {'volumes': [gone], 'other': [failing, missing]}
+        engine = CleanupEngine(self.tester, max_workers=2, timeout=10, poll_interval=1)
+        engine.run()
+        # Resources which no longer exist count as deleted, other errors are left over
+        self.assertEqual(self.tester.test_resources, {'volumes': [], 'other': [failing]})
+        leftovers = engine.get_leftovers()
+        self.assertEqual(len(leftovers), 1)
+        self.assertEqual(leftovers[0][:3], ('groups/keys/other', 'other', failing))
+
+
+class CleanupStagesTest(unittest.TestCase):
+    def test_stages_cover_unknown_and_skipped_keys(self):
+        tester = CleanupTester(None)
+        tester.test_resources = {'volumes': [], 'snapshots': [], 'custom': [], 'another': []}
+        stages = CleanupEngine(tester, skip_keys=['snapshots', 'another']).get_stages()
+        self.assertEqual(stages[-1].resource_keys, ['security-groups', 'keypairs', 'custom'])
+        self.assertEqual([stage.resource_keys for stage in stages if stage.name == 'snapshots'], [[]])
+
+
+if __name__ == "__main__":
+    unittest.main()
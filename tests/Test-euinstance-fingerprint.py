@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009-2011, Eucalyptus Systems, Inc.
+# All rights reserved.
+#
+# Redistribution and use of this software in source and binary forms, with or
+# without modification, are permitted provided that the following conditions
+# are met:
+#
+#   Redistributions of source code must retain the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer in the documentation and/or other
+#   materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+import logging
+import threading
+import time
+import unittest
+import boto
+from boto.ec2.regioninfo import RegionInfo
+import eucaops
+from eucaops.ec2ops import EC2ops
+from eutester.euinstance import EuInstance
+from eutester.euvolume import EuVolume
+try:
+    from moto.core.responses import BaseResponse
+    from moto.server import create_backend_app
+    from werkzeug.serving import make_server
+except ImportError:
+    make_server = None
+
+
+class FingerprintTest(unittest.TestCase):
+    def test_blocks_are_pinned(self):
+        # Fingerprints are stored in tags and verified later from other hosts, these must never change
+        self.assertEqual(EuInstance.get_fingerprint_blocks(16777216, blocks=8, blocksize=65536),
+                         [0, 3, 44, 77, 123, 149, 187, 202, 228, 255])
+        blocks = EuInstance.get_fingerprint_blocks(10 * 1073741824)
+        self.assertEqual(blocks[:8], [0, 1931, 2824, 5978, 10018, 11416, 14138, 17013])
+        self.assertEqual(blocks[-3:], [159056, 163328, 163839])
+
+    def test_blocks_cover_device(self):
+        blocks = EuInstance.get_fingerprint_blocks(1073741824, blocks=64, blocksize=65536)
+        self.assertEqual(blocks[0], 0)
+        self.assertEqual(blocks[-1], 1073741824 / 65536 - 1)
+        self.assertTrue(len(blocks) >= 64)
+        self.assertEqual(EuInstance.get_fingerprint_blocks(131072, blocks=64, blocksize=65536), [0, 1])
+        self.assertRaises(Exception, EuInstance.get_fingerprint_blocks, 1024, 64, 65536)
+
+    def test_parse_fingerprint(self):
+        parsed = EuInstance.parse_fingerprint('fp1:16777216:64:65536:6b89d540cfb78ad820498e7c99495373')
+        self.assertEqual(parsed, {'size': 16777216, 'blocks': 64, 'blocksize': 65536,
+                                  'digest': '6b89d540cfb78ad820498e7c99495373'})
+        self.assertRaises(Exception, EuInstance.parse_fingerprint, 'fp2:1:2:3:abc')
+        self.assertRaises(Exception, EuInstance.parse_fingerprint, 'garbage')
+
+
+class FakeInstance():
+    '''
+    Runs EuInstance's volume write paths with the guest commands stubbed out
+    '''
+    id = 'i-fake'
+    random_fill_volume = EuInstance.__dict__['random_fill_volume']
+    write_and_md5_euvolumes = EuInstance.__dict__['write_and_md5_euvolumes']
+    run_euvolume_pipeline = EuInstance.__dict__['run_euvolume_pipeline']
+    print_euvolume_pipeline_summary = EuInstance.__dict__['print_euvolume_pipeline_summary']
+    get_dd_block_size = EuInstance.__dict__['get_dd_block_size']
+
+    def __init__(self, volumes):
+        self.attached_vols = volumes
+        self._guest_block_devices = {'devices': {}}
+
+    def debug(self, msg):
+        pass
+
+    def assertFilePresent(self, path):
+        pass
+
+    def found(self, cmd, regex):
+        return True
+
+    def get_dd_features(self):
+        return {'bytes': False, 'fullblock': True}
+
+    def dd_monitor(self, **kwargs):
+        return {'dd_bytes': 1024}
+
+    def sys(self, script, **kwargs):
+        out = []
+        for volume in self.attached_vols:
+            out.append('EUVOLRESULT ' + volume.guestdev + ' written 1024 1.0 2.0 3.0 d41d8cd98f00b204e9800998ecf8427e')
+        return out + ['EUVOLDONE 1.0 3.0']
+
+
+class SnapshotTester():
+    poll_count = 1
+    create_snapshots = EC2ops.__dict__['create_snapshots']
+
+    def __init__(self, ec2):
+        self.ec2 = ec2
+
+    def debug(self, msg, *args, **kwargs):
+        pass
+
+
+@unittest.skipIf(make_server is None, 'moto is not installed')
+class WriteAfterFingerprintTest(unittest.TestCase):
+    fingerprint = 'fp1:1073741824:64:65536:6b89d540cfb78ad820498e7c99495373'
+
+    @classmethod
+    def setUpClass(cls):
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        # Requests to 127.0.0.1 carry no region, serve them all from one region's backend
+        BaseResponse.get_region_from_url = lambda self, request, url: 'us-east-1'
+        cls.server = make_server('127.0.0.1', 0, create_backend_app('ec2'), threaded=True)
+        thread = threading.Thread(target=cls.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        self.ec2 = boto.connect_ec2('access', 'secret', is_secure=False, port=self.server.server_port,
+                                    region=RegionInfo(name='us-east-1', endpoint='127.0.0.1'))
+        self.tester = SnapshotTester(self.ec2)
+        self.volume = EuVolume.make_euvol_from_vol(self.ec2.create_volume(1, 'us-east-1a'), tester=self.tester,
+                                                   cmdstart=time.time())
+        self.volume.guestdev = '/dev/vdb'
+        self.volume.set_fingerprint(self.fingerprint)
+        self.instance = FakeInstance([self.volume])
+
+    def get_tags(self):
+        return self.ec2.get_all_volumes(volume_ids=[self.volume.id])[0].tags
+
+    def assert_fingerprint_cleared(self):
+        self.assertEqual(self.volume.fingerprint, None)
+        self.assertEqual(self.volume.get_current_fingerprint(), None)
+        self.assertFalse(EuVolume.tag_fingerprint_key in self.get_tags())
+        self.assertEqual(self.instance._guest_block_devices, None)
+        # update() must not put the old fingerprint back
+        self.volume.update_eutest_status()
+        self.assertFalse(EuVolume.tag_fingerprint_key in self.get_tags())
+        snapshot = self.tester.create_snapshots(self.volume, monitor_to_completed=False)[0]
+        self.assertEqual(snapshot.eutest_volume_fingerprint, None)
+        self.assertFalse(EuVolume.tag_fingerprint_key in snapshot.tags)
+
+    def test_fingerprint_copied_to_snapshot(self):
+        self.assertEqual(self.get_tags()[EuVolume.tag_fingerprint_key], self.fingerprint)
+        snapshot = self.tester.create_snapshots(self.volume, monitor_to_completed=False)[0]
+        self.assertEqual(snapshot.eutest_volume_fingerprint, self.fingerprint)
+
+    def test_pipeline_write_clears_fingerprint(self):
+        self.instance.write_and_md5_euvolumes(length=1024)
+        self.assert_fingerprint_cleared()
+
+    def test_random_fill_clears_fingerprint(self):
+        self.instance.random_fill_volume(self.volume, length=1024)
+        self.assert_fingerprint_cleared()
+
+    def test_stale_fingerprint_not_copied(self):
+        # A fingerprint recorded before the last write is not copied, even if the attribute was set again
+        self.volume.clear_fingerprint()
+        self.volume.fingerprint = self.fingerprint
+        self.assertEqual(self.volume.get_current_fingerprint(), None)
+        snapshot = self.tester.create_snapshots(self.volume, monitor_to_completed=False)[0]
+        self.assertEqual(snapshot.eutest_volume_fingerprint, None)
+        # Re-fingerprinting after the write makes it current again
+        self.volume.set_fingerprint(self.fingerprint)
+        self.assertEqual(self.volume.get_current_fingerprint(), self.fingerprint)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009-2011, Eucalyptus Systems, Inc.
+# All rights reserved.
+#
+# Redistribution and use of this software in source and binary forms, with or
+# without modification, are permitted provided that the following conditions
+# are met:
+#
+#   Redistributions of source code must retain the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer in the documentation and/or other
+#   materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+import os
+import time
+import unittest
+from eutester.process_manager import ProcessManager, ProcessTaskError
+
+
+def sleep_and_return(seconds, value):
+    time.sleep(seconds)
+    return value
+
+
+def raise_error(msg):
+    raise ValueError(msg)
+
+
+def exit_worker():
+    os._exit(1)
+
+
+class ProcessManagerPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.manager = ProcessManager()
+        self.manager.start_pool(workers=3)
+
+    def tearDown(self):
+        self.manager.shutdown_pool(wait=False)
+
+    def test_as_completed_order(self):
+        for seconds, value in [(0.9, 'slow'), (0.1, 'fast'), (0.5, 'mid')]:
+            self.manager.submit(sleep_and_return, seconds, value)
+        self.assertEqual([task.result() for task in self.manager.as_completed(timeout=10)], ['fast', 'mid', 'slow'])
+
+    def test_results_in_submit_order(self):
+        # More tasks than workers, queued tasks are dispatched as workers free up
+        for x in xrange(7):
+            self.manager.submit(sleep_and_return, 0.05 * (7 - x), x)
+        self.assertEqual(self.manager.get_all_task_results(timeout=10), range(7))
+
+    def test_task_timeout_replaces_worker(self):
+        slow = self.manager.submit(sleep_and_return, 30, 'slow', timeout=0.5)
+        start = time.time()
+        try:
+            self.manager.wait_for_task(slow, timeout=10)
+            self.fail('Expected the task to time out')
+        except ProcessTaskError, e:
+            self.assertTrue('timed out' in str(e))
+        self.assertTrue(time.time() - start < 5)
+        self.assertEqual(len([worker for worker in self.manager.workers if worker['process'].is_alive()]), 3)
+        self.assertEqual(self.manager.wait_for_task(self.manager.submit(sleep_and_return, 0, 'ok'), timeout=10),
+                         'ok')
+
+    def test_worker_death(self):
+        dead = self.manager.submit(exit_worker)
+        ok = self.manager.submit(sleep_and_return, 0.2, 'ok')
+        tasks = dict((task.id, task) for task in self.manager.as_completed(timeout=10))
+        self.assertRaises(ProcessTaskError, tasks[dead].result)
+        self.assertTrue('worker process exited' in str(tasks[dead].error))
+        self.assertEqual(tasks[ok].result(), 'ok')
+        # The dead worker was replaced and the pool keeps working
+        self.assertEqual(self.manager.get_all_task_results(timeout=10), [])
+        self.manager.submit(sleep_and_return, 0, 1)
+        self.manager.submit(sleep_and_return, 0, 2)
+        self.manager.submit(sleep_and_return, 0, 3)
+        self.assertEqual(self.manager.get_all_task_results(timeout=10), [1, 2, 3])
+
+    def test_remote_error_traceback(self):
+        task_id = self.manager.submit(raise_error, 'remote failure')
+        try:
+            self.manager.wait_for_task(task_id, timeout=10)
+            self.fail('Expected the remote error to be raised')
+        except ProcessTaskError, e:
+            self.assertTrue('ValueError: remote failure' in str(e))
+            self.assertTrue('raise_error' in e.remote_traceback)
+
+    def test_as_completed_timeout(self):
+        self.manager.submit(sleep_and_return, 30, 'slow')
+        completed = self.manager.as_completed(timeout=0.5)
+        self.assertRaises(ProcessTaskError, list, completed)
+
+
+if __name__ == "__main__":
+    unittest.main()
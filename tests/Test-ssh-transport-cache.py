@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009-2011, Eucalyptus Systems, Inc.
+# All rights reserved.
+#
+# Redistribution and use of this software in source and binary forms, with or
+# without modification, are permitted provided that the following conditions
+# are met:
+#
+#   Redistributions of source code must retain the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer in the documentation and/or other
+#   materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+import threading
+import time
+import unittest
+import eucaops
+from eutester.sshconnection import SshTransportCache
+
+
+class FakeTransport():
+    def __init__(self):
+        self.active = True
+        self.closed = False
+        self.can_send = True
+
+    def is_active(self):
+        return self.active and not self.closed
+
+    def send_ignore(self):
+        if not self.can_send:
+            raise EOFError('socket closed')
+
+    def close(self):
+        self.closed = True
+
+
+class SshTransportCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = SshTransportCache(idle_timeout=300)
+        self.created = []
+
+    def connect(self):
+        transport = FakeTransport()
+        self.created.append(transport)
+        return transport
+
+    def test_shared_transport_refcount(self):
+        first = self.cache.acquire(('host', 22, 'root'), self.connect)
+        second = self.cache.acquire(('host', 22, 'root'), self.connect)
+        other = self.cache.acquire(('other', 22, 'root'), self.connect)
+        self.assertTrue(first is second)
+        self.assertFalse(first is other)
+        self.assertEqual(first.refcount, 2)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+        self.cache.release(second)
+        self.cache.release(first)
+        self.assertEqual(first.refcount, 0)
+        # Unreferenced transports stay cached until idle
+        self.assertFalse(first.transport.closed)
+        self.assertTrue(self.cache.acquire(('host', 22, 'root'), self.connect) is first)
+        self.assertEqual(len(self.created), 2)
+
+    def test_unhealthy_transport_replaced(self):
+        entry = self.cache.acquire('key', self.connect)
+        entry.transport.can_send = False
+        replacement = self.cache.acquire('key', self.connect)
+        self.assertFalse(replacement is entry)
+        self.assertTrue(entry.evicted)
+        # Still referenced, so only closed once released
+        self.assertFalse(entry.transport.closed)
+        self.cache.release(entry)
+        self.assertTrue(entry.transport.closed)
+        self.assertFalse(replacement.transport.closed)
+
+    def test_evict_idle(self):
+        self.cache.idle_timeout = 0.1
+        idle = self.cache.acquire('idle', self.connect)
+        busy = self.cache.acquire('busy', self.connect)
+        inactive = self.cache.acquire('inactive', self.connect)
+        self.cache.release(idle)
+        self.cache.release(inactive)
+        inactive.last_used = time.time() + 60
+        inactive.transport.active = False
+        time.sleep(0.2)
+        self.cache.evict_idle()
+        self.assertTrue(idle.evicted and idle.transport.closed)
+        self.assertTrue(inactive.evicted and inactive.transport.closed)
+        self.assertFalse(busy.evicted or busy.transport.closed)
+        self.cache.clear()
+        self.assertTrue(busy.evicted)
+        self.assertFalse(busy.transport.closed)
+        self.cache.release(busy)
+        self.assertTrue(busy.transport.closed)
+
+    def test_parent_released_on_close(self):
+        proxy = self.cache.acquire('proxy', self.connect)
+        child = self.cache.acquire('child', self.connect)
+        # As SshConnection does, the child entry takes over the reference to the proxy it was tunneled through
+        child.parent = proxy
+        self.cache.evict(proxy)
+        # The proxy transport stays open while the child tunneled through it is open
+        self.assertFalse(proxy.transport.closed)
+        self.cache.release(child)
+        self.cache.evict(child)
+        self.assertTrue(child.transport.closed)
+        self.assertTrue(proxy.transport.closed)
+        self.assertEqual(proxy.refcount, 0)
+
+    def test_concurrent_acquire_connects_once(self):
+        def slow_connect():
+            time.sleep(0.2)
+            return self.connect()
+        entries = []
+        def acquire():
+            entries.append(self.cache.acquire('key', slow_connect))
+        threads = [threading.Thread(target=acquire) for x in xrange(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(len(set(id(entry) for entry in entries)), 1)
+        self.assertEqual(entries[0].refcount, 5)
+        self.assertEqual((self.cache.hits, self.cache.misses), (4, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
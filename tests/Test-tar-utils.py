@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009-2011, Eucalyptus Systems, Inc.
+# All rights reserved.
+#
+# Redistribution and use of this software in source and binary forms, with or
+# without modification, are permitted provided that the following conditions
+# are met:
+#
+#   Redistributions of source code must retain the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer in the documentation and/or other
+#   materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+import BaseHTTPServer
+import SocketServer
+import json
+import os
+import re
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'toolbox'))
+from tar_utils import Http_Tarutils
+
+
+class RangeHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    '''
+    Serves the server's 'data' with Range and ETag support, recording each range requested. If the server's 'fail_after' is set, responses are
+    cut off after that many bytes to simulate a dropped download.
+    '''
+    def do_GET(self):
+        data = self.server.data
+        start, end = 0, len(data) - 1
+        match = re.match('bytes=(\d+)-(\d+)', self.headers.get('Range', ''))
+        if match:
+            start, end = int(match.group(1)), min(int(match.group(2)), len(data) - 1)
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, end, len(data)))
+            self.server.ranges.append((start, end))
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str((end + 1) - start))
+        self.send_header('ETag', '"test-etag"')
+        self.end_headers()
+        body = data[start:end + 1]
+        if self.server.fail_after is not None:
+            body = body[:self.server.fail_after]
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class RangeServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class HttpTarutilsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        tarpath = os.path.join(self.tmpdir, 'test.tar')
+        tar = tarfile.open(tarpath, 'w')
+        for index, size in enumerate([10, 70000, 300000, 5]):
+            path = os.path.join(self.tmpdir, 'member%d' % index)
+            with open(path, 'wb') as f:
+                f.write(os.urandom(size))
+            tar.add(path, arcname='member%d' % index)
+        tar.close()
+        with open(tarpath, 'rb') as f:
+            data = f.read()
+        self.server = RangeServer(('127.0.0.1', 0), RangeHandler)
+        self.server.data = data
+        self.server.ranges = []
+        self.server.fail_after = None
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.url = 'http://127.0.0.1:%d/test.tar' % self.server.server_address[1]
+        self.orig_index_dir = Http_Tarutils.index_dir
+        Http_Tarutils.index_dir = os.path.join(self.tmpdir, 'index')
+
+    def tearDown(self):
+        Http_Tarutils.index_dir = self.orig_index_dir
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    def get_tarutils(self):
+        tarutils = Http_Tarutils(self.url, verbose=False)
+        tarutils.min_segment_size = 16 * 1024
+        return tarutils
+
+    def test_members_and_index(self):
+        tarutils = self.get_tarutils()
+        names = [member.name for member in tarutils.members]
+        self.assertEqual(names, ['member0', 'member1', 'member2', 'member3'])
+        tarutils.save_member_index()
+        self.server.ranges = []
+        indexed = self.get_tarutils()
+        self.assertEqual([member.name for member in indexed.members], names)
+        self.assertEqual([member.offset_data for member in indexed.members],
+                         [member.offset_data for member in tarutils.members])
+        # Headers came from the index, not from range requests
+        self.assertEqual(self.server.ranges, [])
+
+    def test_segmented_download(self):
+        tarutils = self.get_tarutils()
+        destfile = os.path.join(self.tmpdir, 'out', 'download')
+        self.server.ranges = []
+        downloaded = tarutils.download_http_segmented(self.url, destfile=destfile, segments=4, readsize=4096)
+        self.assertEqual(downloaded.read(), self.server.data)
+        downloaded.close()
+        self.assertFalse(os.path.exists(destfile + '.segments'))
+        self.assertEqual(len(self.server.ranges), 4)
+
+    def test_interrupted_download_resumes(self):
+        tarutils = self.get_tarutils()
+        destfile = os.path.join(self.tmpdir, 'out', 'download')
+        self.server.fail_after = 20000
+        self.assertRaises(Exception, tarutils.download_http_segmented, self.url, destfile=destfile,
+                          segments=4, readsize=4096)
+        with open(destfile + '.segments') as f:
+            state = json.load(f)
+        # Every byte the statefile claims must really be on disk
+        with open(destfile, 'rb') as f:
+            written = f.read()
+        for seg_start, seg_end, done in state['segments']:
+            self.assertTrue(0 < done < (seg_end + 1) - seg_start)
+            self.assertEqual(written[seg_start:seg_start + done], self.server.data[seg_start:seg_start + done])
+        self.server.fail_after = None
+        self.server.ranges = []
+        downloaded = tarutils.download_http_segmented(self.url, destfile=destfile, segments=4, readsize=4096)
+        self.assertEqual(downloaded.read(), self.server.data)
+        downloaded.close()
+        # Each segment resumed from where its saved progress left off
+        self.assertEqual(sorted(start for start, end in self.server.ranges),
+                         sorted(seg_start + done for seg_start, seg_end, done in state['segments']))
+
+
+if __name__ == "__main__":
+    unittest.main()
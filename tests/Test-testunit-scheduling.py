@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009-2011, Eucalyptus Systems, Inc.
+# All rights reserved.
+#
+# Redistribution and use of this software in source and binary forms, with or
+# without modification, are permitted provided that the following conditions
+# are met:
+#
+#   Redistributions of source code must retain the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above
+#   copyright notice, this list of conditions and the
+#   following disclaimer in the documentation and/or other
+#   materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+import threading
+import time
+import unittest
+import eucaops
+from eutester.eutestcase import EutesterTestCase, EutesterTestResult
+
+
+class TestUnitSchedulingTest(unittest.TestCase):
+    def setUp(self):
+        self.testcase = EutesterTestCase(name='scheduling', debugmethod=lambda *args, **kwargs: None)
+        self.testcase.args.html_anchors = False
+        self.events = []
+        self.lock = threading.Lock()
+
+    def unit(self, name, seconds=0.1, fail=False):
+        with self.lock:
+            self.events.append((time.time(), 'start', name))
+        print 'output of ' + str(name)
+        time.sleep(seconds)
+        with self.lock:
+            self.events.append((time.time(), 'end', name))
+        if fail:
+            raise Exception('unit ' + str(name) + ' failed')
+
+    def make_unit(self, name, seconds=0.1, fail=False, **kwargs):
+        testunit = self.testcase.create_testunit_from_method(self.unit, name=name, seconds=seconds, fail=fail,
+                                                             autoarg=False, **kwargs)
+        testunit.name = name
+        return testunit
+
+    def get_times(self, name):
+        times = dict(((event, unit_name), when) for when, event, unit_name in self.events)
+        return times[('start', name)], times[('end', name)]
+
+    def overlaps(self, name1, name2):
+        start1, end1 = self.get_times(name1)
+        start2, end2 = self.get_times(name2)
+        return start1 < end2 and start2 < end1
+
+    def get_max_running(self):
+        running = max_running = 0
+        for when, event, name in sorted(self.events):
+            running += 1 if event == 'start' else -1
+            max_running = max(max_running, running)
+        return max_running
+
+    def test_dependencies(self):
+        a = self.make_unit('a', seconds=0.3)
+        b = self.make_unit('b', depends_on=[a])
+        c = self.make_unit('c')
+        d = self.make_unit('d', depends_on=['b', 'c'])
+        ran = self.testcase.run_test_units_concurrently([d, b, a, c], max_workers=4)
+        self.assertEqual([test.name for test in ran], ['a', 'c', 'b', 'd'])
+        self.assertTrue(self.get_times('b')[0] >= self.get_times('a')[1])
+        self.assertTrue(self.get_times('d')[0] >= max(self.get_times('b')[1], self.get_times('c')[1]))
+        # Units without dependencies between them still run together
+        self.assertTrue(self.overlaps('a', 'c'))
+        for test in ran:
+            self.assertEqual(test.result, EutesterTestResult.passed)
+
+    def test_failed_dependency_not_run(self):
+        a = self.make_unit('a', fail=True)
+        b = self.make_unit('b', depends_on=[a])
+        c = self.make_unit('c', depends_on=['b'])
+        e = self.make_unit('e')
+        ran = self.testcase.run_test_units_concurrently([a, b, c, e])
+        self.assertEqual([test.name for test in ran], ['a', 'e'])
+        self.assertEqual(a.result, EutesterTestResult.failed)
+        self.assertEqual(b.result, EutesterTestResult.not_run)
+        self.assertEqual(c.result, EutesterTestResult.not_run)
+        self.assertTrue('a' in b.error and 'b' in c.error)
+
+    def test_resource_groups(self):
+        x = self.make_unit('x', seconds=0.2, resource_groups=['zone1'])
+        y = self.make_unit('y', seconds=0.2, resource_groups=['zone1', 'zone2'])
+        z = self.make_unit('z', seconds=0.2, resource_groups=['zone2'])
+        w = self.make_unit('w', seconds=0.2)
+        self.testcase.run_test_units_concurrently([x, y, z, w], max_workers=4)
+        self.assertFalse(self.overlaps('x', 'y'))
+        self.assertFalse(self.overlaps('y', 'z'))
+        self.assertTrue(self.overlaps('x', 'z'))
+        self.assertTrue(self.overlaps('x', 'w'))
+
+    def test_max_workers(self):
+        units = [self.make_unit('unit' + str(x), seconds=0.1) for x in xrange(6)]
+        ran = self.testcase.run_test_units_concurrently(units, max_workers=2)
+        self.assertEqual(ran, units)
+        self.assertEqual(self.get_max_running(), 2)
+
+    def test_eof_failure_stops_new_units(self):
+        a = self.make_unit('a', seconds=0.1, fail=True, eof=True)
+        b = self.make_unit('b', seconds=0.3)
+        c = self.make_unit('c')
+        self.assertRaises(Exception, self.testcase.run_test_units_concurrently, [a, b, c], max_workers=2)
+        # b was already running and finished, c was never started
+        self.assertEqual(b.result, EutesterTestResult.passed)
+        self.assertEqual(c.result, EutesterTestResult.not_run)
+        self.assertFalse([name for when, event, name in self.events if name == 'c'])
+
+    def test_circular_dependencies(self):
+        a = self.make_unit('a', depends_on=['b'])
+        b = self.make_unit('b', depends_on=['a'])
+        c = self.make_unit('c')
+        ran = self.testcase.run_test_units_concurrently([a, b, c])
+        self.assertEqual(ran, [c])
+        self.assertEqual(a.error, 'Circular testunit dependencies')
+        self.assertEqual(b.error, 'Circular testunit dependencies')
+
+    def test_output_kept_per_unit(self):
+        units = [self.make_unit('unit' + str(x), seconds=0.1) for x in xrange(3)]
+        self.testcase.run_test_units_concurrently(units, max_workers=3)
+        for testunit in units:
+            self.assertTrue('output of ' + testunit.name in testunit.output)
+            for other in units:
+                if other is not testunit:
+                    self.assertFalse('output of ' + other.name in testunit.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
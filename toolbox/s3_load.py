@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+'''
+Runs the S3ops load generator (see eutester/s3load.py) against an S3 endpoint and prints
+throughput plus p50/p95/p99 latency per operation.
+
+Works against a local S3 stand-in as well as walrus/s3, ie with moto:
+    moto_server s3 -p 5000 &
+    python toolbox/s3_load.py --endpoint 127.0.0.1 --port 5000 --access-key a --secret-key b \
+        --workers 16 --duration 30 --mix put=30,get=50,head=10,delete=5,list=5
+
+example usage against a cloud (from the top of the eutester tree):
+    python toolbox/s3_load.py --credpath ~/.euca --workers 32 --object-size 65536
+'''
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from eucaops.s3ops import S3ops
+
+
+def parse_mix(mix):
+    weights = {}
+    for item in mix.split(','):
+        op, weight = item.split('=')
+        weights[op.strip().lower()] = float(weight)
+    return weights
+
+
+def parse_size(size):
+    if '-' in size:
+        low, high = size.split('-')
+        return (int(low), int(high))
+    return int(size)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='S3 object load generator')
+    parser.add_argument('--credpath', default=None, help='path to cloud credentials, used if no endpoint is given')
+    parser.add_argument('--endpoint', default=None, help='S3 host, defaults to the S3_URL in the credentials')
+    parser.add_argument('--port', type=int, default=8773)
+    parser.add_argument('--path', default=None,
+                        help='S3 service path, defaults to / with --endpoint and /services/Walrus otherwise')
+    parser.add_argument('--access-key', default=None)
+    parser.add_argument('--secret-key', default=None)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=60, help='seconds to run the load for')
+    parser.add_argument('--operations', type=int, default=None, help='stop after this many operations')
+    parser.add_argument('--buckets', type=int, default=2)
+    parser.add_argument('--keys-per-bucket', type=int, default=100)
+    parser.add_argument('--object-size', default='1024', help='bytes per put, or a min-max range ie 1024-65536')
+    parser.add_argument('--mix', default='put=1,get=1,head=1,delete=1,list=1',
+                        help='comma separated operation=weight list')
+    parser.add_argument('--no-cleanup', action='store_true', help='leave the load buckets in place')
+    args = parser.parse_args()
+
+    if args.endpoint:
+        tester = S3ops(endpoint=args.endpoint, port=args.port, path=args.path or '/', aws_access_key_id=args.access_key,
+                       aws_secret_access_key=args.secret_key)
+    else:
+        tester = S3ops(credpath=args.credpath, port=args.port, aws_access_key_id=args.access_key,
+                       aws_secret_access_key=args.secret_key,
+                       path=args.path or '/services/Walrus')
+    tester.run_load(duration=args.duration, workers=args.workers, operations=args.operations,
+                    buckets=args.buckets, keys_per_bucket=args.keys_per_bucket,
+                    object_size=parse_size(args.object_size), mix=parse_mix(args.mix),
+                    cleanup=not args.no_cleanup)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+'''
+Micro-benchmark for the SshConnection.cmd() receive loop.
+
+Starts a local paramiko ssh server stand-in which answers exec requests of the form
+'stream <bytes>' by writing <bytes> of data to the channel as fast as it can, then
+times SshConnection.cmd() reading that output back. Each size is measured both with
+cmd() buffering the output (as sys() callers do) and with a counting callback which
+discards the data (as dd_monitor style callers do). With --sessions, each size is
+also fanned out over that many concurrent cmd_async() sessions on the one transport.
+
+example usage (from the top of the eutester tree):
+    python toolbox/ssh_recv_benchmark.py --sizes 1,10,100,1024 --recv-size 32768
+'''
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+import paramiko
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import eucaops
+from eutester.sshconnection import SshConnection, SshCbReturn
+
+USERNAME = 'bench'
+PASSWORD = 'bench'
+CHUNK = 'x' * 32768
+
+
+class StandInServer(paramiko.ServerInterface):
+    '''
+    Minimal ssh server interface, accepts the benchmark user/password and 'stream <bytes>' exec requests.
+    Each exec request is served from its own thread so concurrent sessions on one transport work.
+    '''
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_auth_password(self, username, password):
+        if username == USERNAME and password == PASSWORD:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        thread = threading.Thread(target=stream_to_channel, args=(channel, command))
+        thread.daemon = True
+        thread.start()
+        return True
+
+
+def stream_to_channel(chan, command):
+    # Give the transport thread a moment to reply to the exec request before the channel is closed on it
+    time.sleep(0.01)
+    try:
+        remaining = int(str(command).split()[1])
+        while remaining > 0:
+            chunk = CHUNK[:min(remaining, len(CHUNK))]
+            chan.sendall(chunk)
+            remaining -= len(chunk)
+        chan.send_exit_status(0)
+    finally:
+        chan.close()
+
+
+def serve(sock, host_key):
+    while True:
+        try:
+            client, addr = sock.accept()
+        except socket.error:
+            return
+        transport = paramiko.Transport(client)
+        transport.add_server_key(host_key)
+        # Channels are served by the exec request threads. They are intentionally never accept()'d, the
+        # transport's accept queue holds a reference to each so they are not closed when garbage collected.
+        transport.start_server(server=StandInServer())
+
+
+def start_stand_in():
+    host_key = paramiko.RSAKey.generate(2048)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(5)
+    thread = threading.Thread(target=serve, args=(sock, host_key))
+    thread.daemon = True
+    thread.start()
+    return sock
+
+
+def run(sizes_mb, recv_size, max_buffered_mb, sessions=1):
+    sock = start_stand_in()
+    port = sock.getsockname()[1]
+    ssh = SshConnection('127.0.0.1', username=USERNAME, password=PASSWORD, port=port,
+                        find_keys=False, recv_size=recv_size, max_sessions=sessions)
+    counter = {'bytes': 0}
+
+    def count_cb(buf):
+        counter['bytes'] += len(buf)
+        return SshCbReturn(stop=False)
+
+    print('%-10s %-10s %-12s %-10s' % ('size(MB)', 'mode', 'elapsed(s)', 'MB/s'))
+    for size_mb in sizes_mb:
+        nbytes = int(size_mb * 1024 * 1024)
+        modes = ['callback']
+        if size_mb <= max_buffered_mb:
+            modes.insert(0, 'buffered')
+        for mode in modes:
+            counter['bytes'] = 0
+            start = time.time()
+            if mode == 'buffered':
+                out = ssh.cmd('stream ' + str(nbytes), timeout=3600, get_pty=False)
+                received = len(out['output'])
+            else:
+                ssh.cmd('stream ' + str(nbytes), timeout=3600, get_pty=False, cb=count_cb)
+                received = counter['bytes']
+            elapsed = time.time() - start
+            if received != nbytes:
+                raise Exception('Received ' + str(received) + ' bytes, expected:' + str(nbytes))
+            print('%-10s %-10s %-12.3f %-10.1f' % (size_mb, mode, elapsed, size_mb / elapsed))
+        if sessions > 1 and size_mb <= max_buffered_mb:
+            # Fan the same cmd out over 'sessions' concurrent channels on the one transport
+            start = time.time()
+            futures = [ssh.cmd_async('stream ' + str(nbytes), timeout=3600, get_pty=False)
+                       for x in xrange(sessions)]
+            for future in futures:
+                received = len(future.result()['output'])
+                if received != nbytes:
+                    raise Exception('Received ' + str(received) + ' bytes, expected:' + str(nbytes))
+            elapsed = time.time() - start
+            print('%-10s %-10s %-12.3f %-10.1f' % (size_mb, 'async x' + str(sessions), elapsed,
+                                                   (size_mb * sessions) / elapsed))
+    ssh.close()
+    sock.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure SshConnection.cmd() receive throughput '
+                                                 'against a local ssh server stand-in')
+    parser.add_argument('--sizes', default='1,10,100,1024',
+                        help='Comma delimited list of output sizes to measure in MB, default:1,10,100,1024')
+    parser.add_argument('--recv-size', type=int, default=32768,
+                        help='Bytes read per channel recv, default:32768')
+    parser.add_argument('--max-buffered', type=float, default=256,
+                        help='Largest size in MB to measure in buffered mode, default:256')
+    parser.add_argument('--sessions', type=int, default=1,
+                        help='If > 1, also measure this many concurrent cmd_async() sessions per size, default:1')
+    args = parser.parse_args()
+    run([float(x) for x in args.sizes.split(',')], args.recv_size, args.max_buffered, sessions=args.sessions)
@@ -10,6 +10,11 @@ import tarfile
 import urllib2
 import cStringIO
 import errno
+import json
+import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
     
 class Tarutils():
     '''
@@ -142,7 +147,7 @@ class Local_Tarutils(Tarutils):
         member = self.get_member(memberpath)
         freespace = self.get_freespace(destpath)
         if member.size > freespace:
-            raise Exception(str(memberpath)+":"+str(member.size)+" exceeds destpath freespace:"+(destpath)+":"+str(freespace) )
+            raise Exception(str(member.name)+":"+str(member.size)+" exceeds destpath freespace:"+(destpath)+":"+str(freespace) )
         return self.tarfile.extract(member, path=destpath)
     
     def extract_all(self, list=None, destpath='.'):
@@ -168,49 +173,243 @@ class Http_Tarutils(Tarutils):
     '''
     Utility class for navigating and operating on remote tarfiles via http
     '''
+    #Downloads of at least 2 x min_segment_size are split into up to this many concurrent range requests
+    download_segments = 4
+    min_segment_size = 8 * 1024 * 1024
+    #Member layouts of tarballs already read are kept here, keyed by url and the tarball's ETag/Last-Modified
+    use_index = True
+    index_dir = os.path.expanduser('~/.eutester/tar_index')
+    etag = None
+    last_modified = None
+
     def get_members(self, url = None, headersize=None, mode=None):
         '''
         Attempts to step through all tarball headers and gather the members/file info contained within.
         Will update self.members with the returned list of members.
+        Headers are read in a single pass over the tarball, see stream_members().
         url - optional - remote http address of tarball
         headersize - optional - tar header size to be used
         mode - optional - the file format string used for read the file (ie gzip'd or not)
         returns a list of Tarinfo member objects
         '''
-        headersize = headersize or self.headersize
-        mode = mode or self.fileformat
         url = url or self.uri
+        headers = self.load_member_index(url)
+        if headers is None:
+            headers = self.stream_members(url=url, wanted=[], headersize=headersize)
+        self.members = headers
+        return headers
+
+    def get_index_path(self, url=None):
+        url = url or self.uri
+        return os.path.join(self.index_dir, hashlib.sha1(url).hexdigest() + '.json')
+
+    def get_index_key(self, url=None):
+        '''
+        Returns the values identifying this version of the remote tarball, or None if the server gave
+        neither an ETag nor a Last-Modified header to tell versions apart
+        '''
+        if not self.etag and not self.last_modified:
+            return None
+        return {'url': url or self.uri, 'etag': self.etag, 'last_modified': self.last_modified,
+                'filesize': self.filesize}
+
+    def load_member_index(self, url=None):
+        '''
+        Returns the list of Tarinfo members from the on disk index for this url if the index matches the
+        remote tarball's current ETag/Last-Modified and size, otherwise None.
+        '''
+        key = self.get_index_key(url)
+        path = self.get_index_path(url)
+        if not self.use_index or not key or not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                index = json.load(f)
+            if index.get('key') != key:
+                self.debug('Tar index out of date for url:' + str(key['url']))
+                return None
+            members = []
+            for entry in index['members']:
+                member = tarfile.TarInfo.frombuf(base64.b64decode(entry['header']))
+                member.name = entry['name'].encode('utf-8')
+                member.offset = entry['offset']
+                member.offset_data = entry['offset_data']
+                member.header_buf = entry['header']
+                member.md5 = entry.get('md5')
+                members.append(member)
+        except Exception, e:
+            self.debug('Could not read tar index:' + str(path) + ', err:' + str(e))
+            return None
+        self.debug('Read ' + str(len(members)) + ' members from tar index:' + str(path))
+        return members
+
+    def save_member_index(self, members=None, url=None):
+        '''
+        Write the member layout (name, offsets, size, md5 when known) of the remote tarball to the on disk index
+        '''
+        members = members or self.members
+        key = self.get_index_key(url)
+        if not self.use_index or not key or not members:
+            return
+        entries = []
+        for member in members:
+            entries.append({'name': member.name,
+                            'offset': member.offset,
+                            'offset_data': member.offset_data,
+                            'size': member.size,
+                            'md5': getattr(member, 'md5', None),
+                            'header': member.header_buf})
+        path = self.get_index_path(url)
+        try:
+            self.make_path(path)
+            with open(path + '.tmp', 'w') as f:
+                json.dump({'key': key, 'members': entries}, f)
+            os.rename(path + '.tmp', path)
+        except Exception, e:
+            self.debug('Could not write tar index:' + str(path) + ', err:' + str(e))
+
+    def stream_members(self, url=None, wanted=None, destpath='.', sink=None, headersize=None, readsize=None,
+                       skip_threshold=None):
+        '''
+        Reads the remote tarball sequentially once, parsing each header as it is reached and writing each
+        wanted member's data straight to destpath/<member name>, or to a caller supplied sink, as it streams
+        by. Unwanted members of at least skip_threshold bytes are skipped with a new range request starting
+        at the next header rather than being read. Memory used is bounded by readsize regardless of the
+        size of the tarball or its members.
+        Returns the list of Tarinfo members read. If every header was read, self.members is updated too.
+        url - optional - remote http address of tarball
+        wanted - optional - list of member names to extract, None extracts all members, [] only reads headers
+        destpath - optional - local dir to extract members to when no sink is given
+        sink - optional - method, sink(member) returns a file like obj the member's data is written to,
+               ie a part writer for an S3 multipart upload. The obj is closed after the member if it has close()
+        headersize - optional - tar header size to be used
+        readsize - optional - size to read/write per iteration
+        skip_threshold - optional - unwanted members (with padding) at least this size are skipped with a
+                         range request, smaller ones are read through. Defaults to 1MB
+        '''
+        url = url or self.uri
+        headersize = headersize or self.headersize
+        readsize = readsize or (256 * 1024)
+        skip_threshold = skip_threshold or (1024 * 1024)
         filesize = self.filesize or self.get_file_size(url)
-        start = 0
-        headers=[]
-        end = 0 
-        self.debug("get_members for url:"+str(url)+", headersize:"+str(headersize)+", filesize:"+str(filesize))
-        while (start+headersize) <= filesize and end < 2:
-            data = self.download_http_offset(url, start=start, offset=headersize)
-            if not len(data.getvalue().replace('\x00','')):
-                #End of Tar markers are 2 consecutive zero filled 512byte buffers
-                self.debug('Got empty header, count:'+str(end))
-                end += 1
-                start += headersize
-            else:
+        self.debug("stream_members for url:"+str(url)+", wanted:"+str(wanted)+", filesize:"+str(filesize))
+        stream = {'remotefile': None, 'pos': 0}
+
+        def seek(pos):
+            if stream['remotefile']:
+                stream['remotefile'].close()
+                stream['remotefile'] = None
+            stream['pos'] = pos
+
+        def read(size):
+            #Read exactly size bytes (less only at the end of the tarball) from the current position
+            if not stream['remotefile']:
+                if stream['pos'] >= filesize:
+                    return ''
+                stream['remotefile'] = self.open_http_range(url, stream['pos'], filesize - 1)
+            chunks = []
+            remaining = size
+            while remaining > 0:
+                data = stream['remotefile'].read(remaining)
+                if not data:
+                    break
+                chunks.append(data)
+                remaining -= len(data)
+            data = ''.join(chunks)
+            stream['pos'] += len(data)
+            return data
+
+        def copy_to(outfile, size, md5=None):
+            remaining = size
+            while remaining > 0:
+                data = read(min(readsize, remaining))
+                if not data:
+                    raise Exception('Tarball ended before member data was complete, missing:'+str(remaining))
+                if outfile:
+                    outfile.write(data)
+                if md5:
+                    md5.update(data)
+                remaining -= len(data)
+
+        members = []
+        end = 0
+        longname = None
+        complete = False
+        wanted_left = None if wanted is None else set(wanted)
+        try:
+            while end < 2:
+                if wanted_left is not None and wanted and not wanted_left:
+                    #Everything asked for has been extracted, no need to read the rest
+                    break
+                header_pos = stream['pos']
+                header = read(headersize)
+                if len(header) < headersize:
+                    complete = True
+                    break
+                if not header.replace('\x00',''):
+                    #End of Tar markers are 2 consecutive zero filled 512byte buffers
+                    end += 1
+                    if end == 2:
+                        complete = True
+                    continue
                 end = 0
-                #print 'got data:'+str(data.read())
-                data.seek(0)
-                #get tar member info from this header
-                member = tarfile.TarInfo.frombuf(data.getvalue())
-                member.offset = start
-                member.offset_data = start + headersize
-                #append tar header/member to the list
+                member = tarfile.TarInfo.frombuf(header)
+                member.offset = header_pos
+                member.offset_data = header_pos + headersize
+                member.header_buf = base64.b64encode(header)
+                member.md5 = None
+                #Member data is padded out to a multiple of headersize
+                padded = ((member.size + headersize - 1) / headersize) * headersize
+                if member.type == tarfile.GNUTYPE_LONGNAME:
+                    #GNU long name header, the data is the name of the next member
+                    longname = read(padded)[:member.size].rstrip('\x00')
+                    continue
+                if longname:
+                    member.name = longname
+                    longname = None
+                members.append(member)
                 self.debug("Got header:"+member.name)
-                headers.append(member)
-                #move start point forward by the size of the file and header info. 
-                start = headersize + member.size
-            #must end in an increment of headersize 512 ...or maybe tarfile.fileobject.blocksize ie:1024? 
-            if start%headersize != 0:
-                start = ((start/headersize)+1)*headersize
-        self.members = headers
-        return headers
-            
+                if wanted_left is None or member.name in wanted_left:
+                    if wanted_left:
+                        wanted_left.discard(member.name)
+                    if sink:
+                        outfile = sink(member)
+                    elif member.isdir():
+                        self.make_path(str(destpath).rstrip('/')+'/'+str(member.name).rstrip('/')+'/')
+                        outfile = None
+                    else:
+                        freespace = self.get_freespace(destpath)
+                        if member.size > freespace:
+                            raise Exception(str(member.name)+":"+str(member.size)+" exceeds destpath freespace:"+
+                                            str(destpath)+":"+str(freespace))
+                        outfile = open(self.make_path(str(destpath).rstrip('/')+'/'+str(member.name)), 'wb')
+                    md5 = hashlib.md5()
+                    try:
+                        copy_to(outfile, member.size, md5=md5)
+                        member.md5 = md5.hexdigest()
+                    finally:
+                        if outfile and hasattr(outfile, 'close'):
+                            outfile.close()
+                    copy_to(None, padded - member.size)
+                    self.debug('Extracted member: '+str(member.name))
+                elif padded >= skip_threshold:
+                    seek(member.offset_data + padded)
+                else:
+                    copy_to(None, padded)
+        finally:
+            seek(stream['pos'])
+        if complete:
+            self.members = members
+            self.save_member_index(members, url=url)
+        elif self.members:
+            #Record md5s found for members of an already indexed tarball
+            md5s = dict((member.name, member.md5) for member in members if member.md5)
+            if md5s:
+                for member in self.members:
+                    member.md5 = md5s.get(member.name, getattr(member, 'md5', None))
+                self.save_member_index(self.members, url=url)
+        return members
+
     def get_member(self, memberpath):
         '''
         Traverses our self.members list and attempts to return a tarinfo member object 
@@ -255,11 +454,11 @@ class Http_Tarutils(Tarutils):
         filesize = filesize or self.filesize
         freespace = self.get_freespace(destpath)
         if member.size > freespace:
-            raise Exception(str(memberpath)+":"+str(member.size)+" exceeds destpath freespace:"+(destpath)+":"+str(freespace) )
+            raise Exception(str(member.name)+":"+str(member.size)+" exceeds destpath freespace:"+(destpath)+":"+str(freespace) )
         start = member.offset_data
         offset = member.size
         destfile=str(destpath).rstrip('/')+'/'+str(member.name)
-        file = self.get_file_offset(uri, start, offset, filesize, readsize=None,destfile=destfile)
+        file = self.get_file_offset(uri, start, offset, filesize, readsize=readsize, destfile=destfile)
         self.debug('Extracted member: '+str(member.name)+' to file: '+str(file.name))
         return file
     
@@ -277,7 +476,7 @@ class Http_Tarutils(Tarutils):
         freespace = self.get_freespace(destpath)
         if size > freespace:
             raise Exception("Extract_all size:"+str(size)+" exceeds destpath freespace:"+(destpath)+":"+str(freespace) )
-        for member in self.members:
+        for member in list:
             file = self.extract_member_obj(member, destpath=destpath)
             if not file.closed:
                 file.close()
@@ -285,9 +484,157 @@ class Http_Tarutils(Tarutils):
         
     def get_file_offset(self, uri=None, start=0, offset=None, filesize=None, readsize=None,destfile=None):
         '''
-        mapped method to down_load_http_offset
+        mapped method to down_load_http_offset, or to download_http_segmented for large ranges written to a file
+        '''
+        if destfile and offset and offset >= (2 * self.min_segment_size) and self.download_segments > 1:
+            return self.download_http_segmented(uri, start=start, offset=offset, filesize=filesize,
+                                                readsize=readsize, destfile=destfile)
+        return self.download_http_offset(uri, start=start, offset=offset, filesize=filesize, readsize=readsize,
+                                         destfile=destfile)
+
+    def open_http_range(self, url, start, end):
         '''
-        return self.download_http_offset(uri, start=start, offset=offset, filesize=filesize, destfile=destfile)
+        Open an http range request for bytes start through end (inclusive) and verify the server honored the range.
+        Returns the open urllib2 response to read the data from.
+        '''
+        request = urllib2.Request(url)
+        request.headers['Range'] = 'bytes=%s-%s' % (start, end)
+        remotefile = urllib2.urlopen(request)
+        # If content length or range is not what we expected throw an error...
+        # Note: content range in bytes is formated like: "byte <start>-<end>/<total bytes>
+        range=remotefile.headers.get('Content-Range')
+        clength = int(remotefile.headers.get('Content-Length'))
+        total = (end + 1) - start
+        self.debug('Content-Range:' +str(range)+", Content-Length:"+str(clength))
+        if clength != total:
+            raise Exception("Content-length:"+str(clength)+" not equal to expected total:"+str(total)+", is range supported on remote server?")
+        #Now try to parse the ranges...
+        try:
+            rangestart, rangeend = re.search("\d+-\d+", range).group().split('-')
+        except Exception, e:
+            raise Exception("Couldn't derive rangestart and rangeend from string:"+str(range)+", err:"+str(e))
+        if int(rangestart) != int(start) or int(rangeend) != int(end):
+            raise Exception("Range request not met. (start:"+str(start)+" vs rangestart:"+str(rangestart)+") (end:"+str(end)+" vs rangeend:"+str(rangeend)+"), is range supported on remote server?")
+        return remotefile
+
+    def download_http_segmented(self, url=None, start=0, offset=None, filesize=None, readsize=None, destfile=None,
+                                segments=None, resume=True):
+        '''
+        Download range start to offset into destfile using several concurrent range requests, each writing
+        straight to its own region of the preallocated destfile. Progress of each segment is recorded in
+        '<destfile>.segments' so an interrupted download of the same url/range resumes where each segment
+        left off rather than starting over. Returns the destfile as an open file object at position 0.
+        url:    url to read from
+        start:  start address to read from
+        offset: length in bytes to read from starting address
+        filesize: the size of the remote file we're reading
+        readsize: the incremental read size used by each segment
+        destfile: the local file to write to, mandatory
+        segments: number of concurrent range requests, defaults to self.download_segments
+        resume: resume from a matching '<destfile>.segments' progress file if one exists
+        '''
+        if not destfile:
+            raise Exception('download_http_segmented requires a destfile')
+        url = url or self.uri
+        readsize = readsize or (256 * 1024)
+        filesize = filesize or self.filesize or int(self.get_file_size(url))
+        start = int(start)
+        if start < 0 or start > filesize:
+            raise Exception('Invalid start for download_http_segmented, start:'+str(start))
+        if offset:
+            end = min(start + int(offset) - 1, filesize - 1)
+        else:
+            end = filesize - 1
+        total = (end + 1) - start
+        segments = segments or self.download_segments
+        segments = max(1, min(segments, total / self.min_segment_size or 1))
+        destfile = self.make_path(destfile)
+        statefile = destfile + '.segments'
+        #Each segment is [segment start, segment end, bytes done]
+        segment_list = None
+        if resume and os.path.exists(statefile) and os.path.exists(destfile):
+            try:
+                with open(statefile) as f:
+                    state = json.load(f)
+                if state.get('url') == url and state.get('start') == start and state.get('end') == end:
+                    segment_list = state['segments']
+                    self.debug('Resuming download of ' + str(destfile) + ' from ' +
+                               str(sum(s[2] for s in segment_list)) + '/' + str(total) + ' bytes')
+            except Exception, e:
+                self.debug('Could not resume from ' + str(statefile) + ', err:' + str(e))
+        if segment_list is None:
+            segment_size = total / segments
+            segment_list = []
+            for x in xrange(segments):
+                seg_start = start + (x * segment_size)
+                seg_end = end if x == segments - 1 else seg_start + segment_size - 1
+                segment_list.append([seg_start, seg_end, 0])
+            #Preallocate the destination so each segment can write to its own region
+            with open(destfile, 'wb') as f:
+                f.truncate(total)
+        state_lock = threading.Lock()
+        #Bytes of each segment known to be on disk, only these are saved to the statefile. segment[2] also
+        #counts data still buffered in the segment's file object.
+        persisted = [segment[2] for segment in segment_list]
+
+        def save_state():
+            saved = [[segment[0], segment[1], persisted[index]] for index, segment in enumerate(segment_list)]
+            with open(statefile + '.tmp', 'w') as f:
+                json.dump({'url': url, 'start': start, 'end': end, 'segments': saved}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(statefile + '.tmp', statefile)
+
+        def persist(index, dfile):
+            #Only this segment's thread writes to dfile and segment[2], so after syncing its own file
+            #everything it has counted is on disk
+            dfile.flush()
+            os.fsync(dfile.fileno())
+            with state_lock:
+                persisted[index] = segment_list[index][2]
+                save_state()
+
+        def download_segment(index):
+            segment = segment_list[index]
+            seg_start, seg_end, done = segment
+            if seg_start + done > seg_end:
+                return
+            remotefile = self.open_http_range(url, seg_start + done, seg_end)
+            with open(destfile, 'r+b') as dfile:
+                dfile.seek((seg_start - start) + done)
+                last_save = time.time()
+                try:
+                    for data in iter(lambda: remotefile.read(readsize), ''):
+                        dfile.write(data)
+                        segment[2] += len(data)
+                        if time.time() - last_save > 2:
+                            persist(index, dfile)
+                            last_save = time.time()
+                finally:
+                    persist(index, dfile)
+            if segment[2] != (seg_end + 1) - seg_start:
+                raise Exception('Segment ' + str(seg_start) + '-' + str(seg_end) + ' incomplete, got ' +
+                                str(segment[2]) + ' bytes')
+
+        self.debug("download_http_segmented starting: url:"+str(url)+", start:"+str(start)+", end:"+str(end)+
+                   ", segments:"+str(len(segment_list))+", filename:"+str(destfile))
+        already_done = sum(s[2] for s in segment_list)
+        dl_start = time.time()
+        with ThreadPoolExecutor(max_workers=len(segment_list)) as executor:
+            futures = [executor.submit(download_segment, index) for index in xrange(len(segment_list))]
+        errors = [str(future.exception()) for future in futures if future.exception()]
+        with state_lock:
+            if errors:
+                save_state()
+                raise Exception('download_http_segmented failed, rerun to resume. Errors:' + ", ".join(errors))
+        if os.path.exists(statefile):
+            os.remove(statefile)
+        elapsed = time.time() - dl_start
+        downloaded = total - already_done
+        self.debug('Downloaded ' + str(downloaded) + ' bytes in ' + ("%.2f" % elapsed) + ' seconds, ' +
+                   ("%.2f" % (downloaded / (elapsed or 1) / 1048576.0)) + ' MB/s over ' + str(len(segment_list)) +
+                   ' segments')
+        return open(destfile, 'rb')
     
     
     def download_http_offset(self, url=None, start=0, offset=None, filesize=None, readsize=None, destfile=None):
@@ -319,33 +666,14 @@ class Http_Tarutils(Tarutils):
                 end = filesize - 1
         else:
             end = filesize - 1 
-        #calc total to check against later
-        total = (end + 1) - start 
         #see if we can open our dest file before we download
         if destfile:
             destfile = self.make_path(destfile)
             dfile = open(destfile, 'w+')
         else:
             dfile = cStringIO.StringIO()
-        #form our http request
-        request = urllib2.Request(url)
-        request.headers['Range'] = 'bytes=%s-%s' % (start, end)
-        #open http connection
-        remotefile = urllib2.urlopen(request)
-        # If content length or range is not what we expected throw an error...
-        # Note: content range in bytes is formated like: "byte <start>-<end>/<total bytes>
-        range=remotefile.headers.get('Content-Range')
-        clength = int(remotefile.headers.get('Content-Length'))
-        print('Content-Range:' +str(range)+", Content-Length:"+str(clength) ) 
-        if clength != total:
-            raise Exception("Content-length:"+str(clength)+" not equal to expected total:"+str(total)+", is range supported on remote server?")
-        #Now try to parse the ranges...
-        try:
-            rangestart, rangeend = re.search("\d+-\d+", range).group().split('-')
-        except Exception, e:
-            print "Couldn't derive rangestart and rangeend from string:"+str(range)+", err:"+str(e)
-        if int(rangestart) != int(start) or int(rangeend) != int(end):
-            raise Exception("Range request not met. (start:"+str(start)+" vs rangestart:"+str(rangestart)+") (end:"+str(end)+" vs rangeend:"+str(rangeend)+"), is range supported on remote server?") 
+        #open http connection, verifying the range is supported
+        remotefile = self.open_http_range(url, start, end)
         #finally get the data and return it as a filelike cString object
         for data in iter(lambda: remotefile.read(readsize), ''):
             dfile.write(data)
@@ -360,6 +688,10 @@ class Http_Tarutils(Tarutils):
         url = uri or self.uri   
         site = urllib2.urlopen(url)
         size =  int(site.headers.get('Content-Length'))
+        #Identify this version of the tarball for the member index
+        self.etag = site.headers.get('ETag')
+        self.last_modified = site.headers.get('Last-Modified')
+        site.close()
         self.filesize = size
         return size
     